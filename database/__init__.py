@@ -1,5 +1,15 @@
 """Submodule for anything related to duffelbag's database."""
 
+from database.delta import *
+from database.instrumentation import *
 from database.models import *
+from database.pipeline import *
+from database.pool import *
 from database.populate import *
+from database.replica import *
+from database.shadow import *
+from database.specs import *
+from database.stats import *
 from database.utils import *
+from database.versions import *
+from database.views import *
@@ -0,0 +1,216 @@
+"""Computation and application of changes between gamedata and the static tables."""
+
+import dataclasses
+import itertools
+import time
+import typing
+
+from piccolo.columns import combination
+
+from database import specs, utils
+
+__all__: typing.Sequence[str] = (
+    "TableDelta",
+    "apply_deltas",
+    "compute_delta",
+    "select_primary_keys",
+)
+
+
+@dataclasses.dataclass
+class TableDelta:
+    """The changes required to bring a static table in line with the gamedata."""
+
+    spec: specs.StaticTableSpec
+    """The spec of the table to which these changes apply."""
+    inserts: list[specs.Row] = dataclasses.field(default_factory=list)
+    """Rows that do not yet exist in the table."""
+    updates: dict[typing.Any, specs.Row] = dataclasses.field(default_factory=dict)
+    """Rows of which the values changed, by primary key."""
+    deletes: list[typing.Any] = dataclasses.field(default_factory=list)
+    """Primary keys of rows that no longer exist in the gamedata."""
+    written: int = 0
+    """The number of rows that were actually inserted or updated when the delta was applied.
+
+    Updates of rows of which the stored digest already matches are skipped.
+    """
+    rows: int = 0
+    """The number of distinct gamedata rows the delta was computed from."""
+    elapsed: float = 0.0
+    """The time in seconds spent computing and applying the delta."""
+
+    def __bool__(self) -> bool:
+        return bool(self.inserts or self.updates or self.deletes)
+
+    def __len__(self) -> int:
+        return len(self.inserts) + len(self.updates) + len(self.deletes)
+
+
+async def _select_existing(
+    spec: specs.StaticTableSpec,
+    where: combination.Combinable | None,
+) -> dict[tuple[typing.Any, ...], tuple[typing.Any, str | None]]:
+    pk = spec.primary_key
+    paths = tuple(dict.fromkeys((pk._meta.name, *spec.key)))  # noqa: SLF001
+    hash_name = spec.hash_column._meta.name  # noqa: SLF001
+
+    # Only the hashes of the values are needed to detect changes, which keeps
+    # this cheap even for large tables.
+    query = spec.table.select(*(spec.column(path) for path in paths), spec.hash_column)
+    if where is not None:
+        query = query.where(where)
+
+    return {
+        spec.key_of(row): (row[pk._meta.name], row[hash_name])  # noqa: SLF001
+        for row in await query
+    }
+
+
+async def select_primary_keys(
+    spec: specs.StaticTableSpec,
+) -> dict[tuple[typing.Any, ...], typing.Any]:
+    """Get a mapping of natural key to primary key for all rows in a static table."""
+    return {key: pk for key, (pk, _) in (await _select_existing(spec, None)).items()}
+
+
+async def compute_delta(
+    spec: specs.StaticTableSpec,
+    rows: typing.Iterable[specs.Row],
+    *,
+    where: combination.Combinable | None = None,
+) -> TableDelta:
+    """Compare rows built from gamedata against the current contents of their table.
+
+    Rows are compared through their digests, see :meth:`specs.StaticTableSpec.hash_of`.
+
+    Parameters
+    ----------
+    spec:
+        The spec of the table to compare against.
+    rows:
+        All rows that should be in the table once the delta is applied. If
+        multiple rows have the same natural key, the last one is used.
+    where:
+        Restrict the comparison to existing rows that match this condition.
+        Rows that do not match it are never updated or deleted.
+
+    Returns
+    -------
+    :class:`TableDelta`
+        The inserts, updates and deletes needed to make the table match the
+        provided rows.
+
+    """
+    start = time.perf_counter()
+    existing = await _select_existing(spec, where)
+
+    delta = TableDelta(spec)
+    seen: set[tuple[typing.Any, ...]] = set()
+
+    for row in {spec.key_of(row): row for row in rows}.values():
+        key = spec.key_of(row)
+        seen.add(key)
+
+        if key not in existing:
+            delta.inserts.append(row)
+            continue
+
+        pk, old_hash = existing[key]
+        if spec.hash_of(row) != old_hash:
+            delta.updates[pk] = row
+
+    delta.deletes.extend(pk for key, (pk, _) in existing.items() if key not in seen)
+    delta.rows = len(seen)
+    delta.elapsed = time.perf_counter() - start
+    return delta
+
+
+async def _apply_writes(delta: TableDelta) -> int:
+    spec = delta.spec
+    pk = spec.primary_key
+    parent_pks = await select_primary_keys(spec.parent[1]) if spec.parent else {}
+
+    columns_ = [spec.column(path) for path in spec.own_paths]
+    normalisers = [spec.normalisers[path] for path in spec.own_paths]
+    if spec.parent:
+        columns_.append(getattr(spec.table, spec.parent[0]))
+    columns_.append(spec.hash_column)
+
+    def _record(row: specs.Row) -> list[typing.Any]:
+        record = [
+            normalise(row[path])
+            for normalise, path in zip(normalisers, spec.own_paths, strict=True)
+        ]
+        if spec.parent:
+            record.append(parent_pks[spec.parent_key_of(row)])
+        record.append(spec.hash_of(row))
+
+        return record
+
+    if pk._meta.name in spec.own_paths:  # noqa: SLF001
+        # The primary key is part of the gamedata, so inserts and updates can
+        # be merged in one go.
+        rows = itertools.chain(delta.inserts, delta.updates.values())
+        return await utils.copy_upsert(
+            spec.table,
+            map(_record, rows),
+            columns_=columns_,
+            distinct_on=spec.hash_column,
+        )
+
+    # Otherwise, inserted rows get a new primary key from the sequence and
+    # updated rows keep their existing one.
+    written = 0
+    if delta.inserts:
+        written += await utils.copy_upsert(
+            spec.table,
+            map(_record, delta.inserts),
+            columns_=columns_,
+        )
+
+    if delta.updates:
+        written += await utils.copy_upsert(
+            spec.table,
+            ([*_record(row), pk_value] for pk_value, row in delta.updates.items()),
+            columns_=[*columns_, pk],
+            distinct_on=spec.hash_column,
+        )
+
+    return written
+
+
+async def apply_deltas(deltas: typing.Sequence[TableDelta]) -> int:
+    """Apply table deltas to the database in a single transaction.
+
+    Deltas must be ordered such that referenced tables come before the tables
+    that reference them, as in :data:`specs.STATIC_TABLES`.
+
+    Returns
+    -------
+    :class:`int`
+        The number of rows that were actually changed, i.e. deleted, inserted
+        or updated. See also :attr:`TableDelta.written`.
+
+    """
+    async with utils.get_db().transaction():
+        # Delete referencing rows first, such that no rows that are about to be
+        # deleted anyways are cascaded.
+        for delta in reversed(deltas):
+            if delta.deletes:
+                start = time.perf_counter()
+                # Pass the primary keys as a single array such that there is
+                # no need to batch around the argument limit.
+                pk_name = delta.spec.primary_key._meta.db_column_name  # noqa: SLF001
+                await delta.spec.table.raw(
+                    f'DELETE FROM "{delta.spec.name}" WHERE "{pk_name}" = ANY({{}})',  # noqa: S608
+                    delta.deletes,
+                )
+                delta.elapsed += time.perf_counter() - start
+
+        for delta in deltas:
+            if delta.inserts or delta.updates:
+                start = time.perf_counter()
+                delta.written = await _apply_writes(delta)
+                delta.elapsed += time.perf_counter() - start
+
+    return sum(len(delta.deletes) + delta.written for delta in deltas)
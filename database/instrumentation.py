@@ -0,0 +1,392 @@
+"""Query timing instrumentation and slow-query logging for the piccolo engine.
+
+All queries that go through :class:`InstrumentedPostgresEngine` are grouped
+by their *shape*: their SQL with all parameter placeholders collapsed, such
+that e.g. ``IN ($1, $2)`` and ``IN ($1, $2, $3)`` are the same shape. Per
+shape, the number of calls, latencies, returned rows and callsites are kept.
+"""
+
+import bisect
+import collections
+import contextlib
+import contextvars
+import dataclasses
+import functools
+import logging
+import os
+import pathlib
+import re
+import sys
+import time
+import typing
+
+import dotenv
+import piccolo
+from piccolo import engine
+from piccolo.querystring import QueryString
+
+__all__: typing.Sequence[str] = (
+    "LATENCY_BUCKETS",
+    "InstrumentedPostgresEngine",
+    "QueryShapeStats",
+    "capture_queries",
+    "format_top_queries",
+    "get_query_stats",
+    "get_slow_query_threshold",
+    "reset_query_stats",
+    "set_slow_query_threshold",
+    "top_queries",
+)
+
+dotenv.load_dotenv()
+
+_LOGGER = logging.getLogger(__name__)
+
+LATENCY_BUCKETS: typing.Final[typing.Sequence[float]] = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+"""The upper bounds in seconds of the latency histogram buckets, besides a final unbounded one."""
+
+_CapturedQuery: typing.TypeAlias = tuple[str, tuple[typing.Any, ...]]
+
+_MAX_CALLSITES: typing.Final[int] = 32
+_MAX_LOGGED_SQL_LENGTH: typing.Final[int] = 2000
+_MAX_LOGGED_ARGS: typing.Final[int] = 50
+_REDACTED: typing.Final[str] = "<redacted>"
+_SENSITIVE_COLUMNS: typing.Final[frozenset[str]] = frozenset(("password", "yostar_token"))
+
+_PLACEHOLDERS = re.compile(r"\$\d+(?:\s*,\s*\$\d+)*")
+_REPEATED_GROUPS = re.compile(r"(\([^()]*\))(?:\s*,\s*\1)+")
+_WHITESPACE = re.compile(r"\s+")
+_COMPARISON = re.compile(
+    r'"(\w+)"\s*(?:=|<>|!=|<=|>=|<|>|LIKE|ILIKE|IN)\s*\(?\s*(\$\d+(?:\s*,\s*\$\d+)*)',
+    re.IGNORECASE,
+)
+_INSERT = re.compile(r"INSERT INTO \S+ \(([^)]*)\) VALUES ((?:\([^()]*\),?)+)", re.IGNORECASE)
+_VALUES = re.compile(r"\(([^()]*)\)")
+
+# Frames in these directories are part of the database layer, not the caller.
+_SKIPPED_DIRS: typing.Final[tuple[str, ...]] = tuple(
+    str(pathlib.Path(typing.cast(str, module.__file__)).resolve().parent) + os.sep
+    for module in (piccolo, sys.modules["asyncio"])
+)
+_DATABASE_DIR: typing.Final[str] = str(pathlib.Path(__file__).resolve().parent) + os.sep
+
+
+def _read_threshold() -> float | None:
+    value = os.environ.get("DB_SLOW_QUERY_MS", "250")
+    return float(value) / 1000 if value else None
+
+
+_slow_query_threshold: float | None = _read_threshold()
+
+
+def get_slow_query_threshold() -> float | None:
+    """Get the duration in seconds above which queries are logged, if any.
+
+    By default, this is read from the ``DB_SLOW_QUERY_MS`` environment
+    variable in milliseconds. If it is empty, slow queries are not logged.
+    """
+    return _slow_query_threshold
+
+
+def set_slow_query_threshold(threshold: float | None) -> None:
+    """Set the duration in seconds above which queries are logged. Pass ``None`` to disable."""
+    global _slow_query_threshold  # noqa: PLW0603
+
+    _slow_query_threshold = threshold
+
+
+@dataclasses.dataclass
+class QueryShapeStats:
+    """The statistics of all queries of the same shape."""
+
+    shape: str
+    """The SQL of the queries, with all parameter placeholders replaced by ``?``."""
+    calls: int = 0
+    """The number of times a query of this shape was run."""
+    total_time: float = 0.0
+    """The total time in seconds spent running queries of this shape."""
+    max_time: float = 0.0
+    """The time in seconds taken by the slowest query of this shape."""
+    rows: int = 0
+    """The total number of rows returned by queries of this shape."""
+    buckets: list[int] = dataclasses.field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+    """The number of queries per latency bucket, see :data:`LATENCY_BUCKETS`."""
+    callsites: collections.Counter[str] = dataclasses.field(default_factory=collections.Counter)
+    """The number of queries per callsite, as ``module:line (function)``."""
+
+    @property
+    def mean_time(self) -> float:
+        """The mean time in seconds taken by a query of this shape."""
+        return self.total_time / self.calls if self.calls else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Estimate a latency quantile from the histogram, e.g. ``0.99`` for the 99th percentile.
+
+        This returns the upper bound of the bucket that contains the quantile,
+        or :attr:`max_time` if that is lower.
+        """
+        target = q * self.calls
+        seen = 0
+        for bound, count in zip((*LATENCY_BUCKETS, self.max_time), self.buckets, strict=True):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max_time)
+
+        return self.max_time
+
+    def record(self, duration: float, rows: int, callsite: str) -> None:
+        """Record a single query of this shape."""
+        self.calls += 1
+        self.total_time += duration
+        self.max_time = max(self.max_time, duration)
+        self.rows += rows
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, duration)] += 1
+
+        # Keep the number of distinct callsites bounded for queries built in loops.
+        if callsite in self.callsites or len(self.callsites) < _MAX_CALLSITES:
+            self.callsites[callsite] += 1
+
+
+_stats: dict[str, QueryShapeStats] = {}
+_captured: contextvars.ContextVar[list[_CapturedQuery] | None] = contextvars.ContextVar(
+    "_captured",
+    default=None,
+)
+
+
+def get_query_stats() -> typing.Mapping[str, QueryShapeStats]:
+    """Get the statistics of all query shapes that were run since the last reset, by shape."""
+    return _stats
+
+
+def reset_query_stats() -> None:
+    """Discard the statistics of all query shapes."""
+    _stats.clear()
+
+
+def top_queries(
+    n: int = 10,
+    *,
+    key: typing.Callable[[QueryShapeStats], float] = lambda stats: stats.total_time,
+) -> list[QueryShapeStats]:
+    """Get the hottest query shapes.
+
+    Parameters
+    ----------
+    n:
+        The number of query shapes to return.
+    key:
+        The measure by which query shapes are ranked. Defaults to the total
+        time spent running them.
+
+    Returns
+    -------
+    list[:class:`QueryShapeStats`]
+        The statistics of the top ``n`` query shapes, hottest first.
+
+    """
+    return sorted(_stats.values(), key=key, reverse=True)[:n]
+
+
+def format_top_queries(n: int = 10, *, max_sql_length: int = 200) -> str:
+    """Format the hottest query shapes by total time as a human-readable report.
+
+    Parameters
+    ----------
+    n:
+        The number of query shapes to include.
+    max_sql_length:
+        The length at which the SQL of each shape is truncated.
+
+    Returns
+    -------
+    :class:`str`
+        The report, with one paragraph per query shape.
+
+    """
+    lines: list[str] = []
+    for rank, stats in enumerate(top_queries(n), start=1):
+        sql = stats.shape
+        if len(sql) > max_sql_length:
+            sql = sql[: max_sql_length - 3] + "..."
+
+        lines.append(f"{rank}. {sql}")
+        lines.append(
+            f"   {stats.calls} calls, {stats.total_time * 1000:.1f}ms total,"
+            f" {stats.mean_time * 1000:.2f}ms mean, {stats.quantile(0.99) * 1000:.2f}ms p99,"
+            f" {stats.max_time * 1000:.2f}ms max, {stats.rows} rows",
+        )
+        lines.extend(
+            f"   {count}x {callsite}" for callsite, count in stats.callsites.most_common(3)
+        )
+
+    return "\n".join(lines)
+
+
+@contextlib.contextmanager
+def capture_queries() -> typing.Iterator[list[_CapturedQuery]]:
+    """Capture the SQL and parameters of all queries run within the context.
+
+    Unlike the statistics, captured parameters are not redacted.
+
+    Returns
+    -------
+    list[tuple[:class:`str`, tuple[typing.Any, ...]]]
+        The SQL and parameters of every query, in the order they were run.
+        This is filled in as queries are run.
+
+    """
+    queries: list[_CapturedQuery] = []
+    token = _captured.set(queries)
+    try:
+        yield queries
+    finally:
+        _captured.reset(token)
+
+
+@functools.lru_cache(maxsize=1024)
+def _shape_of(sql: str) -> str:
+    # Multi-row inserts of any number of rows are the same shape as well.
+    shape = _REPEATED_GROUPS.sub(r"\1, ...", _PLACEHOLDERS.sub("?", sql))
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+@functools.lru_cache(maxsize=1024)
+def _sensitive_indices(sql: str) -> frozenset[int]:
+    # Find the placeholders that are compared against or inserted into
+    # sensitive columns. Indices are zero-based, placeholders one-based.
+    indices: set[int] = set()
+
+    for match in _COMPARISON.finditer(sql):
+        if match[1] in _SENSITIVE_COLUMNS:
+            indices.update(int(arg) - 1 for arg in re.findall(r"\$(\d+)", match[2]))
+
+    for match in _INSERT.finditer(sql):
+        names = [name.strip().strip('"') for name in match[1].split(",")]
+        for values in _VALUES.finditer(match[2]):
+            for name, value in zip(names, values[1].split(","), strict=False):
+                if name in _SENSITIVE_COLUMNS and (value := value.strip()).startswith("$"):
+                    indices.add(int(value[1:]) - 1)
+
+    return frozenset(indices)
+
+
+def _redact(sql: str, args: typing.Sequence[typing.Any]) -> list[typing.Any]:
+    indices = _sensitive_indices(sql)
+    redacted = [_REDACTED if i in indices else arg for i, arg in enumerate(args[:_MAX_LOGGED_ARGS])]
+    if len(args) > _MAX_LOGGED_ARGS:
+        redacted.append(f"... ({len(args) - _MAX_LOGGED_ARGS} more)")
+
+    return redacted
+
+
+def _truncate(sql: str) -> str:
+    if len(sql) <= _MAX_LOGGED_SQL_LENGTH:
+        return sql
+
+    return f"{sql[:_MAX_LOGGED_SQL_LENGTH]}... ({len(sql) - _MAX_LOGGED_SQL_LENGTH} more chars)"
+
+
+def _callsite() -> str:
+    # Report the first frame outside of the database layer, or the first one
+    # outside of piccolo if the query originates in the database package.
+    fallback = "<unknown>"
+    frame = sys._getframe(2)  # noqa: SLF001
+    while frame:
+        filename = frame.f_code.co_filename
+        if not filename.startswith(_SKIPPED_DIRS):
+            callsite = (
+                f"{frame.f_globals.get('__name__')}:{frame.f_lineno} ({frame.f_code.co_name})"
+            )
+            if not filename.startswith(_DATABASE_DIR):
+                return callsite
+
+            if fallback == "<unknown>":
+                fallback = callsite
+
+        frame = frame.f_back
+
+    return fallback
+
+
+def _record(
+    sql: str,
+    args: typing.Sequence[typing.Any],
+    response: typing.Any,  # noqa: ANN401
+    start: float,
+) -> None:
+    duration = time.perf_counter() - start
+    rows = len(response) if isinstance(response, list) else 0
+    callsite = _callsite()
+
+    shape = _shape_of(sql)
+    if not (stats := _stats.get(shape)):
+        stats = _stats[shape] = QueryShapeStats(shape)
+    stats.record(duration, rows, callsite)
+
+    if (captured := _captured.get()) is not None:
+        captured.append((sql, tuple(args)))
+
+    if _slow_query_threshold is not None and duration >= _slow_query_threshold:
+        _LOGGER.warning(
+            "Slow query (%.1fms, %d rows) at %s: %s %r",
+            duration * 1000,
+            rows,
+            callsite,
+            _truncate(sql),
+            _redact(sql, args),
+        )
+
+
+class InstrumentedPostgresEngine(engine.PostgresEngine):
+    """A postgres engine that records the latency of every query it runs.
+
+    See :func:`get_query_stats` and :func:`top_queries`. Queries that are
+    sent on a raw asyncpg connection, such as COPY, are not recorded.
+    """
+
+    async def run_querystring(  # noqa: D102
+        self,
+        querystring: QueryString,
+        in_pool: bool = True,  # noqa: FBT001, FBT002
+    ) -> typing.Any:  # noqa: ANN401
+        # NOTE: This mirrors PostgresEngine.run_querystring, such that the
+        #       query is only compiled once.
+        query, query_args = querystring.compile_string(engine_type=self.engine_type)
+
+        query_id = self.get_query_id()
+        if self.log_queries:
+            self.print_query(query_id=query_id, query=querystring.__str__())
+
+        start = time.perf_counter()
+        if current_transaction := self.current_transaction.get():
+            response = await current_transaction.connection.fetch(query, *query_args)
+        elif in_pool and self.pool:
+            response = await self._run_in_pool(query, query_args)
+        else:
+            response = await self._run_in_new_connection(query, query_args)
+        _record(query, query_args, response, start)
+
+        if self.log_responses:
+            self.print_response(query_id=query_id, response=response)
+
+        return response
+
+    async def run_ddl(self, ddl: str, in_pool: bool = True) -> typing.Any:  # noqa: D102, FBT001, FBT002, ANN401
+        start = time.perf_counter()
+        response = await super().run_ddl(ddl, in_pool=in_pool)
+        _record(ddl, (), response, start)
+        return response
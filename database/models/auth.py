@@ -25,7 +25,7 @@ class PlatformUser(table.Table):
     """
 
     id: columns.Serial
-    duffelbag_id = columns.ForeignKey(DuffelbagUser)
+    duffelbag_id = columns.ForeignKey(DuffelbagUser, index=True)
     platform_id = columns.BigInt(null=True, unique=True, index=True)
     platform_name = columns.Varchar(16)
 
@@ -38,7 +38,7 @@ class ArknightsUser(table.Table):
     """The database representation of a user's Arknights authentication data."""
 
     id: columns.Serial
-    duffelbag_id = columns.ForeignKey(DuffelbagUser)
+    duffelbag_id = columns.ForeignKey(DuffelbagUser, index=True)
     channel_uid = columns.Varchar(16)
     yostar_token = columns.Varchar(32)
     server = columns.Varchar(4)
@@ -48,6 +48,10 @@ class ArknightsUser(table.Table):
     # NOTE: As of migration 2023-05-31T10:47:00:954167, there is a composite
     #       unique constraint on (channel_uid, yostar_token) with name
     #       "arknights_user_channel_uid_yostar_token_key".
+    # NOTE: As of migration 2026-10-17T02:57:56:049809, there is a composite
+    #       index on (server, game_uid) with name "arknights_user_server_game_uid",
+    #       and a partial index on (duffelbag_id) WHERE active with name
+    #       "arknights_user_active_duffelbag_id".
 
 
 class ScheduledUserDeletion(table.Table):
@@ -72,6 +76,6 @@ class ScheduledArknightsUserDeletion(table.Table):
     """
 
     id: columns.Serial
-    duffelbag_id = columns.ForeignKey(DuffelbagUser)
+    duffelbag_id = columns.ForeignKey(DuffelbagUser, index=True)
     arknights_id = columns.ForeignKey(ArknightsUser, unique=True)
     deletion_ts = columns.Timestamptz()
@@ -10,6 +10,7 @@ class StaticSkill(table.Table):
     skill_type = columns.Varchar(32)  # Automatically or manually activated.
     sp_type = columns.Varchar(32)  # Offensive recovery, etc.
     duration_type = columns.Varchar(32)  # Normal, instant, unlimited, etc.
+    content_hash = columns.Varchar(32, null=True)  # See StaticTableSpec.hash_of.
 
 
 class StaticSkillLocalisation(table.Table):
@@ -20,6 +21,11 @@ class StaticSkillLocalisation(table.Table):
     locale = columns.Varchar(8)
     name = columns.Varchar(64)
     description = columns.Varchar(1024)
+    content_hash = columns.Varchar(32, null=True)  # See StaticTableSpec.hash_of.
+
+    # NOTE: As of migration 2026-10-17T02:57:56:049809, there is a composite
+    #       index on (skill_id, locale) with name
+    #       "static_skill_localisation_skill_id_locale".
 
 
 class StaticSkillLevel(table.Table):
@@ -32,6 +38,11 @@ class StaticSkillLevel(table.Table):
     charges = columns.SmallInt()
     duration = columns.Decimal(digits=(8, 4))
     level = columns.SmallInt()
+    blackboard = columns.JSONB()  # The values in the skill description, by key.
+    content_hash = columns.Varchar(32, null=True)  # See StaticTableSpec.hash_of.
+
+    # NOTE: As of migration 2026-10-17T02:57:56:049809, there is a composite
+    #       index on (skill_id, level) with name "static_skill_level_skill_id_level".
 
 
 class StaticSkillBlackboard(table.Table):
@@ -41,6 +52,7 @@ class StaticSkillBlackboard(table.Table):
     skill_level_id = columns.ForeignKey(StaticSkillLevel)
     key = columns.Varchar(64)
     value = columns.Decimal(digits=(8, 4))
+    content_hash = columns.Varchar(32, null=True)  # See StaticTableSpec.hash_of.
 
 
 class StaticCharacter(table.Table):
@@ -52,12 +64,14 @@ class StaticCharacter(table.Table):
     profession = columns.Varchar(length=16)
     sub_profession = columns.Varchar(length=16)
     is_alter = columns.Boolean()
+    content_hash = columns.Varchar(32, null=True)  # See StaticTableSpec.hash_of.
 
 
 class StaticTag(table.Table):
     """The database representation of a recruitment tag of an Arknights character."""
 
     name = columns.Varchar(16, primary_key=True)
+    content_hash = columns.Varchar(32, null=True)  # See StaticTableSpec.hash_of.
 
 
 class StaticCharacterSkill(table.Table):
@@ -71,6 +85,7 @@ class StaticCharacterSkill(table.Table):
     skill_num = columns.SmallInt()
     skill_id = columns.ForeignKey(references=StaticSkill)
     display_id = columns.Varchar(64, null=True)
+    content_hash = columns.Varchar(32, null=True)  # See StaticTableSpec.hash_of.
 
 
 class StaticItem(table.Table):
@@ -81,6 +96,7 @@ class StaticItem(table.Table):
     name = columns.Varchar(64)
     description = columns.Varchar(512)
     rarity = columns.SmallInt()
+    content_hash = columns.Varchar(32, null=True)  # See StaticTableSpec.hash_of.
 
 
 class StaticCharacterTag(table.Table):
@@ -92,6 +108,7 @@ class StaticCharacterTag(table.Table):
     id: columns.Serial
     character_id = columns.ForeignKey(StaticCharacter)
     tag_id = columns.ForeignKey(StaticTag)
+    content_hash = columns.Varchar(32, null=True)  # See StaticTableSpec.hash_of.
 
 
 class StaticCharacterElitePhase(table.Table):
@@ -103,8 +120,11 @@ class StaticCharacterElitePhase(table.Table):
     id: columns.Serial
     character_id = columns.ForeignKey(StaticCharacter)
     level = columns.SmallInt()
-
-    # TODO: Elite phase stat blocks
+    # The levels of the stat keyframes, between which stats are interpolated linearly.
+    frame_levels = columns.Array(columns.SmallInt())
+    # The stats at each keyframe, ordered as in database.ELITE_PHASE_STATS.
+    frame_stats = columns.Array(columns.Array(columns.DoublePrecision()))
+    content_hash = columns.Varchar(32, null=True)  # See StaticTableSpec.hash_of.
 
 
 class StaticCharacterElitePhaseItem(table.Table):
@@ -119,6 +139,7 @@ class StaticCharacterElitePhaseItem(table.Table):
     elite_phase_id = columns.ForeignKey(StaticCharacterElitePhase)
     item_id = columns.ForeignKey(StaticItem)
     quantity = columns.SmallInt()
+    content_hash = columns.Varchar(32, null=True)  # See StaticTableSpec.hash_of.
 
 
 class StaticSkillSharedUpgrade(table.Table):
@@ -133,6 +154,7 @@ class StaticSkillSharedUpgrade(table.Table):
     id: columns.Serial
     character_id = columns.ForeignKey(StaticCharacter)
     level = columns.SmallInt()
+    content_hash = columns.Varchar(32, null=True)  # See StaticTableSpec.hash_of.
 
 
 class StaticSkillSharedUpgradeItem(table.Table):
@@ -147,6 +169,7 @@ class StaticSkillSharedUpgradeItem(table.Table):
     skill_upgrade_id = columns.ForeignKey(StaticSkillSharedUpgrade)
     item_id = columns.ForeignKey(StaticItem)
     quantity = columns.SmallInt()
+    content_hash = columns.Varchar(32, null=True)  # See StaticTableSpec.hash_of.
 
 
 class StaticSkillMastery(table.Table):
@@ -158,6 +181,7 @@ class StaticSkillMastery(table.Table):
     id: columns.Serial
     skill_id = columns.ForeignKey(StaticCharacterSkill)
     level = columns.SmallInt()
+    content_hash = columns.Varchar(32, null=True)  # See StaticTableSpec.hash_of.
 
 
 class StaticSkillMasteryItem(table.Table):
@@ -172,6 +196,16 @@ class StaticSkillMasteryItem(table.Table):
     mastery_id = columns.ForeignKey(StaticSkillMastery)
     item_id = columns.ForeignKey(StaticItem)
     quantity = columns.SmallInt()
+    content_hash = columns.Varchar(32, null=True)  # See StaticTableSpec.hash_of.
+
+
+class GamedataVersion(table.Table):
+    """The version of an upstream gamedata table that is loaded into the static tables."""
+
+    name = columns.Varchar(64, primary_key=True)  # The locale and table, e.g. "en_US/skill_table".
+    digest = columns.Varchar(64, null=True)  # See raw_data.download.table_version.
+    etag = columns.Varchar(256, null=True)
+    loaded_at = columns.Timestamptz()
 
 
 # TODO: add modules
@@ -15,7 +15,7 @@ class UserCharacter(table.Table):
 
     id: columns.Serial
     character_id = columns.ForeignKey(references=static.StaticCharacter)
-    user_id = columns.ForeignKey(references=auth.ArknightsUser)
+    user_id = columns.ForeignKey(references=auth.ArknightsUser, index=True)
     main_skill_lvl = columns.SmallInt()
     level = columns.SmallInt()
     exp = columns.SmallInt()  # Max EXP is 31143, max SmallInt is 32767.
@@ -0,0 +1,37 @@
+from piccolo.apps.migrations.auto.migration_manager import MigrationManager
+from piccolo.columns.column_types import JSONB
+from piccolo.columns.indexes import IndexMethod
+
+
+ID = "2026-10-17T02:35:13:008008"
+VERSION = "1.1.1"
+DESCRIPTION = "Store skill blackboards as JSONB on static_skill_level"
+
+
+async def forwards():
+    manager = MigrationManager(
+        migration_id=ID, app_name="database", description=DESCRIPTION
+    )
+
+    manager.add_column(
+        table_class_name="StaticSkillLevel",
+        tablename="static_skill_level",
+        column_name="blackboard",
+        db_column_name="blackboard",
+        column_class_name="JSONB",
+        column_class=JSONB,
+        params={
+            "default": "{}",
+            "null": False,
+            "primary_key": False,
+            "unique": False,
+            "index": False,
+            "index_method": IndexMethod.btree,
+            "choices": None,
+            "db_column_name": None,
+            "secret": False,
+        },
+        schema=None,
+    )
+
+    return manager
@@ -0,0 +1,71 @@
+from piccolo import table
+from piccolo.apps.migrations.auto.migration_manager import MigrationManager
+
+
+ID = "2026-10-17T02:37:02:960812"
+VERSION = "1.1.1"
+DESCRIPTION = "Add materialised view joining character skills, skill levels and localisations"
+
+
+# This is just a dummy table we use to execute raw SQL with:
+class RawTable(table.Table):
+    pass
+
+
+async def forwards():
+    manager = MigrationManager(
+        migration_id=ID, app_name="database", description=DESCRIPTION
+    )
+
+    async def run():
+        # Create the view. This is populated immediately, which is required
+        # for it to be refreshed concurrently. Localisations are left joined,
+        # as not every skill is localised in every locale.
+        await RawTable.raw(
+            "CREATE MATERIALIZED VIEW static_character_skill_level AS"
+            " SELECT"
+            "  character_skill.id AS character_skill_id,"
+            "  character_skill.character_id,"
+            "  character_skill.skill_id,"
+            "  character_skill.skill_num,"
+            "  character_skill.display_id,"
+            "  skill.skill_type,"
+            "  skill.sp_type,"
+            "  skill.duration_type,"
+            "  skill_level.id AS skill_level_id,"
+            "  skill_level.level,"
+            "  skill_level.sp_cost,"
+            "  skill_level.initial_sp,"
+            "  skill_level.charges,"
+            "  skill_level.duration,"
+            "  skill_level.blackboard,"
+            "  localisation.id AS skill_localisation_id,"
+            "  localisation.locale,"
+            "  localisation.name,"
+            "  localisation.description"
+            " FROM static_character_skill AS character_skill"
+            " JOIN static_skill AS skill"
+            "  ON skill.id = character_skill.skill_id"
+            " JOIN static_skill_level AS skill_level"
+            "  ON skill_level.skill_id = skill.id"
+            " LEFT JOIN static_skill_localisation AS localisation"
+            "  ON localisation.skill_id = skill.id;"
+        )
+
+        # Add the unique index required for concurrent refreshes, which also
+        # serves all lookups:
+        await RawTable.raw(
+            "CREATE UNIQUE INDEX static_character_skill_level_key"
+            " ON static_character_skill_level"
+            " (character_id, skill_id, level, locale);"
+        )
+
+    manager.add_raw(run)  # type: ignore
+
+    async def run_backwards():
+        # Remove the view along with its index:
+        await RawTable.raw("DROP MATERIALIZED VIEW static_character_skill_level;")
+
+    manager.add_raw_backwards(run_backwards)  # type: ignore
+
+    return manager
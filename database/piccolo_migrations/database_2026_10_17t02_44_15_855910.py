@@ -0,0 +1,93 @@
+from piccolo.apps.migrations.auto.migration_manager import MigrationManager
+from piccolo.columns.column_types import Array
+from piccolo.columns.column_types import DoublePrecision
+from piccolo.columns.column_types import SmallInt
+from piccolo.columns.indexes import IndexMethod
+
+
+ID = "2026-10-17T02:44:15:855910"
+VERSION = "1.1.1"
+DESCRIPTION = "Store elite phase stat keyframes as arrays on static_character_elite_phase"
+
+
+async def forwards():
+    manager = MigrationManager(
+        migration_id=ID, app_name="database", description=DESCRIPTION
+    )
+
+    manager.add_column(
+        table_class_name="StaticCharacterElitePhase",
+        tablename="static_character_elite_phase",
+        column_name="frame_levels",
+        db_column_name="frame_levels",
+        column_class_name="Array",
+        column_class=Array,
+        params={
+            "base_column": SmallInt(
+                default=0,
+                null=False,
+                primary_key=False,
+                unique=False,
+                index=False,
+                index_method=IndexMethod.btree,
+                choices=None,
+                db_column_name=None,
+                secret=False,
+            ),
+            "default": list,
+            "null": False,
+            "primary_key": False,
+            "unique": False,
+            "index": False,
+            "index_method": IndexMethod.btree,
+            "choices": None,
+            "db_column_name": None,
+            "secret": False,
+        },
+        schema=None,
+    )
+
+    manager.add_column(
+        table_class_name="StaticCharacterElitePhase",
+        tablename="static_character_elite_phase",
+        column_name="frame_stats",
+        db_column_name="frame_stats",
+        column_class_name="Array",
+        column_class=Array,
+        params={
+            "base_column": Array(
+                base_column=DoublePrecision(
+                    default=0.0,
+                    null=False,
+                    primary_key=False,
+                    unique=False,
+                    index=False,
+                    index_method=IndexMethod.btree,
+                    choices=None,
+                    db_column_name=None,
+                    secret=False,
+                ),
+                default=list,
+                null=False,
+                primary_key=False,
+                unique=False,
+                index=False,
+                index_method=IndexMethod.btree,
+                choices=None,
+                db_column_name=None,
+                secret=False,
+            ),
+            "default": list,
+            "null": False,
+            "primary_key": False,
+            "unique": False,
+            "index": False,
+            "index_method": IndexMethod.btree,
+            "choices": None,
+            "db_column_name": None,
+            "secret": False,
+        },
+        schema=None,
+    )
+
+    return manager
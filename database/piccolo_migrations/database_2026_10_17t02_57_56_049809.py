@@ -0,0 +1,108 @@
+from piccolo import table
+from piccolo.apps.migrations.auto.migration_manager import MigrationManager
+from piccolo.columns.column_types import ForeignKey
+
+
+ID = "2026-10-17T02:57:56:049809"
+VERSION = "1.1.1"
+DESCRIPTION = "Add indexes for the predicates of hot auth and user data lookups"
+
+
+# This is just a dummy table we use to execute raw SQL with:
+class RawTable(table.Table):
+    pass
+
+
+async def forwards():
+    manager = MigrationManager(
+        migration_id=ID, app_name="database", description=DESCRIPTION
+    )
+
+    manager.alter_column(
+        table_class_name="ArknightsUser",
+        tablename="arknights_user",
+        column_name="duffelbag_id",
+        db_column_name="duffelbag_id",
+        params={"index": True},
+        old_params={"index": False},
+        column_class=ForeignKey,
+        old_column_class=ForeignKey,
+        schema=None,
+    )
+
+    manager.alter_column(
+        table_class_name="PlatformUser",
+        tablename="platform_user",
+        column_name="duffelbag_id",
+        db_column_name="duffelbag_id",
+        params={"index": True},
+        old_params={"index": False},
+        column_class=ForeignKey,
+        old_column_class=ForeignKey,
+        schema=None,
+    )
+
+    manager.alter_column(
+        table_class_name="ScheduledArknightsUserDeletion",
+        tablename="scheduled_arknights_user_deletion",
+        column_name="duffelbag_id",
+        db_column_name="duffelbag_id",
+        params={"index": True},
+        old_params={"index": False},
+        column_class=ForeignKey,
+        old_column_class=ForeignKey,
+        schema=None,
+    )
+
+    manager.alter_column(
+        table_class_name="UserCharacter",
+        tablename="user_character",
+        column_name="user_id",
+        db_column_name="user_id",
+        params={"index": True},
+        old_params={"index": False},
+        column_class=ForeignKey,
+        old_column_class=ForeignKey,
+        schema=None,
+    )
+
+    async def run():
+        # Add composite index for lookups by server and uid:
+        await RawTable.raw(
+            "CREATE INDEX arknights_user_server_game_uid"
+            " ON arknights_user (server, game_uid);"
+        )
+
+        # Add partial index for active account lookups. Every Duffelbag user
+        # has at most one active account, so this stays tiny:
+        await RawTable.raw(
+            "CREATE INDEX arknights_user_active_duffelbag_id"
+            " ON arknights_user (duffelbag_id)"
+            " WHERE active;"
+        )
+
+        # Add composite index for localisation lookups and joins:
+        await RawTable.raw(
+            "CREATE INDEX static_skill_localisation_skill_id_locale"
+            " ON static_skill_localisation (skill_id, locale);"
+        )
+
+        # Add composite index for skill level lookups:
+        await RawTable.raw(
+            "CREATE INDEX static_skill_level_skill_id_level"
+            " ON static_skill_level (skill_id, level);"
+        )
+
+    manager.add_raw(run)  # type: ignore
+
+    async def run_backwards():
+        await RawTable.raw(
+            "DROP INDEX arknights_user_server_game_uid,"
+            " arknights_user_active_duffelbag_id,"
+            " static_skill_localisation_skill_id_locale,"
+            " static_skill_level_skill_id_level;"
+        )
+
+    manager.add_raw_backwards(run_backwards)  # type: ignore
+
+    return manager
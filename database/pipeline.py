@@ -0,0 +1,169 @@
+"""A minimal scheduler for running interdependent async stages concurrently."""
+
+import asyncio
+import dataclasses
+import graphlib
+import time
+import typing
+
+__all__: typing.Sequence[str] = ("PipelineReport", "Stage", "StageTiming", "run_pipeline")
+
+
+@dataclasses.dataclass(frozen=True)
+class Stage:
+    """A unit of work in a pipeline."""
+
+    name: str
+    """The unique name of this stage."""
+    run: typing.Callable[[], typing.Awaitable[typing.Any]]
+    """The function that performs the work of this stage."""
+    depends_on: typing.Collection[str] = ()
+    """The names of the stages that must finish before this stage can start."""
+
+
+@dataclasses.dataclass(frozen=True)
+class StageTiming:
+    """Timing information of a finished stage, relative to the start of the pipeline."""
+
+    name: str
+    """The name of the stage."""
+    ready: float
+    """The time at which all dependencies of the stage had finished."""
+    start: float
+    """The time at which the stage started running."""
+    end: float
+    """The time at which the stage finished running."""
+
+    @property
+    def duration(self) -> float:
+        """The time spent running the stage."""
+        return self.end - self.start
+
+    @property
+    def queued(self) -> float:
+        """The time spent waiting for a free slot after all dependencies had finished."""
+        return self.start - self.ready
+
+
+@dataclasses.dataclass(frozen=True)
+class PipelineReport:
+    """The results and timings of a finished pipeline."""
+
+    stages: typing.Mapping[str, Stage]
+    """All stages of the pipeline, by name."""
+    results: typing.Mapping[str, typing.Any]
+    """The return value of each stage, by name."""
+    timings: typing.Mapping[str, StageTiming]
+    """The timings of each stage, by name."""
+
+    @property
+    def elapsed(self) -> float:
+        """The total time taken by the pipeline."""
+        return max((timing.end for timing in self.timings.values()), default=0.0)
+
+    def critical_path(self) -> list[StageTiming]:
+        """Get the chain of stages that determined the total time taken by the pipeline.
+
+        Starting from the stage that finished last, this repeatedly follows the
+        dependency that finished last, i.e. the one the stage had to wait for.
+        Speeding up any stage not on this path does not speed up the pipeline.
+        """
+        if not self.timings:
+            return []
+
+        timing = max(self.timings.values(), key=lambda timing: timing.end)
+        path = [timing]
+        while dependencies := self.stages[timing.name].depends_on:
+            timing = max(
+                (self.timings[name] for name in dependencies),
+                key=lambda timing: timing.end,
+            )
+            path.append(timing)
+
+        path.reverse()
+        return path
+
+
+async def run_pipeline(
+    stages: typing.Iterable[Stage],
+    *,
+    concurrency: int | None = None,
+) -> PipelineReport:
+    """Run stages concurrently, starting each stage as soon as its dependencies finish.
+
+    If any stage raises, all other running stages are cancelled and the
+    exception of the stage that failed first is re-raised as-is, rather than
+    wrapped in an :class:`ExceptionGroup`. Exceptions of any stages that
+    failed while being cancelled are discarded.
+
+    Parameters
+    ----------
+    stages:
+        The stages to run.
+    concurrency:
+        The maximum number of stages to run at once. This should not exceed
+        the size of the connection pool if stages acquire a connection. If
+        not provided, the number of concurrent stages is not limited.
+
+    Returns
+    -------
+    :class:`PipelineReport`
+        The results and timings of all stages.
+
+    Raises
+    ------
+    :class:`ValueError`
+        A stage depends on a stage that does not exist.
+    :class:`graphlib.CycleError`
+        The dependencies between the stages contain a cycle.
+
+    """
+    by_name = {stage.name: stage for stage in stages}
+    for stage in by_name.values():
+        if unknown := set(stage.depends_on).difference(by_name):
+            msg = f"Stage {stage.name!r} depends on unknown stages {', '.join(sorted(unknown))}."
+            raise ValueError(msg)
+
+    order = graphlib.TopologicalSorter(
+        {name: stage.depends_on for name, stage in by_name.items()},
+    ).static_order()
+
+    semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+    tasks: dict[str, asyncio.Task[typing.Any]] = {}
+    timings: dict[str, StageTiming] = {}
+    origin = time.perf_counter()
+
+    async def _run(stage: Stage) -> typing.Any:  # noqa: ANN401
+        await asyncio.gather(*(tasks[name] for name in stage.depends_on))
+        ready = time.perf_counter() - origin
+
+        if semaphore:
+            await semaphore.acquire()
+        try:
+            start = time.perf_counter() - origin
+            result = await stage.run()
+            end = time.perf_counter() - origin
+            timings[stage.name] = StageTiming(stage.name, ready, start, end)
+        finally:
+            if semaphore:
+                semaphore.release()
+
+        return result
+
+    try:
+        async with asyncio.TaskGroup() as group:
+            # Dependencies always come first, so their tasks exist by the time
+            # any dependent task is created.
+            for name in order:
+                tasks[name] = group.create_task(_run(by_name[name]), name=name)
+
+    except ExceptionGroup as error:
+        # Exceptions are collected in the order the stages failed in, and
+        # stages depending on the failed stage re-raise the same exception.
+        raise error.exceptions[0] from None
+
+    return PipelineReport(
+        stages=by_name,
+        results={name: task.result() for name, task in tasks.items()},
+        timings=timings,
+    )
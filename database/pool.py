@@ -0,0 +1,306 @@
+"""Lifecycle management of the database connection pool.
+
+Without a running pool, piccolo opens a new connection for every query. The
+bot and scripts should therefore run inside :func:`connection_pool`.
+"""
+
+import asyncio
+import contextlib
+import dataclasses
+import logging
+import os
+import time
+import typing
+
+import asyncpg
+import dotenv
+
+from database import utils
+
+__all__: typing.Sequence[str] = (
+    "PoolConfig",
+    "PoolStats",
+    "check_health",
+    "close_pool",
+    "connection_pool",
+    "get_pool_config",
+    "get_pool_stats",
+    "set_pool_config",
+    "start_pool",
+)
+
+dotenv.load_dotenv()
+
+_LOGGER = logging.getLogger(__name__)
+
+_HEALTH_CHECK_QUERY: typing.Final[str] = "SELECT 1"
+
+
+@dataclasses.dataclass(frozen=True)
+class PoolConfig:
+    """The configuration of the database connection pool."""
+
+    min_size: int = 1
+    """The number of connections the pool keeps open, even when they are idle."""
+    max_size: int = 10
+    """The maximum number of connections the pool opens at once."""
+    idle_timeout: float = 300.0
+    """The time in seconds after which idle connections above :attr:`min_size` are closed."""
+    drain_timeout: float = 10.0
+    """The time in seconds to wait for connections in use to be released when closing the pool.
+
+    Connections that are still in use afterwards are terminated.
+    """
+
+    def __post_init__(self) -> None:
+        if not 0 <= self.min_size <= self.max_size:
+            msg = f"Invalid pool size {self.min_size}-{self.max_size}."
+            raise ValueError(msg)
+
+    @classmethod
+    def from_env(cls) -> "PoolConfig":
+        """Read the pool configuration from the ``DB_POOL_*`` environment variables.
+
+        Variables that are not set keep their default value.
+        """
+        default = cls()
+        return cls(
+            min_size=int(os.environ.get("DB_POOL_MIN_SIZE") or default.min_size),
+            max_size=int(os.environ.get("DB_POOL_MAX_SIZE") or default.max_size),
+            idle_timeout=float(os.environ.get("DB_POOL_IDLE_TIMEOUT") or default.idle_timeout),
+            drain_timeout=float(os.environ.get("DB_POOL_DRAIN_TIMEOUT") or default.drain_timeout),
+        )
+
+
+@dataclasses.dataclass(frozen=True)
+class PoolStats:
+    """A snapshot of the usage of the database connection pool."""
+
+    size: int
+    """The number of open connections."""
+    idle: int
+    """The number of open connections that are not in use."""
+    min_size: int
+    """The configured minimum number of connections."""
+    max_size: int
+    """The configured maximum number of connections."""
+    acquisitions: int
+    """The number of times a connection was acquired since the pool was started."""
+    peak_in_use: int
+    """The largest number of connections that were in use at once since the pool was started.
+
+    If this reaches :attr:`max_size`, queries may have had to wait for a free connection.
+    """
+
+    @property
+    def in_use(self) -> int:
+        """The number of open connections that are in use."""
+        return self.size - self.idle
+
+
+_config: PoolConfig = PoolConfig.from_env()
+_running_config: PoolConfig | None = None
+_acquisitions: int = 0
+_peak_in_use: int = 0
+
+
+def get_pool_config() -> PoolConfig:
+    """Get the configuration used when starting the connection pool.
+
+    By default, this is read from the environment, see :meth:`PoolConfig.from_env`.
+    """
+    return _config
+
+
+def set_pool_config(config: PoolConfig) -> None:
+    """Set the configuration used when starting the connection pool.
+
+    This does not affect a pool that is already running.
+    """
+    global _config  # noqa: PLW0603
+
+    _config = config
+
+
+def _get_pool() -> asyncpg.Pool:
+    pool = utils.get_db().pool
+    if not pool:
+        msg = "The connection pool is not running."
+        raise RuntimeError(msg)
+
+    return pool
+
+
+async def _on_acquire(_: asyncpg.Connection) -> None:
+    global _acquisitions, _peak_in_use  # noqa: PLW0603
+
+    # The connection being acquired is not yet marked as in use at this point.
+    pool = _get_pool()
+    _acquisitions += 1
+    _peak_in_use = max(_peak_in_use, pool.get_size() - pool.get_idle_size() + 1)
+
+
+async def check_health(*, max_wait: float = 5.0) -> float:
+    """Check that the database can be queried through the connection pool.
+
+    Parameters
+    ----------
+    max_wait:
+        The maximum time in seconds to wait for a connection and the result.
+
+    Returns
+    -------
+    :class:`float`
+        The round-trip time of the query in seconds, including the time spent
+        waiting for a free connection.
+
+    Raises
+    ------
+    :class:`RuntimeError`
+        The connection pool is not running.
+    :class:`TimeoutError`
+        The database did not respond in time.
+
+    """
+    start = time.perf_counter()
+    await asyncio.wait_for(_get_pool().fetchval(_HEALTH_CHECK_QUERY), max_wait)
+    return time.perf_counter() - start
+
+
+async def _warm_up(pool: asyncpg.Pool, size: int) -> None:
+    # Hold all connections at once, such that each of them is checked rather
+    # than the same one being reused.
+    async with contextlib.AsyncExitStack() as stack:
+        connections = await asyncio.gather(
+            *(stack.enter_async_context(pool.acquire()) for _ in range(size)),
+        )
+        await asyncio.gather(
+            *(connection.fetchval(_HEALTH_CHECK_QUERY) for connection in connections),
+        )
+
+
+async def start_pool(config: PoolConfig | None = None) -> None:
+    """Start the connection pool, and wait until it is ready to serve queries.
+
+    All :attr:`PoolConfig.min_size` connections are opened and checked with a
+    health-check query before this returns, such that connection problems
+    surface at startup rather than on the first query.
+
+    If a read replica is configured, a pool of the same size is started for
+    it as well.
+
+    Parameters
+    ----------
+    config:
+        The configuration of the pool. Defaults to :func:`get_pool_config`.
+
+    """
+    global _running_config, _acquisitions, _peak_in_use  # noqa: PLW0603
+
+    config = config or _config
+    db = utils.get_db()
+    await db.start_connection_pool(
+        min_size=config.min_size,
+        max_size=config.max_size,
+        max_inactive_connection_lifetime=config.idle_timeout,
+        setup=_on_acquire,
+    )
+
+    # The read replica gets a pool of the same size, but its usage is not counted.
+    replica = utils.get_db(replica=True)
+    try:
+        await _warm_up(_get_pool(), config.min_size)
+
+        if replica is not db:
+            await replica.start_connection_pool(
+                min_size=config.min_size,
+                max_size=config.max_size,
+                max_inactive_connection_lifetime=config.idle_timeout,
+            )
+            await _warm_up(typing.cast(asyncpg.Pool, replica.pool), config.min_size)
+    except BaseException:
+        await db.close_connection_pool()
+        if replica is not db and replica.pool:
+            await replica.close_connection_pool()
+        raise
+
+    # Only count actual usage, not the warm-up.
+    _acquisitions = _peak_in_use = 0
+    _running_config = config
+
+    _LOGGER.info("Started connection pool of %d-%d connections.", config.min_size, config.max_size)
+
+
+async def _drain(pool: asyncpg.Pool, drain_timeout: float) -> None:
+    try:
+        await asyncio.wait_for(pool.close(), drain_timeout)
+    except TimeoutError:
+        _LOGGER.warning("Connection pool did not drain in %.1fs, terminating it.", drain_timeout)
+        pool.terminate()
+
+
+async def close_pool(*, drain_timeout: float | None = None) -> None:
+    """Close the connection pool, waiting for connections in use to be released first.
+
+    Parameters
+    ----------
+    drain_timeout:
+        The maximum time in seconds to wait for connections to be released,
+        after which they are terminated. Defaults to the :attr:`PoolConfig.drain_timeout`
+        the pool was started with.
+
+    """
+    global _running_config  # noqa: PLW0603
+
+    pool = _get_pool()
+    if drain_timeout is None:
+        drain_timeout = (_running_config or _config).drain_timeout
+
+    db, replica = utils.get_db(), utils.get_db(replica=True)
+    try:
+        await asyncio.gather(
+            _drain(pool, drain_timeout),
+            *([_drain(replica.pool, drain_timeout)] if replica is not db and replica.pool else []),
+        )
+    finally:
+        db.pool = replica.pool = None
+        _running_config = None
+
+
+def get_pool_stats() -> PoolStats:
+    """Get a snapshot of the usage of the running connection pool.
+
+    Raises
+    ------
+    :class:`RuntimeError`
+        The connection pool is not running.
+
+    """
+    pool = _get_pool()
+    return PoolStats(
+        size=pool.get_size(),
+        idle=pool.get_idle_size(),
+        min_size=pool.get_min_size(),
+        max_size=pool.get_max_size(),
+        acquisitions=_acquisitions,
+        peak_in_use=_peak_in_use,
+    )
+
+
+@contextlib.asynccontextmanager
+async def connection_pool(config: PoolConfig | None = None) -> typing.AsyncIterator[None]:
+    """Run the connection pool for the duration of the context.
+
+    See :func:`start_pool` and :func:`close_pool`.
+
+    Parameters
+    ----------
+    config:
+        The configuration of the pool. Defaults to :func:`get_pool_config`.
+
+    """
+    await start_pool(config)
+    try:
+        yield
+    finally:
+        await close_pool()
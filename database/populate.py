@@ -1,16 +1,351 @@
-"""Utility functions to populate the database with static character data."""
-
+"""Utility functions to populate the database with static character data.
+
+Rather than rewriting every row, the functions in this module compare the
+provided gamedata against the current contents of the static tables and only
+write the rows that were added, changed or removed (see :mod:`database.delta`).
+Alternatively, :func:`populate_shadowed` replaces all static tables at once
+(see :mod:`database.shadow`).
+"""
+
+import asyncio
+import functools
+import os
 import typing
 
+import dotenv
+
 import database
 import raw_data
+from database import specs
+
+dotenv.load_dotenv()
+
+_T = typing.TypeVar("_T")
+
+
+def _blackboard_rows_from_env() -> bool:
+    return os.environ.get("STATIC_BLACKBOARD_ROWS", "").lower() not in ("0", "false")
+
+
+_blackboard_rows: bool = _blackboard_rows_from_env()
+
+
+def get_blackboard_rows() -> bool:
+    """Get whether skill blackboards are also stored as rows of 'static_skill_blackboard'.
+
+    Blackboards are always stored on 'static_skill_level' as a JSONB object,
+    which is far more compact. The rows are still stored by default, such
+    that anything reading them keeps working until it reads the JSONB object
+    instead.
+
+    By default, this is read from the ``STATIC_BLACKBOARD_ROWS`` environment
+    variable, and is enabled unless it is set to ``0`` or ``false``.
+    """
+    return _blackboard_rows
+
+
+def set_blackboard_rows(enabled: bool) -> None:  # noqa: FBT001
+    """Set whether skill blackboards are also stored as rows of 'static_skill_blackboard'.
+
+    Disabling this removes all existing rows on the next repopulate.
+    """
+    global _blackboard_rows  # noqa: PLW0603
+
+    _blackboard_rows = enabled
+
+
+STATIC_SOURCES: typing.Final[typing.Sequence[str]] = ("items", "tags", "skills", "characters")
+"""The gamedata sources the static tables are populated from, in dependency order."""
+
+_SKILL_SPECS: typing.Final[typing.Sequence[specs.StaticTableSpec]] = (
+    specs.SKILL,
+    specs.SKILL_LOCALISATION,
+    specs.SKILL_LEVEL,
+    specs.SKILL_BLACKBOARD,
+)
+_CHARACTER_SPECS: typing.Final[typing.Sequence[specs.StaticTableSpec]] = (
+    specs.CHARACTER,
+    specs.CHARACTER_TAG,
+    specs.CHARACTER_SKILL,
+    specs.CHARACTER_ELITE_PHASE,
+    specs.CHARACTER_ELITE_PHASE_ITEM,
+    specs.SKILL_SHARED_UPGRADE,
+    specs.SKILL_SHARED_UPGRADE_ITEM,
+    specs.SKILL_MASTERY,
+    specs.SKILL_MASTERY_ITEM,
+)
+
+
+async def _collect(iterable: typing.AsyncIterable[_T]) -> list[_T]:
+    return [item async for item in iterable]
+
+
+def _tag_rows(raw_tags: typing.Iterable[raw_data.RawTag]) -> list[specs.Row]:
+    return [{"name": tag.name} for tag in raw_tags]
+
+
+def _item_rows(raw_items: typing.Iterable[raw_data.RawItem]) -> list[specs.Row]:
+    return [
+        {
+            "id": item.id,
+            "icon_id": item.icon_id,
+            "name": item.name,
+            "description": item.description,
+            "rarity": item.rarity,
+        }
+        for item in raw_items
+    ]
+
+
+def _cost_rows(
+    spec: specs.StaticTableSpec,
+    parent_row: specs.Row,
+    cost: typing.Sequence[raw_data.models.character.RawItem] | None,
+) -> typing.Iterator[specs.Row]:
+    # Cost rows reference the row they belong to through its natural key.
+    assert spec.parent
+    fk, parent = spec.parent
+    parent_key = {f"{fk}.{path}": parent_row[path] for path in parent.key}
+
+    for item in cost or ():
+        yield {**parent_key, "item_id": item.id, "quantity": item.count}
+
+
+def _frame_columns(
+    raw_frames: typing.Iterable[typing.Any],
+) -> tuple[list[int], list[list[float]]]:
+    # Read the stats straight from the raw keyframes, such that the lazily
+    # validated frames of every phase need not be validated just to be stored.
+    fields = raw_data.models.character.RawCharacterAttributes.model_fields
+    keys = [fields[stat].alias or stat for stat in database.ELITE_PHASE_STATS]
+
+    levels: list[int] = []
+    stats: list[list[float]] = []
+    for frame in raw_frames:
+        levels.append(int(frame["level"]))
+        stats.append([float(frame["data"][key]) for key in keys])
+
+    return levels, stats
+
+
+def _character_rows(
+    raw_characters: typing.Iterable[raw_data.RawCharacter],
+) -> dict[specs.StaticTableSpec, list[specs.Row]]:
+    rows: dict[specs.StaticTableSpec, list[specs.Row]] = {spec: [] for spec in _CHARACTER_SPECS}
+
+    for raw_character in raw_characters:
+        character_id = raw_character.id
+
+        rows[specs.CHARACTER].append(
+            {
+                "id": character_id,
+                "name": raw_character.name,
+                "rarity": raw_character.rarity,
+                "profession": raw_character.profession,
+                "sub_profession": raw_character.sub_profession,
+                "is_alter": raw_character.is_alter,
+            },
+        )
+
+        rows[specs.CHARACTER_TAG].extend(
+            {"character_id": character_id, "tag_id": tag}
+            for tag in raw_character.tags
+        )  # fmt: skip
+
+        for num, skill in enumerate(raw_character.skills, start=1):
+            rows[specs.CHARACTER_SKILL].append(
+                {
+                    "character_id": character_id,
+                    "skill_id": skill.id,
+                    "skill_num": num,
+                    "display_id": skill.display_id or skill.id,
+                },
+            )
+
+            for level, mastery in enumerate(skill.masteries or (), start=1):
+                mastery_row = {
+                    "skill_id.character_id": character_id,
+                    "skill_id.skill_id": skill.id,
+                    "level": level,
+                }
+                rows[specs.SKILL_MASTERY].append(mastery_row)
+                rows[specs.SKILL_MASTERY_ITEM].extend(
+                    _cost_rows(specs.SKILL_MASTERY_ITEM, mastery_row, mastery.cost),
+                )
+
+        # E0 has no cost, but its stats are needed all the same.
+        for level, elite_phase in enumerate(raw_character.phases):
+            frame_levels, frame_stats = _frame_columns(elite_phase.raw_frames)
+            elite_phase_row = {
+                "character_id": character_id,
+                "level": level,
+                "frame_levels": frame_levels,
+                "frame_stats": frame_stats,
+            }
+            rows[specs.CHARACTER_ELITE_PHASE].append(elite_phase_row)
+            rows[specs.CHARACTER_ELITE_PHASE_ITEM].extend(
+                _cost_rows(specs.CHARACTER_ELITE_PHASE_ITEM, elite_phase_row, elite_phase.cost),
+            )
+
+        for level, shared_skill_upgrade in enumerate(raw_character.shared_skills, start=1):
+            shared_skill_upgrade_row = {"character_id": character_id, "level": level}
+            rows[specs.SKILL_SHARED_UPGRADE].append(shared_skill_upgrade_row)
+            rows[specs.SKILL_SHARED_UPGRADE_ITEM].extend(
+                _cost_rows(
+                    specs.SKILL_SHARED_UPGRADE_ITEM,
+                    shared_skill_upgrade_row,
+                    shared_skill_upgrade.cost,
+                ),
+            )
+
+    return rows
+
+
+def _skill_rows(
+    raw_skills: typing.Iterable[raw_data.RawSkill],
+    locale: str,
+) -> dict[specs.StaticTableSpec, list[specs.Row]]:
+    rows: dict[specs.StaticTableSpec, list[specs.Row]] = {spec: [] for spec in _SKILL_SPECS}
+
+    for raw_skill in raw_skills:
+        rows[specs.SKILL].append(
+            {
+                "id": raw_skill.id,
+                "skill_type": raw_skill.levels[0].skill_type,
+                "duration_type": raw_skill.levels[0].duration_type,
+                "sp_type": raw_skill.levels[0].sp_data.type,
+            },
+        )
+
+        rows[specs.SKILL_LOCALISATION].append(
+            {
+                "skill_id": raw_skill.id,
+                "locale": locale,
+                "name": raw_skill.levels[0].name,
+                "description": raw_skill.levels[0].description,
+            },
+        )
+
+        for level_num, level in enumerate(raw_skill.levels, start=1):
+            rows[specs.SKILL_LEVEL].append(
+                {
+                    "skill_id": raw_skill.id,
+                    "level": level_num,
+                    "sp_cost": level.sp_data.cost,
+                    "initial_sp": level.sp_data.initial,
+                    "charges": level.sp_data.charges,
+                    "duration": level.duration,
+                    "blackboard": {entry.key: entry.value for entry in level.blackboard},
+                },
+            )
+
+            # Stale rows are still removed when this is disabled, as the table
+            # is always part of the delta.
+            if not _blackboard_rows:
+                continue
+
+            rows[specs.SKILL_BLACKBOARD].extend(
+                {
+                    "skill_level_id.skill_id": raw_skill.id,
+                    "skill_level_id.level": level_num,
+                    "key": blackboard_entry.key,
+                    "value": blackboard_entry.value,
+                }
+                for blackboard_entry in level.blackboard
+            )
+
+    return rows
+
+
+def _skill_localisation_rows(
+    localisations: typing.Mapping[str, typing.Iterable[raw_data.RawSkillLocalisation]],
+    skill_ids: typing.Container[str],
+) -> list[specs.Row]:
+    return [
+        {
+            "skill_id": skill.id,
+            "locale": locale,
+            "name": skill.levels[0].name,
+            "description": skill.levels[0].description,
+        }
+        for locale, skills in localisations.items()
+        for skill in skills
+        # Skip skills that are not (yet) in the shared skill data.
+        if skill.id in skill_ids
+    ]
+
+
+def _localised_skill_rows(
+    raw_skills: typing.Iterable[raw_data.RawSkill],
+    locale: str,
+    localisations: typing.Mapping[str, typing.Iterable[raw_data.RawSkillLocalisation]],
+) -> dict[specs.StaticTableSpec, list[specs.Row]]:
+    rows = _skill_rows(raw_skills, locale)
+
+    # Write the localisations for all locales in a single delta.
+    skill_ids = {row["skill_id"] for row in rows[specs.SKILL_LOCALISATION]}
+    rows[specs.SKILL_LOCALISATION].extend(_skill_localisation_rows(localisations, skill_ids))
+    return rows
+
+
+def _localisation_filter(
+    locale: str,
+    localisations: typing.Mapping[str, typing.Any],
+) -> dict[specs.StaticTableSpec, typing.Any]:
+    # Leave localisations for locales that were not provided untouched.
+    return {
+        specs.SKILL_LOCALISATION: database.StaticSkillLocalisation.locale.is_in(
+            [locale, *localisations],
+        ),
+    }
+
+
+async def _fetch_skills(
+    locale: str,
+    localisations: typing.Mapping[str, typing.Sequence[raw_data.RawSkillLocalisation]] | None,
+) -> tuple[
+    typing.Sequence[raw_data.RawSkill],
+    typing.Mapping[str, typing.Sequence[raw_data.RawSkillLocalisation]] | None,
+]:
+    # Stream the skills such that the raw response is never held in memory
+    # alongside the parsed models. Only the text is parsed for all other
+    # locales, as the rest of the skill data is shared between them.
+    if localisations is not None:
+        return await _collect(raw_data.stream_skills(locale=locale)), localisations
+
+    return await asyncio.gather(
+        _collect(raw_data.stream_skills(locale=locale)),
+        raw_data.fetch_skill_localisations(
+            locales=[other for other in raw_data.download.LOCALES if other != locale],
+        ),
+    )
+
+
+async def _populate(
+    rows: dict[specs.StaticTableSpec, list[specs.Row]],
+    *,
+    where: dict[specs.StaticTableSpec, typing.Any] | None = None,
+    dry_run: bool = False,
+) -> typing.Sequence[database.TableDelta]:
+    where = where or {}
+    deltas = [
+        await database.compute_delta(spec, rows[spec], where=where.get(spec))
+        for spec in database.STATIC_TABLES
+        if spec in rows
+    ]
+
+    if not dry_run:
+        await database.apply_deltas(deltas)
+
+    return deltas
 
 
 async def populate_tags(
     raw_tags: typing.Sequence[raw_data.RawTag] | None = None,
     *,
     clean: bool = False,
-) -> None:
+    dry_run: bool = False,
+) -> typing.Sequence[database.TableDelta]:
     """Populate the 'tag' table in the database.
 
     Parameters
@@ -19,23 +354,27 @@ async def populate_tags(
         The raw tag data to process into database rows. If not provided, the
         tags will be fetched anew.
     clean:
-        Whether to clear the 'tag' table before repopulating it. This could be
-        used to get rid of any stale/removed tags (probably never needed).
+        Whether to clear the 'tag' table before repopulating it. Stale tags
+        are removed regardless, so this should never be needed.
+    dry_run:
+        Whether to only compute the changes without writing anything. This
+        also skips clearing the table.
+
+    Returns
+    -------
+    Sequence[:class:`database.TableDelta`]
+        The changes that were written to the database, or would have been
+        written in case of a dry run.
 
     """
     if not raw_tags:
         raw_tags = await raw_data.fetch_tags()
 
-    if clean:
+    if clean and not dry_run:
         # Delete all existing tags...
         await database.StaticTag.delete(force=True)
 
-    # Re-populate tags...
-    await database.StaticTag.insert(
-        *[database.StaticTag(name=tag.name) for tag in raw_tags],
-    ).on_conflict(
-        action="DO NOTHING",
-    )
+    return await _populate({specs.TAG: _tag_rows(raw_tags)}, dry_run=dry_run)
 
 
 # TODO: Localisation.
@@ -43,7 +382,8 @@ async def populate_items(
     raw_items: typing.Sequence[raw_data.RawItem] | None = None,
     *,
     clean: bool = False,
-) -> None:
+    dry_run: bool = False,
+) -> typing.Sequence[database.TableDelta]:
     """Populate the 'item' table in the database.
 
     Parameters
@@ -52,44 +392,38 @@ async def populate_items(
         The raw item data to process into database rows. If not provided, the
         items will be fetched anew.
     clean:
-        Whether to clear the 'item' table before repopulating it. This could be
-        used to get rid of any stale/removed items (probably never needed).
+        Whether to clear the 'item' table before repopulating it. Stale items
+        are removed regardless, so this should never be needed.
+    dry_run:
+        Whether to only compute the changes without writing anything. This
+        also skips clearing the table.
+
+    Returns
+    -------
+    Sequence[:class:`database.TableDelta`]
+        The changes that were written to the database, or would have been
+        written in case of a dry run.
 
     """
     if not raw_items:
         raw_items = await raw_data.fetch_items()
 
-    if clean:
-        # Delete all existing tags...
+    if clean and not dry_run:
+        # Delete all existing items...
         await database.StaticItem.delete(force=True)
 
-    # Re-populate tags...
-    await database.StaticItem.insert(
-        *[
-            database.StaticItem(
-                id=item.id,
-                icon_id=item.icon_id,
-                name=item.name,
-                description=item.description,
-                rarity=item.rarity,
-            )
-            for item in raw_items
-        ],
-    ).on_conflict(
-        action="DO UPDATE",
-        target=database.StaticItem.id,
-        values=database.StaticItem.all_columns(),
-    )
+    return await _populate({specs.ITEM: _item_rows(raw_items)}, dry_run=dry_run)
 
 
 async def populate_characters(
     raw_characters: typing.Sequence[raw_data.RawCharacter] | None = None,
     *,
     clean: bool = False,
-) -> None:
+    dry_run: bool = False,
+) -> typing.Sequence[database.TableDelta]:
     """Populate the 'character' table in the database along with all its dependencies.
 
-    This includes the 'skill', 'character_tag', 'character_elite_phase',
+    This includes the 'character_skill', 'character_tag', 'character_elite_phase',
     'character_elite_phase_item', 'skill_shared_upgrade', 'skill_shared_upgrade_item',
     'skill_mastery' and 'skill_mastery_item' tables.
 
@@ -97,293 +431,230 @@ async def populate_characters(
     ----------
     raw_characters:
         The raw character data to process into database rows. If not provided,
-        the characters will be fetched anew.
+        the characters will be fetched anew. This should always contain all
+        characters, as rows of characters that are not provided are removed.
     clean:
         Whether to clear the aforementioned tables before repopulating them.
-        This could be used to get rid of any stale/removed items (probably
-        never needed).
-        More useful is that it ensures no duplicate meta-entries are created
-        while we wait for composite unique constraints to be added to piccolo.
+        Stale rows are removed regardless, so this should never be needed.
+    dry_run:
+        Whether to only compute the changes without writing anything. This
+        also skips clearing the tables.
+
+    Returns
+    -------
+    Sequence[:class:`database.TableDelta`]
+        The changes that were written to the database, or would have been
+        written in case of a dry run.
 
     """
     if not raw_characters:
-        raw_characters = await raw_data.fetch_characters()
+        # Stream the characters such that the raw response is never held in
+        # memory alongside the parsed models.
+        raw_characters = await _collect(raw_data.stream_characters())
 
-    if clean:
+    if clean and not dry_run:
         # This should cascade to all other tables. Thanks, foreignkeys.
         await database.StaticCharacter.delete(force=True)
 
-    characters: list[database.StaticCharacter] = []
-    tags: list[database.StaticCharacterTag] = []
-    skills: dict[database.StaticCharacterSkill, raw_data.RawCharacterSkill] = {}
-    elite_phases: dict[database.StaticCharacterElitePhase, raw_data.RawPhase] = {}
-    shared_skill_upgrades: dict[database.StaticSkillSharedUpgrade, raw_data.RawSharedSkillCost] = {}
-
-    for raw_character in raw_characters:
-        character = database.StaticCharacter(
-            id=raw_character.id,
-            name=raw_character.name,
-            rarity=raw_character.rarity,
-            profession=raw_character.profession,
-            sub_profession=raw_character.sub_profession,
-            is_alter=raw_character.is_alter,
-        )
-
-        characters.append(character)
-
-        tags.extend(
-            database.StaticCharacterTag(
-                character_id=character.id,
-                tag_id=tag,
-            )
-            for tag in raw_character.tags
-        )
-
-        skills |= {
-            database.StaticCharacterSkill(
-                character_id=character.id,
-                skill_id=skill.id,
-                skill_num=num,
-                display_id=skill.display_id or skill.id,
-            ): skill
-            for num, skill in enumerate(raw_character.skills, start=1)
-        }
-
-        # TODO: (maybe) store E0
-        elite_phases |= {
-            database.StaticCharacterElitePhase(
-                character_id=character.id,
-                level=level,
-            ): elite_phase
-            for level, elite_phase in enumerate(raw_character.phases[1:], start=1)
-        }
-
-        shared_skill_upgrades |= {
-            database.StaticSkillSharedUpgrade(
-                character_id=character.id,
-                level=level,
-            ): shared_skill_upgrade
-            for level, shared_skill_upgrade in enumerate(raw_character.shared_skills, start=1)
-        }
-
-    await (
-        database.StaticCharacter.insert(*characters)
-        .on_conflict(
-            action="DO UPDATE",
-            target=database.StaticCharacter.id,
-            values=database.all_columns_but_pk(database.StaticCharacter),
-        )
-    )  # fmt: skip
-
-    await (
-        database.StaticCharacterTag.insert(*tags)
-        .on_conflict(
-            action="DO UPDATE",
-            # A given character can only have the same tag once.
-            target=(database.StaticCharacterTag.character_id, database.StaticCharacterTag.tag_id),
-            values=database.all_columns_but_pk(database.StaticCharacterTag),
-        )
-    )  # fmt: skip
-
-    await (
-        database.StaticCharacterSkill.insert(*skills.keys())
-        .on_conflict(
-            action="DO UPDATE",
-            target=database.StaticCharacterSkill.id,
-            values=database.all_columns_but_pk(database.StaticCharacterSkill),
-        )
-    )  # fmt: skip
-
-    await (
-        database.StaticCharacterElitePhase.insert(*elite_phases.keys())
-        .on_conflict(
-            action="DO UPDATE",
-            target=(
-                database.StaticCharacterElitePhase.character_id,
-                database.StaticCharacterElitePhase.level,
-            ),
-            values=database.all_columns_but_pk(database.StaticCharacterElitePhase),
-        )
-    )  # fmt: skip
-
-    await (
-        database.StaticSkillSharedUpgrade.insert(*shared_skill_upgrades.keys())
-        .on_conflict(
-            action="DO UPDATE",
-            target=(
-                database.StaticSkillSharedUpgrade.character_id,
-                database.StaticSkillSharedUpgrade.level,
-            ),
-            values=database.all_columns_but_pk(database.StaticSkillSharedUpgrade),
-        )
-    )  # fmt: skip
-
-    # Parse masteries...
-    skill_masteries: dict[database.StaticSkillMastery, raw_data.RawSkillCost] = {
-        database.StaticSkillMastery(
-            skill_id=skill.id,
-            level=level,
-        ): mastery
-        for skill, raw_skill in skills.items()
-        if raw_skill.masteries
-        for level, mastery in enumerate(raw_skill.masteries, start=1)
-    }
-
-    await (
-        database.StaticSkillMastery.insert(*skill_masteries.keys())
-        .on_conflict(
-            action="DO UPDATE",
-            target=(
-                database.StaticSkillMastery.skill_id,
-                database.StaticSkillMastery.level,
-            ),
-            values=database.all_columns_but_pk(database.StaticSkillMastery),
-        )
-    )  # fmt: skip
-
-    # Parse mastery costs...
-    await database.StaticSkillMasteryItem.insert(
-        *[
-            database.StaticSkillMasteryItem(
-                mastery_id=mastery.id,
-                item_id=item.id,
-                quantity=item.count,
-            )
-            for mastery, raw_mastery in skill_masteries.items()
-            if raw_mastery.cost
-            for item in raw_mastery.cost
-        ],
-    ).on_conflict(
-        action="DO UPDATE",
-        target=(
-            database.StaticSkillMasteryItem.mastery_id,
-            database.StaticSkillMasteryItem.item_id,
-        ),
-        values=database.all_columns_but_pk(database.StaticSkillMasteryItem),
-    )
-
-    # Parse elite level costs...
-    await database.StaticCharacterElitePhaseItem.insert(
-        *[
-            database.StaticCharacterElitePhaseItem(
-                elite_phase_id=elite_phase.id,
-                item_id=item.id,
-                quantity=item.count,
-            )
-            for elite_phase, raw_elite_phase in elite_phases.items()
-            if raw_elite_phase.cost
-            for item in raw_elite_phase.cost
-        ],
-    ).on_conflict(
-        action="DO UPDATE",
-        target=(
-            database.StaticCharacterElitePhaseItem.elite_phase_id,
-            database.StaticCharacterElitePhaseItem.item_id,
-        ),
-        values=database.all_columns_but_pk(database.StaticCharacterElitePhaseItem),
-    )
-
-    # Parse shared skill upgrades...
-    await database.StaticSkillSharedUpgradeItem.insert(
-        *[
-            database.StaticSkillSharedUpgradeItem(
-                skill_upgrade_id=shared_skill_upgrade.id,
-                item_id=item.id,
-                quantity=item.count,
-            )
-            for shared_skill_upgrade, raw_shared_skill_upgrade in shared_skill_upgrades.items()
-            if raw_shared_skill_upgrade.cost
-            for item in raw_shared_skill_upgrade.cost
-        ],
-    ).on_conflict(
-        action="DO UPDATE",
-        target=(
-            # A given elite phase can only contain the same item type once.
-            database.StaticSkillSharedUpgradeItem.skill_upgrade_id,
-            database.StaticSkillSharedUpgradeItem.item_id,
-        ),
-        values=database.all_columns_but_pk(database.StaticSkillSharedUpgradeItem),
-    )
+    return await _populate(_character_rows(raw_characters), dry_run=dry_run)
 
 
 async def populate_skills(
     raw_skills: typing.Sequence[raw_data.RawSkill] | None = None,
     *,
     locale: str = "en_US",
+    localisations: typing.Mapping[str, typing.Sequence[raw_data.RawSkillLocalisation]]
+    | None = None,
     clean: bool = False,
-) -> None:
+    dry_run: bool = False,
+) -> typing.Sequence[database.TableDelta]:
     """Populate the 'static_skill' table in the database along with all its dependencies.
 
     Parameters
     ----------
     raw_skills:
         The raw skill data to process into database rows. If not provided,
-        the skills will be fetched anew.
+        the skills will be fetched anew. This should always contain all
+        skills, as rows of skills that are not provided are removed.
     locale:
-        The locale for which to store skill information.
+        The locale of the raw skill data. Localisations for this locale are
+        taken from the raw skill data directly.
+    localisations:
+        The localised skill text for any additional locales. If not provided
+        along with the raw skills, the localisations for all other locales
+        in :data:`raw_data.download.LOCALES` are fetched concurrently with
+        the raw skills. Localisations for locales that are not provided are
+        left untouched.
     clean:
         Whether to clear the aforementioned tables before repopulating them.
-        This could be used to get rid of any stale/removed items (probably
-        never needed).
-        More useful is that it ensures no duplicate meta-entries are created
-        while we wait for composite unique constraints to be added to piccolo.
+        Stale rows are removed regardless, so this should never be needed.
+    dry_run:
+        Whether to only compute the changes without writing anything. This
+        also skips clearing the tables.
+
+    Returns
+    -------
+    Sequence[:class:`database.TableDelta`]
+        The changes that were written to the database, or would have been
+        written in case of a dry run.
 
     """
     if not raw_skills:
-        raw_skills = await raw_data.fetch_skills()
+        raw_skills, localisations = await _fetch_skills(locale, localisations)
 
-    if clean:
+    localisations = localisations or {}
+
+    if clean and not dry_run:
         await database.StaticSkill.delete(force=True)
 
-    skills = [
-        database.StaticSkill(
-            id=skill.id,
-            skill_type=skill.levels[0].skill_type,
-            duration_type=skill.levels[0].duration_type,
-            sp_type=skill.levels[0].sp_data.type,
+    return await _populate(
+        _localised_skill_rows(raw_skills, locale, localisations),
+        where=_localisation_filter(locale, localisations),
+        dry_run=dry_run,
+    )
+
+
+async def populate_shadowed(snapshot: raw_data.Snapshot | None = None) -> dict[str, int]:
+    """Replace the contents of all static tables at once without ever exposing partial data.
+
+    Unlike the other populate functions, this loads all gamedata into shadow
+    tables and swaps them in atomically. See :func:`database.swap_in`.
+
+    Parameters
+    ----------
+    snapshot:
+        The gamedata to populate the tables with. If not provided, the
+        snapshot is loaded through :func:`raw_data.load_snapshot`. As the
+        snapshot contains all localisations, localisations for any locale
+        that is not in it are removed.
+
+    Returns
+    -------
+    dict[:class:`str`, :class:`int`]
+        The number of rows in each static table after the swap, by table name.
+
+    """
+    if not snapshot:
+        snapshot = await raw_data.load_snapshot()
+
+    rows = {
+        specs.ITEM: _item_rows(snapshot.items),
+        specs.TAG: _tag_rows(snapshot.tags),
+        **_localised_skill_rows(snapshot.skills, "en_US", snapshot.skill_localisations),
+        **_character_rows(snapshot.characters),
+    }
+
+    return await database.swap_in(rows)
+
+
+async def populate_parallel(
+    snapshot: raw_data.Snapshot | None = None,
+    *,
+    concurrency: int = 4,
+    sources: typing.Collection[str] = STATIC_SOURCES,
+    dry_run: bool = False,
+) -> database.PipelineReport:
+    """Populate all static tables, running independent work concurrently.
+
+    Each data source (items, tags, skills and characters) is fetched in its
+    own stage, and each table is populated in its own stage as soon as its
+    data is available and all tables it references are done. For example,
+    items, tags and skills are fetched and written concurrently, as are all
+    three cost item tables.
+
+    Unlike the other populate functions, every table is written in its own
+    transaction, such that tables can be written concurrently on separate
+    connections. To benefit from this, a connection pool should be running.
+
+    Parameters
+    ----------
+    snapshot:
+        The gamedata to populate the tables with. If not provided, every data
+        source is fetched anew in its own stage.
+    concurrency:
+        The maximum number of stages to run at once. This should not exceed
+        the size of the connection pool.
+    sources:
+        The data sources to populate the tables of, out of
+        :data:`STATIC_SOURCES`. The tables of all other sources are left
+        untouched, and their data is never read from the snapshot.
+    dry_run:
+        Whether to only compute the changes without writing anything.
+
+    Returns
+    -------
+    :class:`database.PipelineReport`
+        The timings of all stages. The result of each table stage, named
+        after its table, is the :class:`database.TableDelta` that was written,
+        or would have been written in case of a dry run.
+
+    Raises
+    ------
+    :class:`ValueError`
+        An unknown data source was provided.
+
+    """
+    if unknown := set(sources).difference(STATIC_SOURCES):
+        msg = f"Unknown data sources {', '.join(sorted(unknown))}."
+        raise ValueError(msg)
+
+    locale = "en_US"
+    rows: dict[specs.StaticTableSpec, list[specs.Row]] = {}
+    where: dict[specs.StaticTableSpec, typing.Any] = {}
+
+    async def _items() -> None:
+        raw_items = snapshot.items if snapshot else await raw_data.fetch_items()
+        rows[specs.ITEM] = _item_rows(raw_items)
+
+    async def _tags() -> None:
+        raw_tags = snapshot.tags if snapshot else await raw_data.fetch_tags()
+        rows[specs.TAG] = _tag_rows(raw_tags)
+
+    async def _skills() -> None:
+        raw_skills, localisations = (
+            (snapshot.skills, snapshot.skill_localisations)
+            if snapshot
+            else await _fetch_skills(locale, None)
         )
-        for skill in raw_skills
-    ]
-    await database.StaticSkill.insert(*skills)
-
-    skill_levels: dict[database.StaticSkillLevel, raw_data.RawSkillLevel] = {}
-    skill_localisations: list[database.StaticSkillLocalisation] = []
-
-    for skill, raw_skill in zip(skills, raw_skills, strict=True):
-        skill_levels |= {
-            database.StaticSkillLevel(
-                skill_id=skill.id,
-                sp_cost=level.sp_data.cost,
-                initial_sp=level.sp_data.initial,
-                charges=level.sp_data.charges,
-                duration=level.duration,
-                level=level_num,
-            ): level
-            for level_num, level in enumerate(raw_skill.levels, start=1)
-        }
+        rows.update(_localised_skill_rows(raw_skills, locale, localisations or {}))
+        where.update(_localisation_filter(locale, localisations or {}))
 
-        skill_localisations.append(
-            database.StaticSkillLocalisation(
-                skill_id=skill.id,
-                locale=locale,
-                name=raw_skill.levels[0].name,
-                description=raw_skill.levels[0].description,
-            ),
+    async def _characters() -> None:
+        raw_characters = (
+            snapshot.characters if snapshot else await _collect(raw_data.stream_characters())
         )
+        rows.update(_character_rows(raw_characters))
 
-    await database.bulk_insert(*skill_levels.keys())
-    await database.StaticSkillLocalisation.insert(*skill_localisations)
+    async def _table(spec: specs.StaticTableSpec) -> database.TableDelta:
+        delta = await database.compute_delta(spec, rows[spec], where=where.get(spec))
+        if not dry_run:
+            await database.apply_deltas([delta])
 
-    skill_blackboards: list[database.StaticSkillBlackboard] = []
+        return delta
 
-    for skill_level, raw_skill_level in skill_levels.items():
-        skill_blackboards.extend(
-            database.StaticSkillBlackboard(
-                skill_level_id=skill_level.id,
-                key=blackboard_entry.key,
-                value=blackboard_entry.value,
-            )
-            for blackboard_entry in raw_skill_level.blackboard
+    loaders = {
+        "items": (_items, (specs.ITEM,)),
+        "tags": (_tags, (specs.TAG,)),
+        "skills": (_skills, _SKILL_SPECS),
+        "characters": (_characters, _CHARACTER_SPECS),
+    }
+    loaders = {name: loader for name, loader in loaders.items() if name in sources}
+    source_of = {spec: name for name, (_, specs_) in loaders.items() for spec in specs_}
+    # Tables of other sources are left untouched, so nothing has to wait for them.
+    table_names = {spec.table: spec.name for spec in source_of}
+
+    stages = [database.Stage(name, run) for name, (run, _) in loaders.items()]
+    stages.extend(
+        database.Stage(
+            spec.name,
+            functools.partial(_table, spec),
+            depends_on=(
+                source_of[spec],
+                *(table_names[table] for table in spec.references if table in table_names),
+            ),
         )
+        for spec in database.STATIC_TABLES
+        if spec in source_of
+    )
 
-    await database.bulk_insert(*skill_blackboards)
+    return await database.run_pipeline(stages, concurrency=concurrency)
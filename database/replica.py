@@ -0,0 +1,90 @@
+"""Routing of read-only queries to a read replica.
+
+If ``DB_REPLICA_URI`` is set, piccolo is configured with a read replica as
+the extra node :data:`REPLICA_NODE`. Queries are only ever sent to it from
+within :func:`read_replica` (or functions decorated with :func:`reads_from_replica`),
+and even then only if they are plain SELECTs outside of a transaction. All
+other queries, including all queries in a transaction, stay on the primary.
+
+Note that the replica may lag slightly behind the primary, so anything that
+must observe a write made just before should not read from it.
+"""
+
+import contextlib
+import contextvars
+import functools
+import typing
+
+from piccolo.querystring import QueryString
+
+from database import instrumentation
+
+__all__: typing.Sequence[str] = (
+    "REPLICA_NODE",
+    "ReplicaRoutingEngine",
+    "read_replica",
+    "reads_from_replica",
+)
+
+_P = typing.ParamSpec("_P")
+_T = typing.TypeVar("_T")
+
+REPLICA_NODE: typing.Final[str] = "replica"
+"""The name of the piccolo extra node of the read replica."""
+
+_READ_ONLY_PREFIXES: typing.Final[tuple[str, ...]] = ("SELECT", "WITH")
+
+_use_replica: contextvars.ContextVar[bool] = contextvars.ContextVar("_use_replica", default=False)
+
+
+class ReplicaRoutingEngine(instrumentation.InstrumentedPostgresEngine):
+    """A postgres engine that sends read-only queries to its read replica when requested.
+
+    See :func:`read_replica`. Without a :data:`REPLICA_NODE` extra node, this
+    behaves exactly like its base class.
+    """
+
+    def _should_route(self, querystring: QueryString) -> bool:
+        return (
+            _use_replica.get()
+            and REPLICA_NODE in self.extra_nodes
+            and not self.current_transaction.get()
+            and querystring.template.lstrip().upper().startswith(_READ_ONLY_PREFIXES)
+        )
+
+    async def run_querystring(  # noqa: D102
+        self,
+        querystring: QueryString,
+        in_pool: bool = True,  # noqa: FBT001, FBT002
+    ) -> typing.Any:  # noqa: ANN401
+        if self._should_route(querystring):
+            replica = self.extra_nodes[REPLICA_NODE]
+            return await replica.run_querystring(querystring, in_pool=in_pool)
+
+        return await super().run_querystring(querystring, in_pool=in_pool)
+
+
+@contextlib.contextmanager
+def read_replica() -> typing.Iterator[None]:
+    """Send read-only queries made within the context to the read replica, if any.
+
+    Queries made within a transaction, and any writes, still go to the primary.
+    """
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def reads_from_replica(
+    func: typing.Callable[_P, typing.Awaitable[_T]],
+) -> typing.Callable[_P, typing.Coroutine[typing.Any, typing.Any, _T]]:
+    """Decorate an async function such that it runs within :func:`read_replica`."""
+
+    @functools.wraps(func)
+    async def wrapper(*args: _P.args, **kwargs: _P.kwargs) -> _T:
+        with read_replica():
+            return await func(*args, **kwargs)
+
+    return wrapper
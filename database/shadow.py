@@ -0,0 +1,542 @@
+"""Zero-downtime replacement of the static tables through shadow tables.
+
+Rather than modifying the live static tables in place, :func:`swap_in` loads
+all gamedata into fresh ``static_*_next`` shadow tables, validates them and
+then renames them over the live tables, all in a single transaction. Readers
+never block on the load and never see partially populated tables. If
+validation fails, the transaction is rolled back and the live tables are
+left untouched.
+
+Everything that takes long is done before any lock on a live table is taken,
+such that the swap itself only consists of catalog changes. Foreign keys from
+other tables are added back without checking existing rows, which is done
+after the swap commits.
+"""
+
+import dataclasses
+import re
+import typing
+
+import asyncpg
+from piccolo import columns
+
+from database import specs, utils
+
+__all__: typing.Sequence[str] = ("SHADOW_SUFFIX", "ShadowValidationError", "swap_in")
+
+SHADOW_SUFFIX: typing.Final[str] = "_next"
+_OLD_SUFFIX: typing.Final[str] = "_old"
+
+# Arbitrary key that serialises concurrent shadow loads.
+_LOCK_KEY: typing.Final[int] = 0x5EED_0000
+
+# Indexes and sequences share one namespace with tables, so any that belong to
+# a shadow table get a temporary name until the live table is dropped.
+_TEMPORARY_NAME_FMT: typing.Final[str] = "_shadow_{}"
+
+_INDEX_DEF_PATTERN: typing.Final[re.Pattern[str]] = re.compile(
+    r"^(CREATE (?:UNIQUE )?INDEX )\S+( ON (?:ONLY )?)\S+( .*)$",
+)
+_REFERENCES_PATTERN: typing.Final[re.Pattern[str]] = re.compile(r"\bREFERENCES (\w+)\(")
+
+
+class ShadowValidationError(Exception):
+    """The shadow tables did not pass validation, so they were not swapped in."""
+
+
+@dataclasses.dataclass
+class _Rename:
+    kind: typing.Literal["INDEX", "SEQUENCE"]
+    temporary: str
+    final: str
+
+
+@dataclasses.dataclass
+class _ForeignKey:
+    table: str
+    name: str
+    definition: str
+    referenced: str
+    columns: list[str]
+    referenced_columns: list[str]
+    cascades: bool
+
+    def orphans(self, referenced: str) -> str:
+        """Get a query selecting the rows that reference no row in the provided table."""
+        condition = " AND ".join(
+            f"r.{utils._quote(referenced_column)} = t.{utils._quote(column)}"  # noqa: SLF001
+            for column, referenced_column in zip(
+                self.columns,
+                self.referenced_columns,
+                strict=True,
+            )
+        )
+        return (
+            f"FROM {utils._quote(self.table)} t WHERE NOT EXISTS ("  # noqa: SLF001
+            f"SELECT FROM {utils._quote(referenced)} r WHERE {condition})"  # noqa: SLF001
+        )
+
+
+@dataclasses.dataclass
+class _View:
+    name: str
+    materialised: bool
+    definition: str
+    owner: str
+    grants: list[str]
+
+    @property
+    def kind(self) -> str:
+        return "MATERIALIZED VIEW" if self.materialised else "VIEW"
+
+
+def _shadow_name(spec: specs.StaticTableSpec) -> str:
+    return spec.name + SHADOW_SUFFIX
+
+
+def _shadow_references(definition: str, static_names: typing.Container[str]) -> str:
+    def _replace(match: re.Match[str]) -> str:
+        name = match[1]
+        if name in static_names:
+            name += SHADOW_SUFFIX
+
+        return f"REFERENCES {utils._quote(name)}("  # noqa: SLF001
+
+    return _REFERENCES_PATTERN.sub(_replace, definition)
+
+
+def _shadow_tables(definition: str, static_names: typing.Iterable[str]) -> str:
+    pattern = r"\b(" + "|".join(map(re.escape, static_names)) + r")\b"
+    return re.sub(pattern, rf"\g<1>{SHADOW_SUFFIX}", definition)
+
+
+def _build_records(
+    rows: typing.Mapping[specs.StaticTableSpec, typing.Iterable[specs.Row]],
+) -> dict[specs.StaticTableSpec, tuple[list[str], list[list[typing.Any]]]]:
+    # Auto-incrementing primary keys are only ever referenced by other static
+    # tables, so they are simply renumbered from 1. This allows referencing
+    # rows to resolve them without a round-trip to the database.
+    primary_keys: dict[specs.StaticTableSpec, dict[tuple[typing.Any, ...], typing.Any]] = {}
+    records: dict[specs.StaticTableSpec, tuple[list[str], list[list[typing.Any]]]] = {}
+
+    for spec in specs.STATIC_TABLES:
+        pk_name = spec.primary_key._meta.name  # noqa: SLF001
+        is_serial = isinstance(spec.primary_key, columns.Serial)
+        normalisers = [spec.normalisers[path] for path in spec.own_paths]
+
+        names = [spec.column(path)._meta.db_column_name for path in spec.own_paths]  # noqa: SLF001
+        if spec.parent:
+            names.append(getattr(spec.table, spec.parent[0])._meta.db_column_name)  # noqa: SLF001
+        names.append(spec.hash_column._meta.db_column_name)  # noqa: SLF001
+        if is_serial:
+            names.append(spec.primary_key._meta.db_column_name)  # noqa: SLF001
+
+        keys: dict[tuple[typing.Any, ...], typing.Any] = {}
+        table_records: list[list[typing.Any]] = []
+        unique_rows = {spec.key_of(row): row for row in rows[spec]}
+
+        for number, (key, row) in enumerate(unique_rows.items(), start=1):
+            record = [
+                normalise(row[path])
+                for normalise, path in zip(normalisers, spec.own_paths, strict=True)
+            ]
+            if spec.parent:
+                record.append(primary_keys[spec.parent[1]][spec.parent_key_of(row)])
+            record.append(spec.hash_of(row))
+            if is_serial:
+                record.append(number)
+
+            keys[key] = number if is_serial else row[pk_name]
+            table_records.append(record)
+
+        primary_keys[spec] = keys
+        records[spec] = (names, table_records)
+
+    return records
+
+
+async def _create_shadow(
+    connection: asyncpg.Connection,
+    spec: specs.StaticTableSpec,
+    renames: list[_Rename],
+) -> None:
+    shadow = utils._quote(_shadow_name(spec))  # noqa: SLF001
+    await connection.execute(f"DROP TABLE IF EXISTS {shadow} CASCADE")
+
+    # Constraints and indexes are only added once the data is loaded, which is
+    # considerably faster than maintaining them throughout.
+    await connection.execute(
+        f"CREATE TABLE {shadow} (LIKE {utils._quote(spec.name)} INCLUDING DEFAULTS)",  # noqa: SLF001
+    )
+
+    if not isinstance(spec.primary_key, columns.Serial):
+        return
+
+    # The copied default still draws from the sequence of the live table,
+    # which is dropped along with it, so the shadow table needs its own.
+    pk_name = utils._quote(spec.primary_key._meta.db_column_name)  # noqa: SLF001
+    sequence = await connection.fetchval(
+        "SELECT pg_get_serial_sequence($1, $2)",
+        spec.name,
+        spec.primary_key._meta.db_column_name,  # noqa: SLF001
+    )
+    temporary = _TEMPORARY_NAME_FMT.format(len(renames))
+    renames.append(_Rename("SEQUENCE", temporary, sequence.rsplit(".", 1)[-1]))
+
+    await connection.execute(
+        f"CREATE SEQUENCE {utils._quote(temporary)} OWNED BY {shadow}.{pk_name}",  # noqa: SLF001
+    )
+    await connection.execute(
+        f"ALTER TABLE {shadow} ALTER COLUMN {pk_name}"
+        f" SET DEFAULT nextval('{utils._quote(temporary)}')",  # noqa: SLF001
+    )
+
+
+async def _add_constraints(
+    connection: asyncpg.Connection,
+    spec: specs.StaticTableSpec,
+    renames: list[_Rename],
+) -> None:
+    static_names = {spec.name for spec in specs.STATIC_TABLES}
+    shadow = utils._quote(_shadow_name(spec))  # noqa: SLF001
+
+    constraints = await connection.fetch(
+        "SELECT conname, contype::text, pg_get_constraintdef(oid) AS definition"
+        " FROM pg_constraint WHERE conrelid = $1::regclass"
+        # Primary keys first, as foreign keys may reference them.
+        " ORDER BY contype = 'p' DESC, contype = 'f'",
+        spec.name,
+    )
+    for constraint in constraints:
+        name = constraint["conname"]
+        if constraint["contype"] in ("p", "u", "x"):
+            # These are backed by an index of the same name.
+            temporary = _TEMPORARY_NAME_FMT.format(len(renames))
+            renames.append(_Rename("INDEX", temporary, name))
+            name = temporary
+
+        # Adding foreign keys validates all existing rows against the
+        # referenced shadow tables.
+        definition = _shadow_references(constraint["definition"], static_names)
+        await connection.execute(
+            f"ALTER TABLE {shadow} ADD CONSTRAINT {utils._quote(name)} {definition}",  # noqa: SLF001
+        )
+
+    await _copy_indexes(connection, spec.name, shadow, renames)
+
+
+async def _copy_indexes(
+    connection: asyncpg.Connection,
+    source: str,
+    target: str,
+    renames: list[_Rename],
+) -> None:
+    indexes = await connection.fetch(
+        "SELECT indexrelid::regclass::text AS name, pg_get_indexdef(indexrelid) AS definition"
+        " FROM pg_index WHERE indrelid = $1::regclass"
+        " AND NOT EXISTS ("
+        "SELECT FROM pg_constraint WHERE conindid = indexrelid AND contype IN ('p', 'u', 'x')"
+        ")",
+        source,
+    )
+    for index in indexes:
+        temporary = _TEMPORARY_NAME_FMT.format(len(renames))
+        renames.append(_Rename("INDEX", temporary, index["name"]))
+        await connection.execute(
+            _INDEX_DEF_PATTERN.sub(
+                rf"\g<1>{utils._quote(temporary)}\g<2>{target}\g<3>",  # noqa: SLF001
+                index["definition"],
+            ),
+        )
+
+
+async def _load_shadow(
+    connection: asyncpg.Connection,
+    spec: specs.StaticTableSpec,
+    names: list[str],
+    records: list[list[typing.Any]],
+) -> None:
+    shadow = _shadow_name(spec)
+    await connection.copy_records_to_table(shadow, records=records, columns=names)
+
+    if isinstance(spec.primary_key, columns.Serial):
+        pk_name = spec.primary_key._meta.db_column_name  # noqa: SLF001
+        await connection.execute(
+            f"SELECT setval(pg_get_serial_sequence($1, $2), COALESCE(MAX({utils._quote(pk_name)}), 0) + 1,"  # noqa: SLF001, S608, E501
+            f" false) FROM {utils._quote(shadow)}",  # noqa: SLF001
+            shadow,
+            pk_name,
+        )
+
+
+async def _validate_counts(
+    connection: asyncpg.Connection,
+    spec: specs.StaticTableSpec,
+    expected: int,
+    min_ratio: float,
+) -> int:
+    shadow = utils._quote(_shadow_name(spec))  # noqa: SLF001
+    count: int = await connection.fetchval(f"SELECT count(*) FROM {shadow}")  # noqa: S608
+    if count != expected:
+        msg = f"Expected {expected} rows in {shadow}, found {count}."
+        raise ShadowValidationError(msg)
+
+    # Gamedata rarely shrinks, so a large drop points at incomplete input.
+    live: int = await connection.fetchval(f"SELECT count(*) FROM {utils._quote(spec.name)}")  # noqa: S608, SLF001
+    if count < live * min_ratio:
+        msg = (
+            f"{shadow} has {count} rows whereas {spec.name} has {live}, which is below the"
+            f" minimum ratio of {min_ratio}."
+        )
+        raise ShadowValidationError(msg)
+
+    return count
+
+
+async def _select_external_foreign_keys(connection: asyncpg.Connection) -> list[_ForeignKey]:
+    static_names = [spec.name for spec in specs.STATIC_TABLES]
+    records = await connection.fetch(
+        """
+        SELECT
+            c.conrelid::regclass::text AS table,
+            c.conname AS name,
+            pg_get_constraintdef(c.oid) AS definition,
+            c.confrelid::regclass::text AS referenced,
+            c.confdeltype = 'c' AS cascades,
+            ARRAY(
+                SELECT attname FROM unnest(c.conkey) WITH ORDINALITY AS k(attnum, n)
+                JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.attnum
+                ORDER BY n
+            ) AS columns,
+            ARRAY(
+                SELECT attname FROM unnest(c.confkey) WITH ORDINALITY AS k(attnum, n)
+                JOIN pg_attribute a ON a.attrelid = c.confrelid AND a.attnum = k.attnum
+                ORDER BY n
+            ) AS referenced_columns
+        FROM pg_constraint c
+        WHERE c.contype = 'f'
+            AND c.confrelid = ANY($1::regclass[])
+            AND NOT c.conrelid = ANY($1::regclass[])
+        """,
+        static_names,
+    )
+    return [_ForeignKey(**dict(record)) for record in records]
+
+
+async def _select_dependent_views(connection: asyncpg.Connection) -> list[_View]:
+    static_names = [spec.name for spec in specs.STATIC_TABLES]
+    records = await connection.fetch(
+        """
+        SELECT DISTINCT
+            c.oid::regclass::text AS name,
+            c.relkind = 'm' AS materialised,
+            pg_get_viewdef(c.oid) AS definition,
+            quote_ident(pg_get_userbyid(c.relowner)) AS owner,
+            ARRAY(
+                SELECT format(
+                    'GRANT %s ON %s TO %s%s',
+                    a.privilege_type,
+                    c.oid::regclass,
+                    CASE WHEN a.grantee = 0 THEN 'PUBLIC'
+                        ELSE quote_ident(pg_get_userbyid(a.grantee)) END,
+                    CASE WHEN a.is_grantable THEN ' WITH GRANT OPTION' ELSE '' END
+                )
+                FROM aclexplode(c.relacl) a
+            ) AS grants
+        FROM pg_depend d
+        JOIN pg_rewrite r ON r.oid = d.objid
+        JOIN pg_class c ON c.oid = r.ev_class
+        WHERE d.classid = 'pg_rewrite'::regclass
+            AND d.refobjid = ANY($1::regclass[])
+            AND NOT c.oid = ANY($1::regclass[])
+        """,
+        static_names,
+    )
+    return [_View(**dict(record)) for record in records]
+
+
+async def _create_shadow_views(
+    connection: asyncpg.Connection,
+    views: list[_View],
+    renames: list[_Rename],
+) -> None:
+    # Views keep referring to the tables they were created from, even after
+    # those are renamed, so they are recreated on top of the shadow tables.
+    # This also populates materialised views before any lock is taken.
+    static_names = [spec.name for spec in specs.STATIC_TABLES]
+    for view in views:
+        shadow = utils._quote(view.name + SHADOW_SUFFIX)  # noqa: SLF001
+        definition = _shadow_tables(view.definition, static_names)
+        await connection.execute(f"DROP {view.kind} IF EXISTS {shadow}")
+        await connection.execute(f"CREATE {view.kind} {shadow} AS {definition}")
+        await _copy_indexes(connection, view.name, shadow, renames)
+
+
+async def _remove_orphans(connection: asyncpg.Connection, foreign_keys: list[_ForeignKey]) -> None:
+    # Rows that reference static rows that no longer exist are removed, as
+    # deleting them from the live table would. This happens before any lock
+    # is taken, such that readers are not blocked while it runs.
+    for fk in foreign_keys:
+        orphans = fk.orphans(fk.referenced + SHADOW_SUFFIX)
+        if fk.cascades:
+            await connection.execute(f"DELETE {orphans}")
+
+        elif await connection.fetchval(f"SELECT EXISTS (SELECT {orphans})"):
+            msg = f"Rows in {fk.table} reference rows that no longer exist in {fk.referenced}."
+            raise ShadowValidationError(msg)
+
+
+async def _swap(
+    connection: asyncpg.Connection,
+    foreign_keys: list[_ForeignKey],
+    views: list[_View],
+    renames: list[_Rename],
+) -> None:
+    # NOTE: Everything in here takes an ACCESS EXCLUSIVE lock on the tables it
+    #       touches until the transaction commits, so this must only consist
+    #       of catalog changes that do not scan any rows.
+    for fk in foreign_keys:
+        await connection.execute(
+            f"ALTER TABLE {utils._quote(fk.table)} DROP CONSTRAINT {utils._quote(fk.name)}",  # noqa: SLF001
+        )
+
+    for view in views:
+        await connection.execute(f"DROP {view.kind} {view.name}")
+
+    for spec in specs.STATIC_TABLES:
+        await connection.execute(
+            f"ALTER TABLE {utils._quote(spec.name)}"  # noqa: SLF001
+            f" RENAME TO {utils._quote(spec.name + _OLD_SUFFIX)}",  # noqa: SLF001
+        )
+        await connection.execute(
+            f"ALTER TABLE {utils._quote(_shadow_name(spec))}"  # noqa: SLF001
+            f" RENAME TO {utils._quote(spec.name)}",  # noqa: SLF001
+        )
+
+    # This deliberately does not cascade, such that any other objects that
+    # depend on the old tables make the swap fail instead of disappearing.
+    await connection.execute(
+        "DROP TABLE "
+        + ", ".join(utils._quote(spec.name + _OLD_SUFFIX) for spec in specs.STATIC_TABLES),  # noqa: SLF001
+    )
+
+    for rename in renames:
+        await connection.execute(
+            f"ALTER {rename.kind} {utils._quote(rename.temporary)}"  # noqa: SLF001
+            f" RENAME TO {utils._quote(rename.final)}",  # noqa: SLF001
+        )
+
+    # The recreated views are owned by the current user and lack any grants
+    # of the views they replace, so those are applied to them as well.
+    for view in views:
+        await connection.execute(
+            f"ALTER {view.kind} {utils._quote(view.name + SHADOW_SUFFIX)}"  # noqa: SLF001
+            f" RENAME TO {utils._quote(view.name)}",  # noqa: SLF001
+        )
+        for grant in view.grants:
+            await connection.execute(grant)
+
+        await connection.execute(f"ALTER {view.kind} {view.name} OWNER TO {view.owner}")
+
+    # Existing rows were already checked against the shadow tables, so the
+    # foreign keys are only validated after the swap commits. In the meantime,
+    # they are still enforced for new rows.
+    for fk in foreign_keys:
+        await connection.execute(
+            f"ALTER TABLE {utils._quote(fk.table)}"  # noqa: SLF001
+            f" ADD CONSTRAINT {utils._quote(fk.name)} {fk.definition} NOT VALID",  # noqa: SLF001
+        )
+
+
+async def _validate_foreign_keys(foreign_keys: list[_ForeignKey]) -> None:
+    # Validating a foreign key does not block reads or writes of either table.
+    for fk in foreign_keys:
+        async with utils.get_db().transaction() as transaction:
+            connection: asyncpg.Connection = transaction.connection
+
+            # Rows may have been added between removing orphans and the swap.
+            if fk.cascades:
+                await connection.execute(f"DELETE {fk.orphans(fk.referenced)}")
+
+            await connection.execute(
+                f"ALTER TABLE {utils._quote(fk.table)}"  # noqa: SLF001
+                f" VALIDATE CONSTRAINT {utils._quote(fk.name)}",  # noqa: SLF001
+            )
+
+
+async def swap_in(
+    rows: typing.Mapping[specs.StaticTableSpec, typing.Iterable[specs.Row]],
+    *,
+    min_ratio: float = 0.9,
+) -> dict[str, int]:
+    """Replace the contents of all static tables through shadow tables.
+
+    The rows are loaded into ``static_*_next`` shadow tables, which are then
+    validated and renamed over the live tables. This all happens in a single
+    transaction, so readers keep seeing the old data until it commits. The
+    live tables are only locked for the duration of the renames.
+
+    Rows in other tables that reference static rows that no longer exist are
+    deleted, as they would be by cascading deletes from the live tables. Their
+    foreign keys are validated once the swap has committed. Views over the
+    static tables are recreated on top of the shadow tables along with their
+    indexes, owner and grants, which also refreshes materialised views.
+
+    Parameters
+    ----------
+    rows:
+        The rows for every table in :data:`specs.STATIC_TABLES`. If multiple
+        rows of a table have the same natural key, the last one is used.
+        Auto-incrementing primary keys are renumbered.
+    min_ratio:
+        The minimum number of rows of each shadow table, relative to its live
+        table. This guards against swapping in incomplete gamedata.
+
+    Returns
+    -------
+    dict[:class:`str`, :class:`int`]
+        The number of rows in each static table after the swap, by table name.
+
+    Raises
+    ------
+    :class:`ShadowValidationError`
+        A shadow table did not pass validation, or rows in another table
+        reference rows that no longer exist without cascading deletes.
+        Foreign key violations between the shadow tables instead raise the
+        corresponding :class:`asyncpg.PostgresError`. In both cases, the
+        live tables are left untouched.
+
+    """
+    if missing := [spec.name for spec in specs.STATIC_TABLES if spec not in rows]:
+        msg = f"Missing rows for static tables {', '.join(missing)}."
+        raise ValueError(msg)
+
+    records = _build_records(rows)
+    renames: list[_Rename] = []
+    counts: dict[str, int] = {}
+
+    async with utils.get_db().transaction() as transaction:
+        connection: asyncpg.Connection = transaction.connection
+        await connection.execute("SELECT pg_advisory_xact_lock($1)", _LOCK_KEY)
+
+        for spec in specs.STATIC_TABLES:
+            await _create_shadow(connection, spec, renames)
+            await _load_shadow(connection, spec, *records[spec])
+
+        for spec in specs.STATIC_TABLES:
+            await _add_constraints(connection, spec, renames)
+            counts[spec.name] = await _validate_counts(
+                connection,
+                spec,
+                len(records[spec][1]),
+                min_ratio,
+            )
+
+        foreign_keys = await _select_external_foreign_keys(connection)
+        views = await _select_dependent_views(connection)
+        await _remove_orphans(connection, foreign_keys)
+        await _create_shadow_views(connection, views, renames)
+        await _swap(connection, foreign_keys, views, renames)
+
+    await _validate_foreign_keys(foreign_keys)
+    return counts
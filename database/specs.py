@@ -0,0 +1,220 @@
+"""Natural-key specifications of the static gamedata tables."""
+
+import dataclasses
+import decimal
+import functools
+import hashlib
+import json
+import typing
+
+from piccolo import columns, table
+
+from database.models import static
+
+__all__: typing.Sequence[str] = ("STATIC_TABLES", "Row", "StaticTableSpec")
+
+
+Row = dict[str, typing.Any]
+"""A static table row, mapping column paths as in :attr:`StaticTableSpec.paths` to values."""
+
+
+def _normaliser(column: columns.Column) -> typing.Callable[[typing.Any], typing.Any]:
+    # Values read from the database have already been coerced to the column
+    # type, so new values need the same treatment to compare equal.
+    if isinstance(column, columns.Decimal) and column.digits:
+        exponent = decimal.Decimal(1).scaleb(-column.digits[1])
+        return lambda value: decimal.Decimal(str(value)).quantize(exponent)
+
+    if isinstance(column, columns.JSONB):
+        return lambda value: value if isinstance(value, str) else json.dumps(value)
+
+    return lambda value: value
+
+
+@dataclasses.dataclass(frozen=True)
+class StaticTableSpec:
+    """Describes how rows of a static table are identified by their gamedata.
+
+    Most static tables use an auto-incrementing primary key, which says
+    nothing about the gamedata a row represents. Rows are instead identified
+    by their *natural key*: the columns that uniquely identify a row in the
+    gamedata. Foreign keys to such tables are expressed through the natural
+    key of the referenced table using dotted column paths, e.g.
+    ``elite_phase_id.character_id``.
+    """
+
+    table: type[table.Table]
+    """The table described by this spec."""
+    key: tuple[str, ...]
+    """The column paths that make up the natural key of a row."""
+    values: tuple[str, ...] = ()
+    """The column paths that hold the data of a row."""
+    parent: tuple[str, "StaticTableSpec"] | None = None
+    """The foreign key column and spec of the referenced table, if it has an auto-incrementing
+    primary key. The natural key of the referenced table must be part of :attr:`key`.
+    """
+
+    @property
+    def name(self) -> str:
+        """The name of the table in the database."""
+        return self.table._meta.tablename  # noqa: SLF001
+
+    @property
+    def primary_key(self) -> columns.Column:
+        """The primary key column of the table."""
+        return self.table._meta.primary_key  # noqa: SLF001
+
+    @property
+    def paths(self) -> tuple[str, ...]:
+        """All column paths of a row, key paths first."""
+        return (*self.key, *self.values)
+
+    @functools.cached_property
+    def parent_key(self) -> tuple[str, ...]:
+        """The paths in :attr:`key` that make up the natural key of the referenced table."""
+        if not self.parent:
+            return ()
+
+        fk, parent = self.parent
+        return tuple(f"{fk}.{path}" for path in parent.key)
+
+    @functools.cached_property
+    def own_paths(self) -> tuple[str, ...]:
+        """The paths of :attr:`paths` that map directly onto a column of this table."""
+        return tuple(path for path in self.paths if path not in self.parent_key)
+
+    @functools.cached_property
+    def references(self) -> tuple[type[table.Table], ...]:
+        """The tables that this table references through foreign keys."""
+        return tuple(
+            fk._foreign_key_meta.resolved_references  # noqa: SLF001
+            for fk in self.table._meta.foreign_key_columns  # noqa: SLF001
+        )
+
+    @functools.cached_property
+    def normalisers(self) -> dict[str, typing.Callable[[typing.Any], typing.Any]]:
+        """Functions that coerce a value to the type of the column at each path."""
+        return {path: _normaliser(self.column(path)) for path in self.paths}
+
+    def column(self, path: str) -> columns.Column:
+        """Resolve a (dotted) column path to a piccolo column, joining where necessary."""
+        return functools.reduce(getattr, path.split("."), self.table)  # pyright: ignore
+
+    @property
+    def hash_column(self) -> columns.Column:
+        """The column that stores the digest of each row, see :meth:`hash_of`."""
+        return self.table.content_hash  # pyright: ignore
+
+    def hash_of(self, row: Row) -> str:
+        """Get a digest of the values of a row.
+
+        Storing this alongside each row allows changed rows to be detected
+        without reading or comparing all of their values.
+        """
+        values = tuple(self.normalisers[path](row[path]) for path in self.values)
+        return hashlib.blake2b(repr(values).encode(), digest_size=16).hexdigest()
+
+    def key_of(self, row: Row) -> tuple[typing.Any, ...]:
+        """Get the natural key of a row."""
+        return tuple(row[path] for path in self.key)
+
+    def parent_key_of(self, row: Row) -> tuple[typing.Any, ...]:
+        """Get the natural key of the row that a row references."""
+        return tuple(row[path] for path in self.parent_key)
+
+
+ITEM = StaticTableSpec(
+    static.StaticItem,
+    key=("id",),
+    values=("icon_id", "name", "description", "rarity"),
+)
+TAG = StaticTableSpec(static.StaticTag, key=("name",))
+SKILL = StaticTableSpec(
+    static.StaticSkill,
+    key=("id",),
+    values=("skill_type", "sp_type", "duration_type"),
+)
+SKILL_LOCALISATION = StaticTableSpec(
+    static.StaticSkillLocalisation,
+    key=("skill_id", "locale"),
+    values=("name", "description"),
+)
+SKILL_LEVEL = StaticTableSpec(
+    static.StaticSkillLevel,
+    key=("skill_id", "level"),
+    values=("sp_cost", "initial_sp", "charges", "duration", "blackboard"),
+)
+SKILL_BLACKBOARD = StaticTableSpec(
+    static.StaticSkillBlackboard,
+    key=("skill_level_id.skill_id", "skill_level_id.level", "key"),
+    values=("value",),
+    parent=("skill_level_id", SKILL_LEVEL),
+)
+CHARACTER = StaticTableSpec(
+    static.StaticCharacter,
+    key=("id",),
+    values=("name", "rarity", "profession", "sub_profession", "is_alter"),
+)
+CHARACTER_TAG = StaticTableSpec(static.StaticCharacterTag, key=("character_id", "tag_id"))
+CHARACTER_SKILL = StaticTableSpec(
+    static.StaticCharacterSkill,
+    key=("character_id", "skill_id"),
+    values=("skill_num", "display_id"),
+)
+CHARACTER_ELITE_PHASE = StaticTableSpec(
+    static.StaticCharacterElitePhase,
+    key=("character_id", "level"),
+    values=("frame_levels", "frame_stats"),
+)
+CHARACTER_ELITE_PHASE_ITEM = StaticTableSpec(
+    static.StaticCharacterElitePhaseItem,
+    key=("elite_phase_id.character_id", "elite_phase_id.level", "item_id"),
+    values=("quantity",),
+    parent=("elite_phase_id", CHARACTER_ELITE_PHASE),
+)
+SKILL_SHARED_UPGRADE = StaticTableSpec(
+    static.StaticSkillSharedUpgrade,
+    key=("character_id", "level"),
+)
+SKILL_SHARED_UPGRADE_ITEM = StaticTableSpec(
+    static.StaticSkillSharedUpgradeItem,
+    key=("skill_upgrade_id.character_id", "skill_upgrade_id.level", "item_id"),
+    values=("quantity",),
+    parent=("skill_upgrade_id", SKILL_SHARED_UPGRADE),
+)
+SKILL_MASTERY = StaticTableSpec(
+    static.StaticSkillMastery,
+    key=("skill_id.character_id", "skill_id.skill_id", "level"),
+    parent=("skill_id", CHARACTER_SKILL),
+)
+SKILL_MASTERY_ITEM = StaticTableSpec(
+    static.StaticSkillMasteryItem,
+    key=(
+        "mastery_id.skill_id.character_id",
+        "mastery_id.skill_id.skill_id",
+        "mastery_id.level",
+        "item_id",
+    ),
+    values=("quantity",),
+    parent=("mastery_id", SKILL_MASTERY),
+)
+
+
+STATIC_TABLES: typing.Final[typing.Sequence[StaticTableSpec]] = (
+    ITEM,
+    TAG,
+    SKILL,
+    SKILL_LOCALISATION,
+    SKILL_LEVEL,
+    SKILL_BLACKBOARD,
+    CHARACTER,
+    CHARACTER_TAG,
+    CHARACTER_SKILL,
+    CHARACTER_ELITE_PHASE,
+    CHARACTER_ELITE_PHASE_ITEM,
+    SKILL_SHARED_UPGRADE,
+    SKILL_SHARED_UPGRADE_ITEM,
+    SKILL_MASTERY,
+    SKILL_MASTERY_ITEM,
+)
+"""Specs of all static tables, ordered such that referenced tables come first."""
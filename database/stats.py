@@ -0,0 +1,157 @@
+"""Vectorised lookups of character stats from the elite phase stat keyframes."""
+
+import dataclasses
+import typing
+
+import numpy as np
+import numpy.typing as npt
+
+from database.models import static
+
+__all__: typing.Sequence[str] = (
+    "ELITE_PHASE_STATS",
+    "PhaseFrames",
+    "select_phase_frames",
+)
+
+ELITE_PHASE_STATS: typing.Final[typing.Sequence[str]] = (
+    "HP",
+    "ATK",
+    "DEF",
+    "RES",
+    "dp_cost",
+    "block",
+    "attack_speed",
+    "redeploy_time",
+    "taunt_level",
+)
+"""The stats stored at every elite phase keyframe, in order.
+
+These are named after the fields of :class:`raw_data.models.character.RawCharacterAttributes`.
+"""
+
+
+@dataclasses.dataclass(frozen=True)
+class PhaseFrames:
+    """The stat keyframes of many elite phases, padded into rectangular arrays.
+
+    Phases with fewer keyframes than the others repeat their last keyframe,
+    which never affects interpolation.
+    """
+
+    levels: npt.NDArray[np.float64]
+    """The levels of the keyframes, with shape ``(phases, keyframes)``."""
+    stats: npt.NDArray[np.float64]
+    """The stats at each keyframe, with shape ``(phases, keyframes, len(ELITE_PHASE_STATS))``."""
+
+    @classmethod
+    def from_frames(
+        cls,
+        frames: typing.Sequence[
+            tuple[typing.Sequence[int], typing.Sequence[typing.Sequence[float]]]
+        ],
+    ) -> "PhaseFrames":
+        """Pad the keyframe levels and stats of many phases into arrays.
+
+        Parameters
+        ----------
+        frames:
+            The keyframe levels and keyframe stats of every phase, as stored
+            in the 'frame_levels' and 'frame_stats' columns. Every phase must
+            have at least one keyframe.
+
+        Returns
+        -------
+        :class:`PhaseFrames`
+            The padded keyframes, in the same order.
+
+        """
+        width = max((len(levels) for levels, _ in frames), default=1)
+        levels = np.empty((len(frames), width))
+        stats = np.empty((len(frames), width, len(ELITE_PHASE_STATS)))
+
+        for i, (phase_levels, phase_stats) in enumerate(frames):
+            count = len(phase_levels)
+            levels[i, :count] = phase_levels
+            levels[i, count:] = phase_levels[-1]
+            stats[i, :count] = phase_stats
+            stats[i, count:] = phase_stats[-1]
+
+        return cls(levels, stats)
+
+    def __len__(self) -> int:
+        return len(self.levels)
+
+    def at(self, levels: npt.ArrayLike) -> npt.NDArray[np.float64]:
+        """Interpolate the stats of every phase at the provided levels.
+
+        Stats are interpolated linearly between the two keyframes surrounding
+        each level, and clamped to the first and last keyframe outside of
+        them. They are not rounded.
+
+        Parameters
+        ----------
+        levels:
+            The level to get the stats at for every phase, or a single level
+            for all phases.
+
+        Returns
+        -------
+        numpy.ndarray
+            The stats, with shape ``(phases, len(ELITE_PHASE_STATS))``.
+
+        """
+        levels = np.broadcast_to(np.asarray(levels, dtype=np.float64), (len(self),))
+        rows = np.arange(len(self))
+
+        # The index of the keyframe at or before each level, such that the
+        # level lies between it and the next keyframe.
+        lower = np.sum(self.levels <= levels[:, None], axis=1) - 1
+        lower = np.clip(lower, 0, max(self.levels.shape[1] - 2, 0))
+        upper = np.minimum(lower + 1, self.levels.shape[1] - 1)
+
+        start, end = self.levels[rows, lower], self.levels[rows, upper]
+        span = end - start
+        # Padded (and single) keyframes have no span, so they need no weight.
+        weight = np.divide(levels - start, span, out=np.zeros_like(span), where=span > 0)
+        weight = np.clip(weight, 0, 1)[:, None]
+
+        return self.stats[rows, lower] * (1 - weight) + self.stats[rows, upper] * weight
+
+
+async def select_phase_frames(phases: typing.Sequence[tuple[str, int]]) -> PhaseFrames:
+    """Get the stat keyframes of many elite phases in a single query.
+
+    Parameters
+    ----------
+    phases:
+        The character id and elite level of every phase to get the keyframes
+        of. These may contain duplicates.
+
+    Returns
+    -------
+    :class:`PhaseFrames`
+        The keyframes of the phases, in the same order.
+
+    Raises
+    ------
+    :class:`KeyError`
+        A phase does not exist.
+
+    """
+    if not phases:
+        return PhaseFrames.from_frames([])
+
+    table = static.StaticCharacterElitePhase
+    rows = await table.select(
+        table.character_id,
+        table.level,
+        table.frame_levels,
+        table.frame_stats,
+    ).where(table.character_id.is_in(list({character_id for character_id, _ in phases})))
+
+    by_phase = {
+        (row["character_id"], row["level"]): (row["frame_levels"], row["frame_stats"])
+        for row in rows
+    }
+    return PhaseFrames.from_frames([by_phase[phase] for phase in phases])
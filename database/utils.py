@@ -2,18 +2,26 @@
 
 """Simple database utilities."""
 
+import asyncio
+import itertools
 import typing
 
 from piccolo import columns, engine, table
 
+from database import replica as _replica
+
 __all__: typing.Sequence[str] = (
     "all_columns_but_pk",
+    "batched",
+    "bulk_insert",
+    "bulk_upsert",
+    "copy_upsert",
     "get_db",
     "rollback_transaction",
-    "bulk_insert",
 )
 
 T = typing.TypeVar("T")
+TableT = typing.TypeVar("TableT", bound=table.Table)
 
 PSQL_QUERY_ALLOWED_MAX_ARGS = 32767
 
@@ -23,12 +31,20 @@ class _MetaTable(table.Table):
     ...
 
 
-def get_db() -> engine.PostgresEngine:
-    """Get the database from any piccolo table."""
-    return typing.cast(
+def get_db(*, replica: bool = False) -> engine.PostgresEngine:
+    """Get the database from any piccolo table.
+
+    Pass ``replica=True`` to get the read replica instead. If no read replica
+    is configured, this returns the primary database.
+    """
+    db = typing.cast(
         engine.PostgresEngine,
         _MetaTable._meta.db,  # pyright: ignore  # noqa: SLF001
     )
+    if replica:
+        return db.extra_nodes.get(_replica.REPLICA_NODE, db)
+
+    return db
 
 
 async def rollback_transaction() -> None:
@@ -50,10 +66,11 @@ def all_columns_but_pk(table_: type[table.Table], /) -> list[columns.Column]:
     ]
 
 
-def batched(sequence: typing.Sequence[T], size: int) -> typing.Iterator[typing.Sequence[T]]:
-    stop = len(sequence)
-    for i in range(0, stop, size):
-        yield sequence[i : i + size]
+def batched(iterable: typing.Iterable[T], size: int) -> typing.Iterator[list[T]]:
+    """Lazily split an iterable into lists of at most ``size`` items."""
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
 
 
 async def bulk_insert(*rows: table.Table) -> None:
@@ -67,3 +84,150 @@ async def bulk_insert(*rows: table.Table) -> None:
 
     for batch in batched(rows, batch_size):
         await table_cls.insert(*batch)
+
+
+async def bulk_upsert(
+    rows: typing.Sequence[TableT],
+    *,
+    target: typing.Sequence[columns.Column],
+    values: typing.Sequence[columns.Column] | None = None,
+    concurrency: int = 1,
+) -> list[typing.Any]:
+    """Insert or update rows, batched such that the number of args doesn't exceed the maximum.
+
+    As with regular inserts, the primary keys of the rows are set in-place.
+
+    Parameters
+    ----------
+    rows:
+        The rows to upsert. These must all be of the same table, and no two
+        rows may have the same values for the ``target`` columns.
+    target:
+        The columns of a unique constraint that determine whether a row
+        already exists.
+    values:
+        The columns to update if a row already exists. Defaults to all columns
+        but the primary key, see :func:`all_columns_but_pk`.
+    concurrency:
+        The maximum number of batches to send at once. Each batch acquires its
+        own connection, so this should not exceed the size of the connection
+        pool. Inside a transaction, batches are always sent one at a time, as
+        a transaction is bound to a single connection.
+
+    Returns
+    -------
+    list[typing.Any]
+        The primary keys of the rows, in the same order as the rows.
+
+    """
+    if not rows:
+        return []
+
+    table_cls = type(rows[-1])
+    if values is None:
+        values = all_columns_but_pk(table_cls)
+
+    max_args = len(table_cls.all_columns())
+    batch_size = PSQL_QUERY_ALLOWED_MAX_ARGS // max_args
+
+    async def _upsert(batch: typing.Sequence[TableT]) -> None:
+        await table_cls.insert(*batch).on_conflict(
+            action="DO UPDATE",
+            target=target,
+            values=values,
+        )
+
+    if concurrency <= 1 or get_db().current_transaction.get():
+        for batch in batched(rows, batch_size):
+            await _upsert(batch)
+
+    else:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _pipelined_upsert(batch: typing.Sequence[TableT]) -> None:
+            async with semaphore:
+                await _upsert(batch)
+
+        await asyncio.gather(*map(_pipelined_upsert, batched(rows, batch_size)))
+
+    pk_name = table_cls._meta.primary_key._meta.name  # noqa: SLF001
+    return [getattr(row, pk_name) for row in rows]
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+async def copy_upsert(
+    table_: type[table.Table],
+    records: typing.Iterable[typing.Sequence[typing.Any]],
+    *,
+    columns_: typing.Sequence[columns.Column],
+    distinct_on: columns.Column | None = None,
+) -> int:
+    """Insert or update rows in bulk through COPY, without any argument-count batching.
+
+    The records are copied into a temporary staging table, which is then
+    merged into the target table in a single statement. Rows whose primary
+    key already exists are updated, all others are inserted. Columns that
+    are omitted, such as a serial primary key, get their default value.
+
+    Parameters
+    ----------
+    table_:
+        The table to insert rows into.
+    records:
+        The rows to insert, each with a value for every column in ``columns_``.
+    columns_:
+        The columns of the table for which the records contain values.
+    distinct_on:
+        If provided, existing rows are only updated if their value for this
+        column differs, such that unchanged rows are not rewritten. This is
+        typically a column holding a digest of the other values.
+
+    Returns
+    -------
+    :class:`int`
+        The number of rows that were actually inserted or updated.
+
+    """
+    target = table_._meta.tablename  # noqa: SLF001
+    staging = f"_staging_{target}"
+    pk_name = table_._meta.primary_key._meta.db_column_name  # noqa: SLF001
+    names = [column._meta.db_column_name for column in table_._meta.columns]  # noqa: SLF001
+
+    update_names = [name for name in names if name != pk_name]
+    action = (
+        "DO UPDATE SET "
+        + ", ".join(f"{_quote(name)} = EXCLUDED.{_quote(name)}" for name in update_names)
+        if update_names
+        else "DO NOTHING"
+    )
+    if distinct_on and update_names:
+        name = _quote(distinct_on._meta.db_column_name)  # noqa: SLF001
+        action += f" WHERE {_quote(target)}.{name} IS DISTINCT FROM EXCLUDED.{name}"
+    column_list = ", ".join(map(_quote, names))
+
+    async with get_db().transaction() as transaction:
+        connection = transaction.connection
+
+        # NOTE: Copying the defaults makes the staging table fill in omitted
+        #       serial primary keys from the sequence of the target table.
+        await connection.execute(
+            f"CREATE TEMPORARY TABLE {_quote(staging)} (LIKE {_quote(target)} INCLUDING DEFAULTS)",
+        )
+        await connection.copy_records_to_table(
+            staging,
+            records=records,
+            columns=[column._meta.db_column_name for column in columns_],  # noqa: SLF001
+        )
+        # NOTE: All identifiers come from table metadata, never from user input.
+        status = await connection.execute(
+            f"INSERT INTO {_quote(target)} ({column_list})"  # noqa: S608
+            f" SELECT {column_list} FROM {_quote(staging)}"
+            f" ON CONFLICT ({_quote(pk_name)}) {action}",
+        )
+        await connection.execute(f"DROP TABLE {_quote(staging)}")
+
+    # The status is formatted as "INSERT 0 <count>".
+    return int(status.rsplit(" ", 1)[-1])
@@ -0,0 +1,226 @@
+"""Tracking of the upstream gamedata versions that are loaded into the static tables.
+
+The digest and ETag of every upstream table are stored in the 'gamedata_version'
+table once its data is loaded, such that repopulating can be skipped for sources
+of which none of the tables changed since. Without caching, only the ETag of
+each table is known up front. See :func:`raw_data.download.table_version`.
+"""
+
+import asyncio
+import datetime
+import hashlib
+import typing
+
+import aiohttp
+
+import raw_data
+from database import models, populate, utils
+
+__all__: typing.Sequence[str] = (
+    "SOURCE_TABLES",
+    "fetch_upstream_versions",
+    "get_gamedata_version",
+    "get_loaded_versions",
+    "select_outdated_sources",
+    "store_versions",
+)
+
+_BASE_LOCALE: typing.Final[str] = "en_US"
+
+SOURCE_TABLES: typing.Final[typing.Mapping[str, typing.Sequence[tuple[str, str]]]] = {
+    "items": (("item_table", _BASE_LOCALE),),
+    "tags": (("gacha_table", _BASE_LOCALE),),
+    "skills": tuple(("skill_table", locale) for locale in raw_data.download.LOCALES),
+    "characters": (("character_table", _BASE_LOCALE),),
+}
+"""The upstream tables and locales each data source is read from, by source."""
+
+
+def _version_name(table: str, locale: str) -> str:
+    return f"{locale}/{table}"
+
+
+def _is_loaded(
+    version: raw_data.download.TableVersion,
+    loaded: typing.Mapping[str, str | None],
+) -> bool:
+    # Digests are compared whenever they are known, as unlike ETags they only
+    # depend on the contents of a table.
+    if version.digest and loaded["digest"]:
+        return version.digest == loaded["digest"]
+
+    return version.etag is not None and version.etag == loaded["etag"]
+
+
+async def fetch_upstream_versions(
+    sources: typing.Iterable[str] = populate.STATIC_SOURCES,
+    *,
+    session: aiohttp.ClientSession | None = None,
+) -> dict[str, raw_data.download.TableVersion]:
+    """Get the current upstream versions of the tables of the provided data sources.
+
+    This makes a single request per table, and downloads only the tables
+    that changed if caching is enabled. See :func:`raw_data.download.table_version`.
+
+    Parameters
+    ----------
+    sources:
+        The data sources to get the table versions of, out of
+        :data:`STATIC_SOURCES`.
+    session:
+        The session to use to check the tables. If not provided, a new
+        session is created.
+
+    Returns
+    -------
+    dict[:class:`str`, :class:`raw_data.download.TableVersion`]
+        The versions of the tables, by locale and table name, e.g.
+        ``"en_US/skill_table"``.
+
+    """
+    if not session:
+        async with aiohttp.ClientSession() as session:
+            return await fetch_upstream_versions(sources, session=session)
+
+    tables = [table for source in sources for table in SOURCE_TABLES[source]]
+    versions = await asyncio.gather(
+        *(
+            raw_data.download.table_version(session, table, locale=locale)
+            for table, locale in tables
+        ),
+    )
+
+    return {
+        _version_name(table, locale): version
+        for (table, locale), version in zip(tables, versions, strict=True)
+    }
+
+
+async def select_outdated_sources(
+    versions: typing.Mapping[str, raw_data.download.TableVersion],
+) -> list[str]:
+    """Get the data sources of which any table differs from the loaded version.
+
+    Parameters
+    ----------
+    versions:
+        The current upstream versions, as returned by :func:`fetch_upstream_versions`.
+        Only sources of which all tables are in here are checked.
+
+    Returns
+    -------
+    list[:class:`str`]
+        The outdated data sources, in the order of :data:`STATIC_SOURCES`.
+
+    """
+    rows = await models.GamedataVersion.select(
+        models.GamedataVersion.name,
+        models.GamedataVersion.digest,
+        models.GamedataVersion.etag,
+    )
+    loaded = {row["name"]: row for row in rows}
+
+    outdated: list[str] = []
+    for source in populate.STATIC_SOURCES:
+        names = [_version_name(table, locale) for table, locale in SOURCE_TABLES[source]]
+        if not all(name in versions for name in names):
+            continue
+
+        if not all(name in loaded and _is_loaded(versions[name], loaded[name]) for name in names):
+            outdated.append(source)
+
+    return outdated
+
+
+async def store_versions(
+    versions: typing.Mapping[str, raw_data.download.TableVersion],
+    sources: typing.Iterable[str] = populate.STATIC_SOURCES,
+) -> None:
+    """Record the versions of the tables of the provided data sources as loaded.
+
+    This should only be called once the data of these versions is written,
+    and with versions obtained before the data was read, such that a table
+    that changes in the meantime is loaded again next time.
+
+    Parameters
+    ----------
+    versions:
+        The upstream versions, as returned by :func:`fetch_upstream_versions`.
+    sources:
+        The data sources that were loaded. The versions of tables of any other
+        sources are ignored.
+
+    """
+    loaded_at = datetime.datetime.now(tz=datetime.UTC)
+    names = {
+        _version_name(table, locale)
+        for source in sources
+        for table, locale in SOURCE_TABLES[source]
+    }
+
+    await utils.bulk_upsert(
+        [
+            models.GamedataVersion(
+                name=name,
+                digest=version.digest,
+                etag=version.etag,
+                loaded_at=loaded_at,
+            )
+            for name, version in versions.items()
+            if name in names
+        ],
+        target=(models.GamedataVersion.name,),
+    )
+
+
+async def get_loaded_versions() -> dict[str, raw_data.download.TableVersion]:
+    """Get the versions of all upstream tables of which the data is currently loaded.
+
+    Returns
+    -------
+    dict[:class:`str`, :class:`raw_data.download.TableVersion`]
+        The versions of the tables, by locale and table name, as in
+        :func:`fetch_upstream_versions`. Tables that were never loaded are
+        left out.
+
+    """
+    rows = await models.GamedataVersion.select(
+        models.GamedataVersion.name,
+        models.GamedataVersion.digest,
+        models.GamedataVersion.etag,
+    )
+
+    return {
+        row["name"]: raw_data.download.TableVersion(digest=row["digest"], etag=row["etag"])
+        for row in rows
+    }
+
+
+async def get_gamedata_version() -> str | None:
+    """Get a digest identifying the versions of all gamedata that is currently loaded.
+
+    This changes whenever any of the static tables is repopulated with new
+    upstream data, which makes it suitable for use in cache keys. This costs
+    a single query over a handful of rows.
+
+    Returns
+    -------
+    :class:`str` | :data:`None`
+        The hex digest of all loaded table versions, or :data:`None` if no
+        versions were recorded yet.
+
+    """
+    rows = await models.GamedataVersion.select(
+        models.GamedataVersion.name,
+        models.GamedataVersion.digest,
+        models.GamedataVersion.etag,
+    ).order_by(models.GamedataVersion.name)
+
+    if not rows:
+        return None
+
+    digest = hashlib.sha256()
+    for row in rows:
+        digest.update(f"{row['name']}:{row['digest']}:{row['etag']}\n".encode())
+
+    return digest.hexdigest()
@@ -0,0 +1,62 @@
+"""Read-only models of the materialised views over the static tables.
+
+Unlike the models in :mod:`database.models`, these are not managed through
+piccolo's auto migrations. Their definitions live in hand-written migrations.
+"""
+
+import typing
+
+from piccolo import columns, table
+
+__all__: typing.Sequence[str] = (
+    "MATERIALISED_VIEWS",
+    "StaticCharacterSkillLevel",
+    "refresh_views",
+)
+
+
+class StaticCharacterSkillLevel(table.Table):
+    """A character's skill at a given level in a given locale.
+
+    This pre-joins the 'static_character_skill', 'static_skill',
+    'static_skill_level' and 'static_skill_localisation' tables, with a
+    unique index on (character_id, skill_id, level, locale). Skills without
+    any localisation have a single row per level, with a null locale.
+    """
+
+    # NOTE: This is not actually unique, but declaring a primary key prevents
+    #       piccolo from assuming a nonexistent id column.
+    character_skill_id = columns.Integer(primary_key=True)
+    character_id = columns.Varchar(64)
+    skill_id = columns.Varchar(64)
+    skill_num = columns.SmallInt()
+    display_id = columns.Varchar(64, null=True)
+    skill_type = columns.Varchar(32)
+    sp_type = columns.Varchar(32)
+    duration_type = columns.Varchar(32)
+    skill_level_id = columns.Integer()
+    level = columns.SmallInt()
+    sp_cost = columns.SmallInt()
+    initial_sp = columns.SmallInt()
+    charges = columns.SmallInt()
+    duration = columns.Decimal(digits=(8, 4))
+    blackboard = columns.JSONB()
+    skill_localisation_id = columns.Integer(null=True)
+    locale = columns.Varchar(8, null=True)
+    name = columns.Varchar(64, null=True)
+    description = columns.Varchar(1024, null=True)
+
+
+MATERIALISED_VIEWS: typing.Final[typing.Sequence[type[table.Table]]] = (StaticCharacterSkillLevel,)
+"""All materialised views over the static tables."""
+
+
+async def refresh_views() -> None:
+    """Refresh all materialised views to reflect the current static tables.
+
+    Views are refreshed concurrently, so readers are never blocked.
+    """
+    for view in MATERIALISED_VIEWS:
+        await view.raw(
+            f'REFRESH MATERIALIZED VIEW CONCURRENTLY "{view._meta.tablename}"',  # noqa: SLF001
+        )
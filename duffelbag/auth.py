@@ -376,6 +376,7 @@ async def get_user_by_platform(
     ...
 
 
+@database.reads_from_replica
 async def get_user_by_platform(
     *,
     platform: Platform,
@@ -574,6 +575,7 @@ async def remove_platform_account(
     )
 
 
+@database.reads_from_replica
 async def list_connected_accounts(
     duffelbag_user: database.DuffelbagUser,
     *,
@@ -775,6 +777,7 @@ async def remove_arknights_account(arknights_user: database.ArknightsUser) -> No
     await arknights_user.remove()
 
 
+@database.reads_from_replica
 async def list_arknights_accounts(
     duffelbag_user: database.DuffelbagUser,
 ) -> typing.Sequence[database.ArknightsUser]:
@@ -797,6 +800,7 @@ async def list_arknights_accounts(
     )  # fmt: skip
 
 
+@database.reads_from_replica
 async def get_active_arknights_account(
     duffelbag_user: database.DuffelbagUser,
 ) -> database.ArknightsUser:
@@ -872,6 +876,7 @@ async def set_active_arknights_account(
         await arknights_user.save(columns=[database.ArknightsUser.active])  # pyright: ignore
 
 
+@database.reads_from_replica
 async def get_arknights_account_by_server_uid(
     server: arkprts.ArknightsServer,
     game_uid: str,
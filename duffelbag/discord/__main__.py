@@ -11,9 +11,12 @@ import disnake
 import uvloop
 from disnake.ext import commands, components
 
+import database
 from duffelbag import log, shared
 from duffelbag.discord import bot, config, exts, localisation, manager
 
+_LOGGER = log.get_logger(__name__)
+
 # Extensions.
 
 
@@ -93,10 +96,22 @@ async def _main() -> None:
     for ext in _discover_exts():
         duffelbag.load_extension(ext)
 
-    async with _make_client_session() as session:
+    async with database.connection_pool(), _make_client_session() as session:
         _make_guest_client(session)
 
-        await duffelbag.start(config.BOT_CONFIG.DISCORD_TOKEN)
+        try:
+            await duffelbag.start(config.BOT_CONFIG.DISCORD_TOKEN)
+        finally:
+            # Log the pool usage before it is drained, such that the pool can
+            # be sized against the number of concurrent interactions.
+            stats = database.get_pool_stats()
+            _LOGGER.info(
+                "Connection pool peaked at %d/%d connections in use over %d acquisitions.",
+                stats.peak_in_use,
+                stats.max_size,
+                stats.acquisitions,
+            )
+            _LOGGER.info("Hottest query shapes:\n%s", database.format_top_queries())
 
 
 if __name__ == "__main__":
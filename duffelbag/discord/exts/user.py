@@ -8,6 +8,7 @@ import rapidfuzz
 from disnake.ext import commands, components, plugins
 
 import database
+import raw_data
 from duffelbag import auth, user_data
 
 plugin = plugins.Plugin()
@@ -196,7 +197,20 @@ async def character_autocomplete_template(
 @plugin.load_hook()
 async def finalise_char_autocompleters() -> None:
     """Finalise the character autocomplete template with various settings for various commands."""
-    characters = await database.StaticCharacter.objects()
+    # Prefer the gamedata snapshot, as reading it is far faster than querying
+    # all characters. It is only used if it was built from the same upstream
+    # data that is loaded into the database, such that every character on
+    # offer can actually be looked up.
+    snapshot = None
+    with database.read_replica():
+        if raw_data.get_snapshot_path():
+            loaded = raw_data.hash_versions(await database.get_loaded_versions())
+            snapshot = raw_data.read_snapshot(upstream=loaded) if loaded else None
+
+        if snapshot:
+            characters = snapshot.characters
+        else:
+            characters = await database.StaticCharacter.objects()
 
     min_mastery_rarity = 4  # 3* ops and below cannot have masteries.
     mastery_autocomplete = functools.partial(
@@ -3,6 +3,8 @@
 import decimal
 import typing
 
+import numpy as np
+import numpy.typing as npt
 import pydantic
 
 import database
@@ -26,22 +28,26 @@ class HybridCharacter(pydantic.BaseModel):
 
 
 class HybridSkillLevel(pydantic.BaseModel):
-    """A combination of the StaticSkill, StaticSkillLevel and StaticCharacterSkill models."""
+    """A combination of the StaticSkill, StaticSkillLevel and StaticCharacterSkill models.
+
+    This is read from the StaticCharacterSkillLevel materialised view.
+    """
 
     skill_id: str
-    character_skill_id: int = pydantic.Field(alias="id")
-    skill_level_id: int = pydantic.Field(alias="skill_id.id")
+    character_skill_id: int
+    skill_level_id: int
     character_id: str
     skill_num: int
     display_id: str
-    sp_cost: int = pydantic.Field(alias="skill_id.sp_cost")
-    initial_sp: int = pydantic.Field(alias="skill_id.initial_sp")
-    charges: int = pydantic.Field(alias="skill_id.charges")
-    duration: decimal.Decimal = pydantic.Field(alias="skill_id.duration")
-    level: int = pydantic.Field(alias="skill_id.level")
-    skill_type: str = pydantic.Field(alias="skill_id.skill_id.skill_type")
-    sp_type: str = pydantic.Field(alias="skill_id.skill_id.sp_type")
-    duration_type: str = pydantic.Field(alias="skill_id.skill_id.duration_type")
+    sp_cost: int
+    initial_sp: int
+    charges: int
+    duration: decimal.Decimal
+    level: int
+    skill_type: str
+    sp_type: str
+    duration_type: str
+    blackboard: pydantic.Json[dict[str, float]]
 
 
 async def store_characters(arknights_user: database.ArknightsUser) -> None:
@@ -62,27 +68,18 @@ async def store_characters(arknights_user: database.ArknightsUser) -> None:
         for character in api_characters
     ]
 
-    # NOTE: Inserting the characters updates the models in-place to contain the id key.
-    #       We need this for foreignkeys in skills and modules.
-    await (
-        database.UserCharacter.insert(*parsed_characters)
-        .on_conflict(
-            action="DO UPDATE",
-            target=(
-                database.UserCharacter.character_id,
-                database.UserCharacter.user_id,
-            ),
-            values=database.all_columns_but_pk(database.UserCharacter),
-        )
-    )  # fmt: skip
+    character_ids = await database.bulk_upsert(
+        parsed_characters,
+        target=(database.UserCharacter.character_id, database.UserCharacter.user_id),
+    )
 
     skills: list[database.UserCharacterSkill] = []
     modules: list[database.UserCharacterModule] = []
-    for parsed_char, character in zip(parsed_characters, api_characters, strict=True):
+    for character_id, character in zip(character_ids, api_characters, strict=True):
         skills.extend(
             database.UserCharacterSkill(
                 skill_id=skill.skill_id,
-                user_character_id=parsed_char.id,
+                user_character_id=character_id,
                 specialize_level=skill.specialize_level,
             )
             for skill in character.skills
@@ -91,37 +88,29 @@ async def store_characters(arknights_user: database.ArknightsUser) -> None:
         modules.extend(
             database.UserCharacterModule(
                 module_id=module_id,
-                user_character_id=parsed_char.id,
+                user_character_id=character_id,
                 level=module.level,
             )
             for module_id, module in character.equip.items()
         )
 
-    await (
-        database.UserCharacterSkill.insert(*skills)
-        .on_conflict(
-            action="DO UPDATE",
-            target=(
-                database.UserCharacterSkill.skill_id,
-                database.UserCharacterSkill.user_character_id,
-            ),
-            values=database.all_columns_but_pk(database.UserCharacterSkill),
-        )
-    )  # fmt: skip
-
-    await (
-        database.UserCharacterModule.insert(*modules)
-        .on_conflict(
-            action="DO UPDATE",
-            target=(
-                database.UserCharacterModule.module_id,
-                database.UserCharacterModule.user_character_id,
-            ),
-            values=database.all_columns_but_pk(database.UserCharacterModule),
-        )
-    )  # fmt: skip
+    await database.bulk_upsert(
+        skills,
+        target=(
+            database.UserCharacterSkill.skill_id,
+            database.UserCharacterSkill.user_character_id,
+        ),
+    )
+    await database.bulk_upsert(
+        modules,
+        target=(
+            database.UserCharacterModule.module_id,
+            database.UserCharacterModule.user_character_id,
+        ),
+    )
 
 
+@database.reads_from_replica
 async def get_character(
     character_id: str,
     arknights_user: database.ArknightsUser,
@@ -143,43 +132,92 @@ async def get_character(
     return HybridCharacter.model_validate(character)
 
 
+@database.reads_from_replica
 async def get_skill_localisations(
     character: database.UserCharacter | HybridCharacter,
     locale: str = "en_US",
 ) -> typing.Sequence[database.StaticSkillLocalisation]:
-    """Get localised information for a character's skills."""
-    joined = (
-        database.StaticSkillLocalisation.skill_id
-        .join_on(database.StaticCharacterSkill.skill_id)
-    )  # fmt: skip
-
-    return await database.StaticSkillLocalisation.objects().where(
-        (joined.character_id == character.character_id)  # type: ignore
-        & (database.StaticSkillLocalisation.locale == locale),
+    """Get localised information for a character's skills, ordered by skill number."""
+    view = database.StaticCharacterSkillLevel
+    rows = await (
+        view.select(
+            view.skill_localisation_id,
+            view.skill_id,
+            view.locale,
+            view.name,
+            view.description,
+        )
+        .where(
+            (view.character_id == character.character_id)
+            & (view.level == 1)  # Localisations are the same for every level.
+            & (view.locale == locale),
+        )
+        .order_by(view.skill_num)
     )
 
+    return [
+        database.StaticSkillLocalisation(
+            id=row["skill_localisation_id"],
+            skill_id=row["skill_id"],
+            locale=row["locale"],
+            name=row["name"],
+            description=row["description"],
+        )
+        for row in rows
+    ]
+
 
+@database.reads_from_replica
 async def get_skill_at_level(
     character: database.UserCharacter | HybridCharacter,
     skill_id: str,
     level: int,
 ) -> HybridSkillLevel:
     """Get aggregate skill information for a character's skill at a given level."""
-    joined = database.StaticCharacterSkill.skill_id.join_on(database.StaticSkillLevel.skill_id)
-
+    view = database.StaticCharacterSkillLevel
+    # The view has a row per locale, all of which hold the same skill level
+    # data, so any of them will do.
     skill = await (
-        database.StaticCharacterSkill.select(  # type: ignore
-            *database.StaticCharacterSkill.all_columns(),
-            *joined.all_columns(exclude=["skill_id"]),
-            *joined.skill_id.all_columns(),  # type: ignore
-        )
+        view.select()
         .where(
-            (database.StaticCharacterSkill.skill_id == skill_id)
-            & (database.StaticCharacterSkill.character_id == character.character_id)
-            & (joined.level == level),
+            (view.character_id == character.character_id)
+            & (view.skill_id == skill_id)
+            & (view.level == level),
         )
         .first()
     )
 
     assert skill
     return HybridSkillLevel.model_validate(skill)
+
+
+@database.reads_from_replica
+async def get_skill_blackboard(skill_id: str, level: int) -> dict[str, float]:
+    """Get the values used in the description of a skill at a given level, by key."""
+    skill_level = await (
+        database.StaticSkillLevel.select(database.StaticSkillLevel.blackboard)
+        .where(
+            (database.StaticSkillLevel.skill_id == skill_id)
+            & (database.StaticSkillLevel.level == level),
+        )
+        .output(load_json=True)
+        .first()
+    )
+
+    assert skill_level
+    return skill_level["blackboard"]
+
+
+@database.reads_from_replica
+async def get_character_stats(
+    characters: typing.Sequence[database.UserCharacter | HybridCharacter],
+) -> npt.NDArray[np.float64]:
+    """Get the base stats of many characters at their current elite phase and level at once.
+
+    The stats of each character are in the order of :data:`database.ELITE_PHASE_STATS`,
+    and do not include any bonuses from e.g. trust, potentials or modules.
+    """
+    frames = await database.select_phase_frames(
+        [(character.character_id, character.evolve_phase) for character in characters],
+    )
+    return frames.at([character.level for character in characters])
@@ -3,13 +3,25 @@
 import os
 
 import dotenv
-from piccolo import engine
 from piccolo.conf import apps
 
+from database import instrumentation, replica
+
 dotenv.load_dotenv()
 
 
-DB = engine.PostgresEngine(config={"dsn": os.environ["DB_URI"]})
+_REPLICA_URI = os.environ.get("DB_REPLICA_URI")
+
+DB = replica.ReplicaRoutingEngine(
+    config={"dsn": os.environ["DB_URI"]},
+    extra_nodes={
+        replica.REPLICA_NODE: instrumentation.InstrumentedPostgresEngine(
+            config={"dsn": _REPLICA_URI},
+        ),
+    }
+    if _REPLICA_URI
+    else {},
+)
 
 
 APP_REGISTRY = apps.AppRegistry(apps=["database.piccolo_app"])
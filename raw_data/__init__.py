@@ -2,3 +2,4 @@
 
 from .models import *
 from .parse import *
+from .snapshot import *
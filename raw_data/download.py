@@ -0,0 +1,524 @@
+"""Downloading and on-disk caching of raw gamedata tables."""
+
+import asyncio
+import hashlib
+import http
+import json
+import logging
+import os
+import pathlib
+import random
+import typing
+
+import aiohttp
+import dotenv
+
+__all__: typing.Sequence[str] = (
+    "LOCALES",
+    "CacheEntry",
+    "GamedataCache",
+    "TableChangedError",
+    "TableVersion",
+    "get_cache",
+    "get_gamedata_dir",
+    "iter_table",
+    "read_table",
+    "set_cache",
+    "set_gamedata_dir",
+    "table_digest",
+    "table_version",
+)
+
+dotenv.load_dotenv()
+
+
+_GAMEDATA_URL_FMT: typing.Final[str] = "https://raw.githubusercontent.com/{repo}/master/{path}"
+_GLOBAL_REPO: typing.Final[str] = "Kengxxiao/ArknightsGameData_YoStar"
+_GAMEDATA_REPOS: typing.Final[typing.Mapping[str, str]] = {
+    "en_US": _GLOBAL_REPO,
+    "ja_JP": _GLOBAL_REPO,
+    "ko_KR": _GLOBAL_REPO,
+    "zh_CN": "Kengxxiao/ArknightsGameData",
+}
+
+LOCALES: typing.Final[typing.Sequence[str]] = tuple(_GAMEDATA_REPOS)
+"""All locales for which gamedata is available."""
+
+# Size of the chunks in which tables are read, both from disk and from the network.
+CHUNK_SIZE: typing.Final[int] = 2**16
+
+# Number of times a failed request is retried before giving up, and the base
+# and maximum delay in seconds between retries.
+MAX_RETRIES: typing.Final[int] = 5
+_BACKOFF_BASE: typing.Final[float] = 0.5
+_BACKOFF_MAX: typing.Final[float] = 30
+
+_RETRY_STATUSES: typing.Final[frozenset[int]] = frozenset(
+    (
+        http.HTTPStatus.REQUEST_TIMEOUT,
+        http.HTTPStatus.TOO_MANY_REQUESTS,
+        http.HTTPStatus.INTERNAL_SERVER_ERROR,
+        http.HTTPStatus.BAD_GATEWAY,
+        http.HTTPStatus.SERVICE_UNAVAILABLE,
+        http.HTTPStatus.GATEWAY_TIMEOUT,
+    ),
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TableChangedError(Exception):
+    """A gamedata table changed upstream while it was being downloaded.
+
+    As part of the old version was already consumed, the download cannot be
+    resumed. Downloading the table again from the start will succeed.
+    """
+
+
+class CacheEntry(typing.NamedTuple):
+    """The most recently downloaded version of a gamedata table."""
+
+    digest: str
+    """The SHA-256 hex digest of the table contents."""
+    etag: str | None
+    """The ETag the upstream server returned for this version, if any."""
+
+
+class TableVersion(typing.NamedTuple):
+    """A version of a gamedata table, identified by its digest, its ETag, or both."""
+
+    digest: str | None
+    """The SHA-256 hex digest of the table contents, if they were read."""
+    etag: str | None
+    """The ETag the upstream server returned for this version, if any."""
+
+
+class GamedataCache:
+    """A content-addressed on-disk store for downloaded gamedata tables.
+
+    Table contents are stored in ``objects/`` under their SHA-256 digest. A
+    small JSON index maps the URL of each table to the digest and ETag of its
+    most recently downloaded version, such that repeat downloads can be
+    skipped using conditional requests.
+    """
+
+    def __init__(self, directory: str | os.PathLike[str]) -> None:
+        self.directory = pathlib.Path(directory)
+        self._objects = self.directory / "objects"
+        self._index_path = self.directory / "index.json"
+
+    def _read_index(self) -> dict[str, dict[str, str | None]]:
+        try:
+            return json.loads(self._index_path.read_bytes())
+        except FileNotFoundError:
+            return {}
+
+    def lookup(self, url: str) -> CacheEntry | None:
+        """Get the cached version of the table at the provided url, if any."""
+        entry = self._read_index().get(url)
+        if not entry or not self.path(typing.cast(str, entry["digest"])).is_file():
+            return None
+
+        return CacheEntry(**entry)  # pyright: ignore[reportGeneralTypeIssues]
+
+    def path(self, digest: str) -> pathlib.Path:
+        """Get the path at which the table contents with the provided digest are stored."""
+        return self._objects / f"{digest}.json"
+
+    def open_writer(self, url: str, *, etag: str | None) -> "_CacheWriter":
+        """Open a writer that stores a new version of the table at the provided url."""
+        self._objects.mkdir(parents=True, exist_ok=True)
+        return _CacheWriter(self, url, etag)
+
+    def _commit(self, url: str, entry: CacheEntry) -> None:
+        index = self._read_index()
+        index[url] = entry._asdict()
+
+        # Write to a temporary file first such that the index is never left
+        # in a partially written state.
+        tmp_path = self._index_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(index, indent=4))
+        tmp_path.replace(self._index_path)
+
+
+class _CacheWriter:
+    def __init__(self, cache: GamedataCache, url: str, etag: str | None) -> None:
+        self._cache = cache
+        self._url = url
+        self._etag = etag
+        self._hash = hashlib.sha256()
+        self._tmp_path = cache.path(f"{os.getpid()}-{id(self)}").with_suffix(".part")
+        self._file = self._tmp_path.open("wb")
+
+    def write(self, chunk: bytes) -> None:
+        self._hash.update(chunk)
+        self._file.write(chunk)
+
+    def commit(self) -> CacheEntry:
+        self._file.close()
+
+        entry = CacheEntry(digest=self._hash.hexdigest(), etag=self._etag)
+        self._tmp_path.replace(self._cache.path(entry.digest))
+        self._cache._commit(self._url, entry)  # noqa: SLF001
+
+        return entry
+
+    def abort(self) -> None:
+        self._file.close()
+        self._tmp_path.unlink(missing_ok=True)
+
+
+def _env_path(name: str) -> pathlib.Path | None:
+    value = os.environ.get(name)
+    return pathlib.Path(value) if value else None
+
+
+_cache: GamedataCache | None = (
+    GamedataCache(cache_dir) if (cache_dir := _env_path("GAMEDATA_CACHE_DIR")) else None
+)
+_gamedata_dir: pathlib.Path | None = _env_path("GAMEDATA_DIR")
+
+
+def get_cache() -> GamedataCache | None:
+    """Get the gamedata cache, if caching is enabled.
+
+    By default, this is read from the ``GAMEDATA_CACHE_DIR`` environment variable.
+    """
+    return _cache
+
+
+def set_cache(directory: str | os.PathLike[str] | None) -> None:
+    """Set the directory in which to cache gamedata. Pass ``None`` to disable caching."""
+    global _cache  # noqa: PLW0603
+
+    _cache = GamedataCache(directory) if directory else None
+
+
+def get_gamedata_dir() -> pathlib.Path | None:
+    """Get the local gamedata checkout to read tables from, if offline mode is enabled.
+
+    By default, this is read from the ``GAMEDATA_DIR`` environment variable.
+    """
+    return _gamedata_dir
+
+
+def set_gamedata_dir(directory: str | os.PathLike[str] | None) -> None:
+    """Set a local ArknightsGameData checkout to read tables from instead of downloading them.
+
+    Pass ``None`` to go back to downloading tables.
+    """
+    global _gamedata_dir  # noqa: PLW0603
+
+    _gamedata_dir = pathlib.Path(directory) if directory else None
+
+
+def _table_path(table: str, locale: str) -> str:
+    return f"{locale}/gamedata/excel/{table}.json"
+
+
+def _table_url(table: str, locale: str) -> str:
+    return _GAMEDATA_URL_FMT.format(repo=_GAMEDATA_REPOS[locale], path=_table_path(table, locale))
+
+
+def _iter_file(path: pathlib.Path) -> typing.Iterator[bytes]:
+    with path.open("rb") as file:
+        while chunk := file.read(CHUNK_SIZE):
+            yield chunk
+
+
+def _is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, aiohttp.ClientResponseError):
+        return exc.status in _RETRY_STATUSES
+
+    return isinstance(exc, aiohttp.ClientError | TimeoutError)
+
+
+def _backoff(attempt: int) -> float:
+    # "Full jitter" backoff, such that concurrent downloads that failed at the
+    # same time do not all retry at the same time.
+    return random.uniform(0, min(_BACKOFF_MAX, _BACKOFF_BASE * 2**attempt))  # noqa: S311
+
+
+class _Download:
+    """The state of a table download, kept across retries."""
+
+    def __init__(self, url: str, cache: GamedataCache | None) -> None:
+        self.url = url
+        self.cache = cache
+        self.entry = cache.lookup(url) if cache else None
+        self.etag: str | None = None
+        self.offset = 0
+        self._writer: _CacheWriter | None = None
+
+    def headers(self) -> dict[str, str]:
+        if not self.offset:
+            return {"If-None-Match": self.entry.etag} if self.entry and self.entry.etag else {}
+
+        # Resume the download, but only if the table did not change since.
+        headers = {"Range": f"bytes={self.offset}-"}
+        if self.etag:
+            headers["If-Range"] = self.etag
+
+        return headers
+
+    def cached_path(self, response: aiohttp.ClientResponse) -> pathlib.Path | None:
+        if self.offset or not self.entry or response.status != http.HTTPStatus.NOT_MODIFIED:
+            return None
+
+        assert self.cache
+        return self.cache.path(self.entry.digest)
+
+    def start(self, response: aiohttp.ClientResponse) -> int:
+        """Prepare to read a response, returning the number of bytes to skip."""
+        if not self.offset:
+            # An earlier attempt may have failed after its headers arrived but
+            # before any of its body did. Its writer holds nothing of use.
+            self.abort()
+            self.etag = response.headers.get("ETag")
+            self._writer = self.cache.open_writer(self.url, etag=self.etag) if self.cache else None
+            return 0
+
+        if response.status == http.HTTPStatus.PARTIAL_CONTENT:
+            return 0
+
+        # The server sent the entire table, either because it does not support
+        # ranges or because the table changed.
+        if not self.etag or response.headers.get("ETag") != self.etag:
+            raise TableChangedError(self.url)
+
+        return self.offset
+
+    def feed(self, chunk: bytes) -> None:
+        self.offset += len(chunk)
+        if self._writer:
+            self._writer.write(chunk)
+
+    def commit(self) -> CacheEntry | None:
+        return self._writer.commit() if self._writer else None
+
+    def abort(self) -> None:
+        if self._writer:
+            self._writer.abort()
+            self._writer = None
+
+
+async def _iter_response(
+    response: aiohttp.ClientResponse,
+    skip: int,
+) -> typing.AsyncIterator[bytes]:
+    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+        if skip >= len(chunk):
+            skip -= len(chunk)
+            continue
+
+        yield chunk[skip:] if skip else chunk
+        skip = 0
+
+
+async def _wait_to_retry(url: str, offset: int, exc: Exception, attempt: int) -> None:
+    if attempt > MAX_RETRIES or not _is_retryable(exc):
+        raise exc
+
+    delay = _backoff(attempt)
+    _LOGGER.warning(
+        "Failed to download %s at offset %d (%s), retrying in %.1fs...",
+        url,
+        offset,
+        exc,
+        delay,
+    )
+    await asyncio.sleep(delay)
+
+
+async def _iter_download(
+    session: aiohttp.ClientSession,
+    download: _Download,
+    *,
+    read_cached: bool = True,
+) -> typing.AsyncIterator[bytes]:
+    attempt = 0
+
+    while True:
+        try:
+            async with session.get(download.url, headers=download.headers()) as response:
+                if cached_path := download.cached_path(response):
+                    if read_cached:
+                        for chunk in _iter_file(cached_path):
+                            yield chunk
+
+                    return
+
+                response.raise_for_status()
+
+                async for chunk in _iter_response(response, download.start(response)):
+                    download.feed(chunk)
+                    yield chunk
+
+        except (aiohttp.ClientError, TimeoutError) as exc:
+            attempt += 1
+            await _wait_to_retry(download.url, download.offset, exc, attempt)
+
+        else:
+            return
+
+
+async def _head_etag(session: aiohttp.ClientSession, url: str) -> str | None:
+    attempt = 0
+
+    while True:
+        try:
+            async with session.head(url) as response:
+                response.raise_for_status()
+                return response.headers.get("ETag")
+
+        except (aiohttp.ClientError, TimeoutError) as exc:
+            attempt += 1
+            await _wait_to_retry(url, 0, exc, attempt)
+
+
+async def iter_table(
+    session: aiohttp.ClientSession,
+    table: str,
+    *,
+    locale: str = "en_US",
+) -> typing.AsyncIterator[bytes]:
+    """Read a gamedata table in chunks.
+
+    If a local gamedata checkout was set through :func:`set_gamedata_dir`, the
+    table is read from there and nothing is downloaded. Otherwise, if caching
+    is enabled, the cached version of the table is validated against upstream
+    using its ETag and only downloaded again if it changed.
+
+    Failed requests are retried up to :data:`MAX_RETRIES` times with jittered
+    exponential backoff. If a download fails partway through, it is resumed
+    from where it left off using a range request.
+
+    Parameters
+    ----------
+    session:
+        The session to use to download the table.
+    table:
+        The name of the table, e.g. ``"character_table"``.
+    locale:
+        The locale of the table. Must be one of :data:`LOCALES`.
+
+    Yields
+    ------
+    :class:`bytes`
+        Chunks of the JSON-encoded table.
+
+    Raises
+    ------
+    :class:`TableChangedError`
+        The table changed upstream while a failed download was being resumed.
+
+    """
+    if _gamedata_dir:
+        for chunk in _iter_file(_gamedata_dir / _table_path(table, locale)):
+            yield chunk
+
+        return
+
+    download = _Download(_table_url(table, locale), _cache)
+    try:
+        async for chunk in _iter_download(session, download):
+            yield chunk
+
+    except BaseException:
+        download.abort()
+        raise
+
+    download.commit()
+
+
+async def read_table(
+    session: aiohttp.ClientSession,
+    table: str,
+    *,
+    locale: str = "en_US",
+) -> bytes:
+    """Read an entire gamedata table. See :func:`iter_table` for details."""
+    return b"".join([chunk async for chunk in iter_table(session, table, locale=locale)])
+
+
+async def table_version(
+    session: aiohttp.ClientSession,
+    table: str,
+    *,
+    locale: str = "en_US",
+) -> TableVersion:
+    """Get the current version of a gamedata table.
+
+    If caching is enabled, this costs a single conditional request. If the
+    table changed, its new version is downloaded into the cache by the same
+    request, such that reading it afterwards makes no further downloads.
+    Without caching, this only makes a HEAD request to get the ETag of the
+    table, and only reads the entire table if upstream returns no ETag. If
+    a local gamedata checkout was set, the table is read from there.
+
+    See :func:`iter_table` for details.
+
+    Parameters
+    ----------
+    session:
+        The session to use to check the table.
+    table:
+        The name of the table, e.g. ``"character_table"``.
+    locale:
+        The locale of the table. Must be one of :data:`LOCALES`.
+
+    Returns
+    -------
+    :class:`TableVersion`
+        The version of the table. Its digest is only known if caching is
+        enabled or the table had to be read, and its ETag is only known if
+        the table was not read from a local gamedata checkout.
+
+    """
+    url = _table_url(table, locale)
+
+    if not _gamedata_dir and _cache:
+        download = _Download(url, _cache)
+        try:
+            async for _ in _iter_download(session, download, read_cached=False):
+                pass
+
+        except BaseException:
+            download.abort()
+            raise
+
+        # Without a new version, the cached version is still up to date.
+        entry = download.commit() or download.entry
+        assert entry
+        return TableVersion(entry.digest, entry.etag)
+
+    if not _gamedata_dir and (etag := await _head_etag(session, url)):
+        return TableVersion(None, etag)
+
+    digest = hashlib.sha256()
+    async for chunk in iter_table(session, table, locale=locale):
+        digest.update(chunk)
+
+    return TableVersion(digest.hexdigest(), None)
+
+
+async def table_digest(
+    session: aiohttp.ClientSession,
+    table: str,
+    *,
+    locale: str = "en_US",
+) -> str:
+    """Get the SHA-256 hex digest of the current version of a gamedata table.
+
+    Unlike :func:`table_version`, this always reads the entire table if
+    caching is disabled. See :func:`table_version` for details.
+    """
+    version = await table_version(session, table, locale=locale)
+    if version.digest:
+        return version.digest
+
+    digest = hashlib.sha256()
+    async for chunk in iter_table(session, table, locale=locale):
+        digest.update(chunk)
+
+    return digest.hexdigest()
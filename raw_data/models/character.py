@@ -1,9 +1,17 @@
-"""Gamedata models related to Arknights character information."""
+"""Gamedata models related to Arknights character information.
 
+Sub-trees that are rarely used are stored as raw data and only validated
+when they are first accessed. Pass ``context={"strict": True}`` to
+:meth:`RawCharacter.model_validate` to validate them eagerly instead.
+"""
+
+import functools
 import typing
 
 import pydantic
 
+from . import interning
+
 __all__: typing.Sequence[str] = (
     "RawCharacter",
     "RawCharacterSkill",
@@ -27,6 +35,49 @@ PhaseValidator = _removeprefix_validator("PHASE_")
 RarityValidator = _removeprefix_validator("TIER_")
 
 
+def _is_strict(info: pydantic.ValidationInfo) -> bool:
+    return bool(info.context and info.context.get("strict"))
+
+
+def _lazy(
+    raw_field: str,
+    type_: type[T],
+) -> functools.cached_property[T]:
+    # Validates the raw data in the provided field on first access. As this
+    # writes directly to the instance dict, it works on frozen models too.
+    # Only use this on subclasses of _LazyModel, which keep equality intact.
+    adapter = pydantic.TypeAdapter(type_)
+
+    def _validate(self: pydantic.BaseModel) -> T:
+        return adapter.validate_python(getattr(self, raw_field))
+
+    return functools.cached_property(_validate)
+
+
+class _LazyModel(pydantic.BaseModel, frozen=True):
+    # Values of lazy properties are cached in the instance dict, alongside the
+    # fields. Only the fields are compared, such that an instance of which a
+    # lazy property was read still equals one of which it was not.
+
+    def _field_values(self, *, hashable: bool = False) -> tuple[typing.Any, ...]:
+        # The raw sub-trees are plain (unhashable) JSON. Leaving them out of
+        # the hash is fine, as equal models have equal raw sub-trees anyway.
+        return tuple(
+            self.__dict__[name]
+            for name in self.model_fields
+            if not (hashable and name.startswith("raw_"))
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, _LazyModel):
+            return NotImplemented
+
+        return type(self) is type(other) and self._field_values() == other._field_values()
+
+    def __hash__(self) -> int:
+        return hash((type(self), self._field_values(hashable=True)))
+
+
 class RawCharacterAttributes(pydantic.BaseModel, frozen=True):
     HP: int = pydantic.Field(alias="maxHp")
     ATK: int = pydantic.Field(alias="atk")
@@ -45,17 +96,31 @@ class RawAttributeKeyframe(pydantic.BaseModel, frozen=True):
 
 
 class RawItem(pydantic.BaseModel, frozen=True):
-    id: str
+    id: interning.InternedStr
     count: int
 
 
-class RawPhase(pydantic.BaseModel, frozen=True):  # TODO: rename?
+# Many characters share the exact same costs, so equal cost lists share one sequence.
+Cost = typing.Annotated[Sequence[RawItem], pydantic.AfterValidator(interning.intern_tuple)]
+
+
+class RawPhase(_LazyModel, frozen=True):  # TODO: rename?
     """Gamedata model containing character elite phase information."""
 
     character_id: str = pydantic.Field(alias="characterPrefabKey")
     max_level: int = pydantic.Field(alias="maxLevel")
-    frames: Sequence[RawAttributeKeyframe] = pydantic.Field(alias="attributesKeyFrames")
-    cost: Sequence[RawItem] | None = pydantic.Field(alias="evolveCost")
+    raw_frames: list[typing.Any] = pydantic.Field(alias="attributesKeyFrames", repr=False)
+    cost: Cost | None = pydantic.Field(alias="evolveCost")
+
+    frames = _lazy("raw_frames", Sequence[RawAttributeKeyframe])
+    """The attribute keyframes of this elite phase, validated on first access."""
+
+    @pydantic.model_validator(mode="after")
+    def _validate_strict(self, info: pydantic.ValidationInfo) -> "RawPhase":
+        if _is_strict(info):
+            _ = self.frames
+
+        return self
 
 
 class RawUnlockCondition(pydantic.BaseModel, frozen=True):
@@ -68,7 +133,7 @@ class RawSkillCost(pydantic.BaseModel, frozen=True):
 
     unlock_condition: RawUnlockCondition = pydantic.Field(alias="unlockCond")
     training_time: int = pydantic.Field(alias="lvlUpTime")
-    cost: Sequence[RawItem] | None = pydantic.Field(alias="levelUpCost")
+    cost: Cost | None = pydantic.Field(alias="levelUpCost")
 
 
 class RawCharacterSkill(pydantic.BaseModel, frozen=True):
@@ -99,28 +164,42 @@ class RawSharedSkillCost(pydantic.BaseModel, frozen=True):
     """Gamedata model containing character shared skill cost information."""
 
     unlock_condition: RawUnlockCondition = pydantic.Field("unlockCond")
-    cost: Sequence[RawItem] | None = pydantic.Field(alias="lvlUpCost")
+    cost: Cost | None = pydantic.Field(alias="lvlUpCost")
 
 
-class RawCharacter(pydantic.BaseModel, frozen=True):
+class RawCharacter(_LazyModel, frozen=True):
     """Gamedata model containing character information."""
 
     name: str
     description: str
-    position: str
-    tags: Sequence[str] = pydantic.Field(alias="tagList")
+    position: interning.InternedStr
+    tags: Sequence[interning.InternedStr] = pydantic.Field(alias="tagList")
     rarity: typing.Annotated[int, RarityValidator]
-    profession: str
-    sub_profession: str = pydantic.Field(alias="subProfessionId")
+    profession: interning.InternedStr
+    sub_profession: interning.InternedStr = pydantic.Field(alias="subProfessionId")
     is_alter: bool = pydantic.Field(alias="isSpChar")
 
     phases: Sequence[RawPhase]
     skills: Sequence[RawCharacterSkill]
-    talents: Sequence[RawTalent]
-    potentials: Sequence[RawPotential] = pydantic.Field(alias="potentialRanks")
-    trust_bonuses: Sequence[RawAttributeKeyframe] = pydantic.Field(alias="favorKeyFrames")
+    raw_talents: list[typing.Any] = pydantic.Field(alias="talents", repr=False)
+    raw_potentials: list[typing.Any] = pydantic.Field(alias="potentialRanks", repr=False)
+    raw_trust_bonuses: list[typing.Any] = pydantic.Field(alias="favorKeyFrames", repr=False)
     shared_skills: Sequence[RawSharedSkillCost] = pydantic.Field(alias="allSkillLvlup")
 
+    talents = _lazy("raw_talents", Sequence[RawTalent])
+    """The talents of this character, validated on first access."""
+    potentials = _lazy("raw_potentials", Sequence[RawPotential])
+    """The potential ranks of this character, validated on first access."""
+    trust_bonuses = _lazy("raw_trust_bonuses", Sequence[RawAttributeKeyframe])
+    """The trust bonus keyframes of this character, validated on first access."""
+
+    @pydantic.model_validator(mode="after")
+    def _validate_strict(self, info: pydantic.ValidationInfo) -> "RawCharacter":
+        if _is_strict(info):
+            _ = self.talents, self.potentials, self.trust_bonuses
+
+        return self
+
     @property
     def id(self) -> str:
         """The id of the character."""
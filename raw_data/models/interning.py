@@ -0,0 +1,101 @@
+"""Validators that deduplicate frequently repeating gamedata values.
+
+Gamedata contains many repeated values, such as blackboard keys, profession
+ids and cost lists. Annotating fields with the types in this module makes
+all equal values share a single object, which greatly reduces the memory
+held by long-running processes that keep parsed gamedata around.
+"""
+
+import sys
+import typing
+import weakref
+
+import pydantic
+
+__all__: typing.Sequence[str] = ("InternedStr", "InternedTuple", "intern", "intern_tuple")
+
+_T = typing.TypeVar("_T", bound=typing.Hashable)
+_T_co = typing.TypeVar("_T_co", bound=typing.Hashable, covariant=True)
+_ModelT = typing.TypeVar("_ModelT", bound=pydantic.BaseModel)
+
+# NOTE: Canonical instances are only kept for as long as they are in use, such
+#       that reparsing the gamedata in a long-running process does not keep
+#       every value that was ever interned around. As such, the keys must
+#       never refer to the canonical instance itself.
+_canonical: weakref.WeakValueDictionary[typing.Hashable, typing.Any] = weakref.WeakValueDictionary()
+
+
+class InternedTuple(typing.Sequence[_T_co]):
+    """An immutable sequence of which all equal instances are the same object.
+
+    Unlike tuples, these can be weakly referenced, such that they are only kept
+    around for as long as they are in use. They compare equal to tuples with
+    the same items. See :func:`intern_tuple`.
+    """
+
+    __slots__ = ("__weakref__", "_hash", "_items")
+
+    def __init__(self, items: tuple[_T_co, ...]) -> None:
+        self._items = items
+        self._hash = hash(items)
+
+    @typing.overload
+    def __getitem__(self, index: int) -> _T_co: ...
+
+    @typing.overload
+    def __getitem__(self, index: slice) -> tuple[_T_co, ...]: ...
+
+    def __getitem__(self, index: int | slice) -> _T_co | tuple[_T_co, ...]:
+        return self._items[index]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> typing.Iterator[_T_co]:
+        return iter(self._items)
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, InternedTuple):
+            return self is other or self._items == other._items
+
+        if isinstance(other, tuple):
+            return self._items == other
+
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._items!r})"
+
+    def __reduce__(self) -> tuple[typing.Any, ...]:
+        # Intern again when unpickled, such that snapshots are deduplicated too.
+        return (intern_tuple, (self._items,))
+
+
+def intern(value: _ModelT) -> _ModelT:
+    """Get the canonical instance of a frozen model."""
+    key = (type(value), *value.__dict__.values())
+    canonical = _canonical.get(key)
+    if canonical is None:
+        _canonical[key] = canonical = value
+
+    return canonical
+
+
+def intern_tuple(values: typing.Iterable[_T]) -> InternedTuple[_T]:
+    """Get the canonical instance of a sequence, with all of its frozen model items interned too."""
+    items = tuple(
+        intern(value) if isinstance(value, pydantic.BaseModel) else value for value in values
+    )
+    key = (InternedTuple, items)
+    canonical = _canonical.get(key)
+    if canonical is None:
+        _canonical[key] = canonical = InternedTuple(items)
+
+    return canonical
+
+
+InternedStr = typing.Annotated[str, pydantic.AfterValidator(sys.intern)]
+"""A string that is interned after validation."""
@@ -4,7 +4,9 @@ import typing
 
 import pydantic
 
-__all__: typing.Sequence[str] = ("RawSkill", "RawSkillLevel")
+from . import interning
+
+__all__: typing.Sequence[str] = ("RawSkill", "RawSkillLevel", "RawSkillLocalisation")
 
 
 def _fix_sp_type(sp_type: int | str) -> str:
@@ -15,7 +17,7 @@ def _fix_sp_type(sp_type: int | str) -> str:
     return sp_type
 
 
-SpType = typing.Annotated[str, pydantic.BeforeValidator(_fix_sp_type)]
+SpType = typing.Annotated[interning.InternedStr, pydantic.BeforeValidator(_fix_sp_type)]
 
 
 class RawSpData(pydantic.BaseModel):
@@ -26,7 +28,7 @@ class RawSpData(pydantic.BaseModel):
 
 
 class RawSkillBlackboard(pydantic.BaseModel):
-    key: str
+    key: interning.InternedStr
     value: float
 
 
@@ -38,8 +40,8 @@ class RawSkillLevel(pydantic.BaseModel):
     duration: float
     sp_data: RawSpData = pydantic.Field(alias="spData")
     blackboard: list[RawSkillBlackboard]
-    skill_type: str = pydantic.Field(alias="skillType")
-    duration_type: str = pydantic.Field(alias="durationType")
+    skill_type: interning.InternedStr = pydantic.Field(alias="skillType")
+    duration_type: interning.InternedStr = pydantic.Field(alias="durationType")
 
 
 class RawSkill(pydantic.BaseModel):
@@ -47,3 +49,19 @@ class RawSkill(pydantic.BaseModel):
 
     id: str = pydantic.Field(alias="skillId")
     levels: typing.Sequence[RawSkillLevel]
+
+
+class RawSkillLevelLocalisation(pydantic.BaseModel):
+    name: str
+    description: str
+
+
+class RawSkillLocalisation(pydantic.BaseModel):
+    """Gamedata model containing only the localised text of a character skill.
+
+    This is used for locales of which only the text is stored, such that the
+    rest of the skill data does not need to be validated for every locale.
+    """
+
+    id: str = pydantic.Field(alias="skillId")
+    levels: typing.Sequence[RawSkillLevelLocalisation]
@@ -4,6 +4,8 @@ import typing
 
 import pydantic
 
+from . import interning
+
 __all__: typing.Sequence[str] = ("RawTag",)
 
 
@@ -11,4 +13,4 @@ class RawTag(pydantic.BaseModel):
     """Gamedata model containing character tag information."""
 
     id: int = pydantic.Field(alias="tagId")
-    name: str = pydantic.Field(alias="tagName")
+    name: interning.InternedStr = pydantic.Field(alias="tagName")
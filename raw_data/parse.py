@@ -1,39 +1,269 @@
 """Helper functions to fetch and parse large gamedata JSON files."""
 
 import asyncio
+import concurrent.futures
+import functools
+import itertools
+import json
+import os
 import typing
 
 import aiohttp
+import pydantic
 
-from . import models
+from . import download, models, stream
 
 _all__: typing.Sequence[str] = (
     "fetch_all",
     "fetch_characters",
     "fetch_items",
+    "fetch_skill_localisations",
     "fetch_skills",
     "fetch_tags",
+    "parse_characters",
+    "parse_items",
+    "parse_skill_localisations",
+    "parse_skills",
+    "parse_tags",
+    "stream_characters",
+    "stream_skill_localisations",
+    "stream_skills",
 )
 
+_T = typing.TypeVar("_T")
 
-# fmt: off
-_CHARACTER_DATA_URL: typing.Final[str] = (
-    "https://raw.githubusercontent.com/Kengxxiao/ArknightsGameData_YoStar/master/en_US/gamedata/excel/character_table.json"
+
+def _is_character(id_: str) -> bool:
+    return id_.startswith("char")
+
+
+def _is_obtainable(character: dict[str, typing.Any]) -> bool:
+    return not character["isNotObtainable"]
+
+
+def _is_skill(id_: str) -> bool:
+    return id_.startswith(("skchr", "skcom"))
+
+
+def _shard(entries: typing.Sequence[_T], num_shards: int) -> list[typing.Sequence[_T]]:
+    size = max(1, -(-len(entries) // num_shards))
+    return [entries[start : start + size] for start in range(0, len(entries), size)]
+
+
+# NOTE: Entire tables are validated by a TypeAdapter in a single call, such
+#       that pydantic-core runs the loop over all entries instead of Python.
+#       Entries are filtered in a before-validator, which is a no-op for
+#       tables that were already filtered before being split into shards.
+
+
+def _filter_characters(table: dict[str, typing.Any]) -> dict[str, typing.Any]:
+    return {
+        id_: character
+        for id_, character in table.items()
+        if _is_character(id_) and _is_obtainable(character)
+    }
+
+
+def _filter_skills(table: dict[str, typing.Any]) -> dict[str, typing.Any]:
+    return {id_: skill for id_, skill in table.items() if _is_skill(id_)}
+
+
+def _filter_items(table: dict[str, typing.Any]) -> list[typing.Any]:
+    return [
+        item
+        for item in table["items"].values()
+        if (
+            (item["classifyType"] == "MATERIAL" and item["itemType"] == "MATERIAL")
+            or (item["classifyType"] == "NORMAL" and item["itemType"] == "GOLD")
+        )  # fmt: skip
+    ]
+
+
+def _filter_tags(table: dict[str, typing.Any]) -> list[typing.Any]:
+    return table["gachaTags"]
+
+
+_CHARACTER_TABLE = pydantic.TypeAdapter(
+    typing.Annotated[
+        dict[str, models.RawCharacter],
+        pydantic.BeforeValidator(_filter_characters),
+    ],
 )
-_SKILL_DATA_URL: typing.Final[str] = (
-    "https://raw.githubusercontent.com/Kengxxiao/ArknightsGameData_YoStar/master/en_US/gamedata/excel/skill_table.json"
+_SKILL_TABLE = pydantic.TypeAdapter(
+    typing.Annotated[dict[str, models.RawSkill], pydantic.BeforeValidator(_filter_skills)],
 )
-_ITEM_DATA_URL: typing.Final[str] = (
-    "https://raw.githubusercontent.com/Kengxxiao/ArknightsGameData_YoStar/master/en_US/gamedata/excel/item_table.json"
+_SKILL_LOCALISATION_TABLE = pydantic.TypeAdapter(
+    typing.Annotated[
+        dict[str, models.RawSkillLocalisation],
+        pydantic.BeforeValidator(_filter_skills),
+    ],
 )
-_TAG_DATA_URL: typing.Final[str] = (
-    "https://raw.githubusercontent.com/Kengxxiao/ArknightsGameData_YoStar/master/en_US/gamedata/excel/gacha_table.json"
+_ITEM_TABLE = pydantic.TypeAdapter(
+    typing.Annotated[list[models.RawItem], pydantic.BeforeValidator(_filter_items)],
 )
-# fmt: on
+_TAG_TABLE = pydantic.TypeAdapter(
+    typing.Annotated[list[models.RawTag], pydantic.BeforeValidator(_filter_tags)],
+)
+
+
+def _parse_characters(
+    raw: bytes | dict[str, typing.Any],
+    *,
+    strict: bool = False,
+) -> list[models.RawCharacter]:
+    context = {"strict": strict}
+    if isinstance(raw, bytes):
+        return list(_CHARACTER_TABLE.validate_json(raw, context=context).values())
+
+    return list(_CHARACTER_TABLE.validate_python(raw, context=context).values())
+
+
+def _parse_skills(raw: bytes | dict[str, typing.Any]) -> list[models.RawSkill]:
+    # NOTE: pydantic-core converts float-heavy JSON to Python objects (as the
+    #       before-validator needs) more slowly than the json module does, so
+    #       here decoding with the json module is faster than validate_json.
+    table = json.loads(raw) if isinstance(raw, bytes) else raw
+    return list(_SKILL_TABLE.validate_python(table).values())
+
+
+def parse_characters(raw: bytes, *, strict: bool = False) -> list[models.RawCharacter]:
+    """Parse a raw character table.
+
+    Unlike :func:`fetch_characters`, this does not download anything, such
+    that downloading and parsing can be done (and timed) separately.
+
+    Parameters
+    ----------
+    raw:
+        The raw character table, as returned by :func:`download.read_table`.
+    strict:
+        Whether to validate all character data right away. See
+        :func:`fetch_characters` for details.
+
+    Returns
+    -------
+    list[:class:`models.RawCharacter`]
+        The parsed character models.
+
+    """
+    return _parse_characters(raw, strict=strict)
+
+
+def parse_skills(raw: bytes) -> list[models.RawSkill]:
+    """Parse a raw skill table.
+
+    Parameters
+    ----------
+    raw:
+        The raw skill table, as returned by :func:`download.read_table`.
+
+    Returns
+    -------
+    list[:class:`models.RawSkill`]
+        The parsed skill models.
+
+    """
+    return _parse_skills(raw)
+
+
+def parse_skill_localisations(raw: bytes) -> list[models.RawSkillLocalisation]:
+    """Parse only the localised text of a raw skill table.
+
+    Parameters
+    ----------
+    raw:
+        The raw skill table, as returned by :func:`download.read_table`.
+
+    Returns
+    -------
+    list[:class:`models.RawSkillLocalisation`]
+        The parsed skill localisation models.
+
+    """
+    return list(_SKILL_LOCALISATION_TABLE.validate_json(raw).values())
+
+
+def parse_items(raw: bytes) -> list[models.RawItem]:
+    """Parse a raw item table.
+
+    Parameters
+    ----------
+    raw:
+        The raw item table, as returned by :func:`download.read_table`.
+
+    Returns
+    -------
+    list[:class:`models.RawItem`]
+        The parsed item models.
+
+    """
+    return _ITEM_TABLE.validate_json(raw)
+
+
+def parse_tags(raw: bytes) -> list[models.RawTag]:
+    """Parse the character tags of a raw gacha table.
+
+    Parameters
+    ----------
+    raw:
+        The raw gacha table, as returned by :func:`download.read_table`.
+
+    Returns
+    -------
+    list[:class:`models.RawTag`]
+        The parsed tag models.
+
+    """
+    return _TAG_TABLE.validate_json(raw)
+
+
+def _split_table(
+    raw: bytes,
+    filter_: typing.Callable[[dict[str, typing.Any]], dict[str, typing.Any]],
+    num_shards: int,
+) -> list[dict[str, typing.Any]]:
+    entries = list(filter_(json.loads(raw)).items())
+    return [dict(shard) for shard in _shard(entries, num_shards)]
+
+
+async def _parse(
+    parser: typing.Callable[[bytes | dict[str, typing.Any]], list[_T]],
+    filter_: typing.Callable[[dict[str, typing.Any]], dict[str, typing.Any]],
+    raw: bytes,
+    executor: concurrent.futures.Executor | None,
+) -> list[_T]:
+    if not executor:
+        return parser(raw)
+
+    loop = asyncio.get_running_loop()
+
+    # Only split the work up when it can actually run in parallel.
+    if not isinstance(executor, concurrent.futures.ProcessPoolExecutor):
+        return await loop.run_in_executor(executor, parser, raw)
+
+    # NOTE: The table is decoded only once, after which every worker process
+    #       is sent only the entries it validates. Having every worker decode
+    #       the entire table instead multiplies decoding time and peak memory
+    #       by the number of workers. Decoding happens in a thread such that
+    #       the event loop gets a chance to run while it is being set up.
+    #       Process pools default to one worker per CPU, so one shard per CPU
+    #       keeps every worker busy without relying on the pool's internals.
+    num_shards = os.cpu_count() or 1
+    shards = await loop.run_in_executor(None, _split_table, raw, filter_, num_shards)
+    results = await asyncio.gather(
+        *(loop.run_in_executor(executor, parser, shard) for shard in shards),
+    )
+
+    # Gather preserves order, so the shards can simply be concatenated.
+    return list(itertools.chain.from_iterable(results))
 
 
 async def fetch_characters(
     session: aiohttp.ClientSession | None = None,
+    *,
+    locale: str = "en_US",
+    executor: concurrent.futures.Executor | None = None,
+    strict: bool = False,
 ) -> typing.Sequence[models.RawCharacter]:
     """Download and parse character gamedata.
 
@@ -42,6 +272,17 @@ async def fetch_characters(
     session:
         The session to use to fetch the data. If not provided, a new session
         is created.
+    locale:
+        The locale of the gamedata to fetch.
+    executor:
+        The executor in which to decode and validate the character data. If
+        this is a :class:`concurrent.futures.ProcessPoolExecutor`, the data is
+        decoded once and its validation is split up into one shard per CPU.
+        If not provided, everything runs on the event loop, blocking it for
+        the duration.
+    strict:
+        Whether to validate all character data right away. By default, rarely
+        used data such as talents is only validated when it is first accessed.
 
     Returns
     -------
@@ -51,20 +292,27 @@ async def fetch_characters(
     """
     if not session:
         async with aiohttp.ClientSession() as session:
-            return await fetch_characters(session)
-
-    async with session.get(_CHARACTER_DATA_URL) as response:
-        data = await response.json(content_type="text/plain")
-
-    return [
-        models.RawCharacter(**character)
-        for id_, character in data.items()
-        if id_.startswith("char") and not character["isNotObtainable"]
-    ]
+            return await fetch_characters(
+                session,
+                locale=locale,
+                executor=executor,
+                strict=strict,
+            )
+
+    raw = await download.read_table(session, "character_table", locale=locale)
+    return await _parse(
+        functools.partial(_parse_characters, strict=strict),
+        _filter_characters,
+        raw,
+        executor,
+    )
 
 
 async def fetch_skills(
     session: aiohttp.ClientSession | None = None,
+    *,
+    locale: str = "en_US",
+    executor: concurrent.futures.Executor | None = None,
 ) -> typing.Sequence[models.RawSkill]:
     """Download and parse skill gamedata.
 
@@ -73,6 +321,14 @@ async def fetch_skills(
     session:
         The session to use to fetch the data. If not provided, a new session
         is created.
+    locale:
+        The locale of the gamedata to fetch.
+    executor:
+        The executor in which to decode and validate the skill data. If this
+        is a :class:`concurrent.futures.ProcessPoolExecutor`, the data is
+        decoded once and its validation is split up into one shard per CPU.
+        If not provided, everything runs on the event loop, blocking it for
+        the duration.
 
     Returns
     -------
@@ -82,20 +338,189 @@ async def fetch_skills(
     """
     if not session:
         async with aiohttp.ClientSession() as session:
-            return await fetch_skills(session)
+            return await fetch_skills(session, locale=locale, executor=executor)
 
-    async with session.get(_SKILL_DATA_URL) as response:
-        data = await response.json(content_type="text/plain")
+    raw = await download.read_table(session, "skill_table", locale=locale)
+    return await _parse(_parse_skills, _filter_skills, raw, executor)
+
+
+async def stream_characters(
+    session: aiohttp.ClientSession | None = None,
+    *,
+    locale: str = "en_US",
+    strict: bool = False,
+) -> typing.AsyncIterator[models.RawCharacter]:
+    """Download and parse character gamedata one character at a time.
+
+    Unlike :func:`fetch_characters`, this never holds the entire table in
+    memory. Instead, the table is read in chunks and each character is parsed
+    as soon as it is complete.
+
+    Parameters
+    ----------
+    session:
+        The session to use to fetch the data. If not provided, a new session
+        is created.
+    locale:
+        The locale of the gamedata to fetch.
+    strict:
+        Whether to validate all character data right away. By default, rarely
+        used data such as talents is only validated when it is first accessed.
+
+    Yields
+    ------
+    :class:`models.RawCharacter`
+        The parsed character models.
+
+    """
+    if not session:
+        async with aiohttp.ClientSession() as session:
+            async for character in stream_characters(session, locale=locale, strict=strict):
+                yield character
+
+        return
+
+    entries = stream.iter_object_items(
+        download.iter_table(session, "character_table", locale=locale),
+        key_filter=_is_character,
+    )
+
+    async for _, character in entries:
+        if _is_obtainable(character):
+            yield models.RawCharacter.model_validate(character, context={"strict": strict})
 
-    return [
-        models.RawSkill(**skill)
-        for id_, skill in data.items()
-        if id_.startswith(("skchr", "skcom"))
-    ]  # fmt: skip
+
+async def stream_skills(
+    session: aiohttp.ClientSession | None = None,
+    *,
+    locale: str = "en_US",
+) -> typing.AsyncIterator[models.RawSkill]:
+    """Download and parse skill gamedata one skill at a time.
+
+    Unlike :func:`fetch_skills`, this never holds the entire table in memory.
+    Instead, the table is read in chunks and each skill is parsed as soon as
+    it is complete.
+
+    Parameters
+    ----------
+    session:
+        The session to use to fetch the data. If not provided, a new session
+        is created.
+    locale:
+        The locale of the gamedata to fetch.
+
+    Yields
+    ------
+    :class:`models.RawSkill`
+        The parsed skill models.
+
+    """
+    if not session:
+        async with aiohttp.ClientSession() as session:
+            async for skill in stream_skills(session, locale=locale):
+                yield skill
+
+        return
+
+    entries = stream.iter_object_items(
+        download.iter_table(session, "skill_table", locale=locale),
+        key_filter=_is_skill,
+    )
+
+    async for _, skill in entries:
+        yield models.RawSkill(**skill)
+
+
+async def stream_skill_localisations(
+    session: aiohttp.ClientSession | None = None,
+    *,
+    locale: str,
+) -> typing.AsyncIterator[models.RawSkillLocalisation]:
+    """Download and parse the localised text of all skills one skill at a time.
+
+    Only the skill names and descriptions are validated, which makes this far
+    cheaper than :func:`stream_skills` when the rest of the skill data is not
+    needed.
+
+    Parameters
+    ----------
+    session:
+        The session to use to fetch the data. If not provided, a new session
+        is created.
+    locale:
+        The locale of the gamedata to fetch.
+
+    Yields
+    ------
+    :class:`models.RawSkillLocalisation`
+        The parsed skill localisation models.
+
+    """
+    if not session:
+        async with aiohttp.ClientSession() as session:
+            async for skill in stream_skill_localisations(session, locale=locale):
+                yield skill
+
+        return
+
+    entries = stream.iter_object_items(
+        download.iter_table(session, "skill_table", locale=locale),
+        key_filter=_is_skill,
+    )
+
+    async for _, skill in entries:
+        yield models.RawSkillLocalisation(**skill)
+
+
+async def fetch_skill_localisations(
+    session: aiohttp.ClientSession | None = None,
+    *,
+    locales: typing.Iterable[str] = download.LOCALES,
+    concurrency: int = 2,
+) -> typing.Mapping[str, typing.Sequence[models.RawSkillLocalisation]]:
+    """Download and parse the localised text of all skills for multiple locales.
+
+    Parameters
+    ----------
+    session:
+        The session to use to fetch the data. If not provided, a new session
+        is created. The same session is used for all locales.
+    locales:
+        The locales of the gamedata to fetch.
+    concurrency:
+        The maximum number of locales to download and parse at the same time.
+        As every locale is parsed while it is being downloaded, this also
+        bounds the number of partially parsed tables held in memory.
+
+    Returns
+    -------
+    Mapping[:class:`str`, Sequence[:class:`models.RawSkillLocalisation`]]
+        The parsed skill localisation models, by locale.
+
+    """
+    if not session:
+        async with aiohttp.ClientSession() as session:
+            return await fetch_skill_localisations(
+                session,
+                locales=locales,
+                concurrency=concurrency,
+            )
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _fetch(locale: str) -> list[models.RawSkillLocalisation]:
+        async with semaphore:
+            return [skill async for skill in stream_skill_localisations(session, locale=locale)]
+
+    locales = tuple(locales)
+    results = await asyncio.gather(*(_fetch(locale) for locale in locales))
+    return dict(zip(locales, results, strict=True))
 
 
 async def fetch_items(
     session: aiohttp.ClientSession | None = None,
+    *,
+    locale: str = "en_US",
 ) -> typing.Sequence[models.RawItem]:
     """Download and parse item gamedata.
 
@@ -104,6 +529,8 @@ async def fetch_items(
     session:
         The session to use to fetch the data. If not provided, a new session
         is created.
+    locale:
+        The locale of the gamedata to fetch.
 
     Returns
     -------
@@ -113,23 +540,15 @@ async def fetch_items(
     """
     if not session:
         async with aiohttp.ClientSession() as session:
-            return await fetch_items(session)
+            return await fetch_items(session, locale=locale)
 
-    async with session.get(_ITEM_DATA_URL) as response:
-        data = await response.json(content_type="text/plain")
-
-    return [
-        models.RawItem(**item)
-        for _, item in data["items"].items()
-        if (
-            (item["classifyType"] == "MATERIAL" and item["itemType"] == "MATERIAL")
-            or (item["classifyType"] == "NORMAL" and item["itemType"] == "GOLD")
-        )  # fmt: skip
-    ]
+    return parse_items(await download.read_table(session, "item_table", locale=locale))
 
 
 async def fetch_tags(
     session: aiohttp.ClientSession | None = None,
+    *,
+    locale: str = "en_US",
 ) -> typing.Sequence[models.RawTag]:
     """Download and parse character tag gamedata.
 
@@ -138,6 +557,8 @@ async def fetch_tags(
     session:
         The session to use to fetch the data. If not provided, a new session
         is created.
+    locale:
+        The locale of the gamedata to fetch.
 
     Returns
     -------
@@ -147,44 +568,48 @@ async def fetch_tags(
     """
     if not session:
         async with aiohttp.ClientSession() as session:
-            return await fetch_tags(session)
-
-    async with session.get(_TAG_DATA_URL) as response:
-        data = await response.json(content_type="text/plain")
+            return await fetch_tags(session, locale=locale)
 
-    return [models.RawTag(**tag) for tag in data["gachaTags"]]
+    return parse_tags(await download.read_table(session, "gacha_table", locale=locale))
 
 
 async def fetch_all(
     session: aiohttp.ClientSession | None = None,
+    *,
+    executor: concurrent.futures.Executor | None = None,
 ) -> tuple[
     typing.Sequence[models.RawCharacter],
     typing.Sequence[models.RawSkill],
     typing.Sequence[models.RawItem],
+    typing.Sequence[models.RawTag],
 ]:
     """Download and parse character, skill, item and tag gamedata.
 
+    All tables are downloaded concurrently. Failed downloads are retried and
+    resumed, see :func:`download.iter_table` for details.
+
     Parameters
     ----------
     session:
         The session to use to fetch the data. If not provided, a new session
         is created. The same session is used for all individual data types.
+    executor:
+        The executor in which to decode and validate the character and skill
+        data. See :func:`fetch_characters` for details.
 
     Returns
     -------
-    tuple[Sequence[:class:`models.RawCharacter`], Sequence[:class:`models.RawCharacter`], Sequence[:class:`models.RawItem`], Sequence[:class:`models.RawTag`]
+    tuple[Sequence[:class:`models.RawCharacter`], Sequence[:class:`models.RawSkill`], Sequence[:class:`models.RawItem`], Sequence[:class:`models.RawTag`]]
         The parsed models.
 
     """  # noqa: E501
     if not session:
         async with aiohttp.ClientSession() as session:
-            return await fetch_all(session)
-
-    async with aiohttp.ClientSession() as session:
-        characters, skills, items = await asyncio.gather(
-            fetch_characters(session),
-            fetch_skills(session),
-            fetch_items(session),
-        )
-
-    return characters, skills, items
+            return await fetch_all(session, executor=executor)
+
+    return await asyncio.gather(
+        fetch_characters(session, executor=executor),
+        fetch_skills(session, executor=executor),
+        fetch_items(session),
+        fetch_tags(session),
+    )
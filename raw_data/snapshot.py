@@ -0,0 +1,363 @@
+"""Versioned binary snapshots of parsed gamedata for fast loading."""
+
+import asyncio
+import concurrent.futures
+import dataclasses
+import functools
+import gc
+import hashlib
+import inspect
+import os
+import pathlib
+import pickle
+import typing
+
+import aiohttp
+import dotenv
+import pydantic
+
+from . import download, models, parse
+
+__all__: typing.Sequence[str] = (
+    "Snapshot",
+    "build_snapshot",
+    "get_snapshot_path",
+    "hash_versions",
+    "load_snapshot",
+    "read_snapshot",
+    "schema_hash",
+    "set_snapshot_path",
+    "upstream_hash",
+    "write_snapshot",
+)
+
+dotenv.load_dotenv()
+
+
+# Bump this whenever the layout of snapshot files or the Snapshot class changes.
+_FORMAT_VERSION: typing.Final[int] = 1
+
+_BASE_LOCALE: typing.Final[str] = "en_US"
+_LOCALISED_LOCALES: typing.Final[typing.Sequence[str]] = tuple(
+    locale for locale in download.LOCALES if locale != _BASE_LOCALE
+)
+_TABLES: typing.Final[typing.Sequence[tuple[str, str]]] = (
+    ("character_table", _BASE_LOCALE),
+    ("skill_table", _BASE_LOCALE),
+    ("item_table", _BASE_LOCALE),
+    ("gacha_table", _BASE_LOCALE),
+    *(("skill_table", locale) for locale in _LOCALISED_LOCALES),
+)
+
+
+@dataclasses.dataclass(frozen=True)
+class Snapshot:
+    """Parsed gamedata along with the hash of the upstream data it was parsed from."""
+
+    characters: typing.Sequence[models.RawCharacter]
+    """The parsed character models."""
+    skills: typing.Sequence[models.RawSkill]
+    """The parsed skill models, in the base (en_US) locale."""
+    items: typing.Sequence[models.RawItem]
+    """The parsed item models."""
+    tags: typing.Sequence[models.RawTag]
+    """The parsed tag models."""
+    skill_localisations: typing.Mapping[str, typing.Sequence[models.RawSkillLocalisation]]
+    """The parsed skill localisation models for all other locales, by locale."""
+    upstream: str
+    """The hash of the upstream data. See :func:`upstream_hash`."""
+
+
+@functools.cache
+def schema_hash() -> str:
+    """Get a hash of the model definitions used to parse the gamedata.
+
+    Any change to the source of the model modules, or the pydantic version,
+    results in a different hash.
+    """
+    digest = hashlib.sha256(f"{_FORMAT_VERSION}:{pydantic.VERSION}".encode())
+    for module in (models.character, models.item, models.skill, models.tag):
+        digest.update(inspect.getsource(module).encode())
+
+    return digest.hexdigest()
+
+
+def hash_versions(versions: typing.Mapping[str, download.TableVersion]) -> str | None:
+    """Combine the versions of all gamedata tables that make up a snapshot into a single hash.
+
+    Parameters
+    ----------
+    versions:
+        The versions of the tables, by locale and table name, e.g.
+        ``"en_US/skill_table"``. Any other tables are ignored.
+
+    Returns
+    -------
+    :class:`str` | :data:`None`
+        The combined hex digest of all tables, or :data:`None` if the version
+        of any of them is missing.
+
+    """
+    # Without caching, tables are identified by their ETag rather than their
+    # digest, such that they need not be downloaded just to be hashed.
+    digest = hashlib.sha256()
+    for table, locale in _TABLES:
+        name = f"{locale}/{table}"
+        if name not in versions:
+            return None
+
+        version = versions[name]
+        digest.update(f"{name}:{version.digest or version.etag}\n".encode())
+
+    return digest.hexdigest()
+
+
+async def upstream_hash(session: aiohttp.ClientSession | None = None) -> str:
+    """Get a hash of the current versions of all gamedata tables that make up a snapshot.
+
+    This makes a single request per table, and only downloads tables that
+    changed if caching is enabled. See :func:`download.table_version`.
+
+    Parameters
+    ----------
+    session:
+        The session to use to check the tables. If not provided, a new
+        session is created.
+
+    Returns
+    -------
+    :class:`str`
+        The combined hex digest of all tables. See :func:`hash_versions`.
+
+    """
+    if not session:
+        async with aiohttp.ClientSession() as session:
+            return await upstream_hash(session)
+
+    versions = await asyncio.gather(
+        *(download.table_version(session, table, locale=locale) for table, locale in _TABLES),
+    )
+
+    digest = hash_versions(
+        {
+            f"{locale}/{table}": version
+            for (table, locale), version in zip(_TABLES, versions, strict=True)
+        },
+    )
+    assert digest
+    return digest
+
+
+_snapshot_path: pathlib.Path | None = (
+    pathlib.Path(os.environ["GAMEDATA_SNAPSHOT_PATH"])
+    if os.environ.get("GAMEDATA_SNAPSHOT_PATH")
+    else None
+)
+
+
+def get_snapshot_path() -> pathlib.Path | None:
+    """Get the path at which the gamedata snapshot is stored, if snapshots are enabled.
+
+    By default, this is read from the ``GAMEDATA_SNAPSHOT_PATH`` environment variable.
+    """
+    return _snapshot_path
+
+
+def set_snapshot_path(path: str | os.PathLike[str] | None) -> None:
+    """Set the path at which to store the gamedata snapshot. Pass ``None`` to disable snapshots."""
+    global _snapshot_path  # noqa: PLW0603
+
+    _snapshot_path = pathlib.Path(path) if path else None
+
+
+def _resolve_path(path: str | os.PathLike[str] | None) -> pathlib.Path | None:
+    return pathlib.Path(path) if path else _snapshot_path
+
+
+def read_snapshot(
+    path: str | os.PathLike[str] | None = None,
+    *,
+    upstream: str | None = None,
+) -> Snapshot | None:
+    """Read a gamedata snapshot from disk.
+
+    .. warning::
+        Snapshots are pickled, so they must only ever be read from trusted
+        locations.
+
+    Parameters
+    ----------
+    path:
+        The path of the snapshot. Defaults to :func:`get_snapshot_path`.
+    upstream:
+        The expected upstream hash, see :func:`upstream_hash`. If not
+        provided, the snapshot is not checked against the upstream data.
+
+    Returns
+    -------
+    :class:`Snapshot` | None
+        The snapshot, or ``None`` if it does not exist or is out of date.
+
+    """
+    resolved = _resolve_path(path)
+    if not resolved:
+        return None
+
+    try:
+        with resolved.open("rb") as file:
+            # The header is pickled separately such that an outdated snapshot
+            # can be rejected without loading the models.
+            header = pickle.load(file)  # noqa: S301
+            if header != {"format": _FORMAT_VERSION, "schema": schema_hash()}:
+                return None
+
+            # Unpickling creates a huge number of objects, none of which are
+            # garbage, so pausing the garbage collector roughly halves the time.
+            gc_was_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                snapshot: Snapshot = pickle.load(file)  # noqa: S301
+            finally:
+                if gc_was_enabled:
+                    gc.enable()
+
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+    if upstream is not None and snapshot.upstream != upstream:
+        return None
+
+    return snapshot
+
+
+def write_snapshot(snapshot: Snapshot, path: str | os.PathLike[str] | None = None) -> None:
+    """Write a gamedata snapshot to disk.
+
+    Parameters
+    ----------
+    snapshot:
+        The snapshot to write.
+    path:
+        The path to write the snapshot to. Defaults to :func:`get_snapshot_path`.
+
+    """
+    resolved = _resolve_path(path)
+    if not resolved:
+        msg = "No snapshot path was provided and snapshots are disabled."
+        raise ValueError(msg)
+
+    resolved.parent.mkdir(parents=True, exist_ok=True)
+
+    # Write to a temporary file first such that a concurrent reader never
+    # sees a partially written snapshot.
+    tmp_path = resolved.with_suffix(".tmp")
+    with tmp_path.open("wb") as file:
+        pickle.dump({"format": _FORMAT_VERSION, "schema": schema_hash()}, file)
+        pickle.dump(snapshot, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    tmp_path.replace(resolved)
+
+
+async def build_snapshot(
+    session: aiohttp.ClientSession | None = None,
+    *,
+    executor: concurrent.futures.Executor | None = None,
+) -> Snapshot:
+    """Download and parse all gamedata into a new snapshot.
+
+    Parameters
+    ----------
+    session:
+        The session to use to fetch the data. If not provided, a new session
+        is created. The same session is used for all individual data types.
+    executor:
+        The executor in which to decode and validate the character and skill
+        data. See :func:`parse.fetch_characters` for details.
+
+    Returns
+    -------
+    :class:`Snapshot`
+        The new snapshot.
+
+    """
+    if not session:
+        async with aiohttp.ClientSession() as session:
+            return await build_snapshot(session, executor=executor)
+
+    # Hash first, such that the snapshot is rebuilt on the next run if the
+    # upstream data changes while it is being downloaded.
+    return await _build(session, await upstream_hash(session), executor)
+
+
+async def _build(
+    session: aiohttp.ClientSession,
+    upstream: str,
+    executor: concurrent.futures.Executor | None,
+) -> Snapshot:
+    (characters, skills, items, tags), skill_localisations = await asyncio.gather(
+        parse.fetch_all(session, executor=executor),
+        parse.fetch_skill_localisations(session, locales=_LOCALISED_LOCALES),
+    )
+
+    return Snapshot(
+        characters=characters,
+        skills=skills,
+        items=items,
+        tags=tags,
+        skill_localisations=skill_localisations,
+        upstream=upstream,
+    )
+
+
+async def load_snapshot(
+    session: aiohttp.ClientSession | None = None,
+    *,
+    path: str | os.PathLike[str] | None = None,
+    check_upstream: bool = True,
+    executor: concurrent.futures.Executor | None = None,
+) -> Snapshot:
+    """Load the gamedata snapshot, rebuilding it if it is missing or out of date.
+
+    Parameters
+    ----------
+    session:
+        The session to use to check for and fetch new data. If not provided,
+        a new session is created when needed.
+    path:
+        The path of the snapshot. Defaults to :func:`get_snapshot_path`. If
+        snapshots are disabled, a new snapshot is built but not stored.
+    check_upstream:
+        Whether to check that the snapshot matches the current upstream data.
+        If disabled, any snapshot with up-to-date model definitions is used,
+        and no requests are made unless it has to be rebuilt.
+    executor:
+        The executor to use when the snapshot is rebuilt. See
+        :func:`build_snapshot` for details.
+
+    Returns
+    -------
+    :class:`Snapshot`
+        The loaded or rebuilt snapshot.
+
+    """
+    if not check_upstream and (snapshot := read_snapshot(path)):
+        return snapshot
+
+    if not session:
+        async with aiohttp.ClientSession() as session:
+            return await load_snapshot(
+                session,
+                path=path,
+                check_upstream=check_upstream,
+                executor=executor,
+            )
+
+    upstream = await upstream_hash(session)
+    if check_upstream and (snapshot := read_snapshot(path, upstream=upstream)):
+        return snapshot
+
+    snapshot = await _build(session, upstream, executor)
+    if _resolve_path(path):
+        write_snapshot(snapshot, path)
+
+    return snapshot
@@ -0,0 +1,210 @@
+"""Incremental parsing of large top-level JSON objects."""
+
+import codecs
+import json
+import re
+import typing
+
+__all__: typing.Sequence[str] = ("iter_object_items",)
+
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# Used to skip values without decoding them. The first matches everything up
+# to and including the next bracket outside of a string, or as far as possible
+# if there is none, the second a string, and the third the delimiter that ends
+# a scalar.
+_NEXT_BRACKET = re.compile(r'(?:[^"{}\[\]]++|"(?:[^"\\]|\\.)*+")*+([{}\[\]])?')
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*+"')
+_SCALAR_END = re.compile(r"[,}\]\s]")
+
+
+class _Buffer:
+    """Text buffer over an asynchronous stream of encoded chunks."""
+
+    def __init__(self, chunks: typing.AsyncIterable[bytes]) -> None:
+        self._chunks = aiter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self.text = ""
+        self.pos = 0
+        self.exhausted = False
+
+    async def fill(self) -> bool:
+        """Read the next chunk into the buffer. Return whether the stream had any data left."""
+        if self.exhausted:
+            return False
+
+        # Drop everything that has already been consumed before growing.
+        self.text = self.text[self.pos :]
+        self.pos = 0
+
+        try:
+            chunk = await anext(self._chunks)
+        except StopAsyncIteration:
+            self.exhausted = True
+            self.text += self._decoder.decode(b"", final=True)
+        else:
+            self.text += self._decoder.decode(chunk)
+
+        return True
+
+    async def peek(self) -> str:
+        """Skip whitespace and return the next character, or an empty string at EOF."""
+        while True:
+            self.pos = _WHITESPACE.match(self.text, self.pos).end()  # pyright: ignore
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+
+            if not await self.fill():
+                return ""
+
+    async def expect(self, *chars: str) -> str:
+        char = await self.peek()
+        if char not in chars:
+            msg = f"Expected one of {chars!r}"
+            raise json.JSONDecodeError(msg, self.text, self.pos)
+
+        self.pos += 1
+        return char
+
+    async def grow(self) -> bool:
+        """Read chunks until the unconsumed part of the buffer doubled in size.
+
+        Return whether the stream had any data left.
+        """
+        target = 2 * (len(self.text) - self.pos)
+        grown = False
+        while not grown or len(self.text) - self.pos < target:
+            if not await self.fill():
+                break
+
+            grown = True
+
+        return grown
+
+    async def decode(self) -> object:
+        """Decode the next JSON value from the buffer.
+
+        A value that does not fit in the buffer is decoded again once the
+        buffer doubled in size, such that a value spanning many chunks costs
+        time linear in its size. The same goes for a value that ends exactly
+        at the end of the buffer, as e.g. a number may still continue.
+        """
+        await self.peek()
+
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if not await self.grow():
+                    raise
+                continue
+
+            if end == len(self.text) and await self.grow():
+                continue
+
+            self.pos = end
+            return value
+
+    async def skip(self) -> None:
+        """Skip the next JSON value in the buffer without decoding it.
+
+        Only the strings and brackets of the value are checked, and text is
+        dropped as soon as it is skipped, so the value is never held in memory
+        all at once.
+        """
+        char = await self.peek()
+        if char in "{[":
+            await self._skip_nested()
+            return
+
+        if char == '"':
+            while not (match := _STRING.match(self.text, self.pos)):
+                if not await self.fill():
+                    msg = "Unterminated string"
+                    raise json.JSONDecodeError(msg, self.text, self.pos)
+
+            self.pos = match.end()
+            return
+
+        # A scalar ends at the first delimiter, which may be in a later chunk.
+        while not (match := _SCALAR_END.search(self.text, self.pos)):
+            if not await self.fill():
+                self.pos = len(self.text)
+                return
+
+        self.pos = match.start()
+
+    async def _skip_nested(self) -> None:
+        depth = 0
+        while True:
+            match = _NEXT_BRACKET.match(self.text, self.pos)
+            assert match  # This always matches, if only an empty string.
+            self.pos = match.end()
+
+            if not (bracket := match.group(1)):
+                # The next bracket is not in the buffer yet. Everything up to
+                # here was skipped, so it is dropped when filling.
+                if not await self.fill():
+                    msg = "Unterminated value"
+                    raise json.JSONDecodeError(msg, self.text, self.pos)
+
+                continue
+
+            depth += 1 if bracket in "{[" else -1
+            if depth == 0:
+                return
+
+
+async def iter_object_items(
+    chunks: typing.AsyncIterable[bytes],
+    *,
+    key_filter: typing.Callable[[str], bool] | None = None,
+) -> typing.AsyncIterator[tuple[str, typing.Any]]:
+    """Lazily iterate over the key-value pairs of a top-level JSON object.
+
+    Only a single entry is decoded at any given time, which means that memory
+    usage is bounded by the size of the largest entry rather than that of the
+    entire document.
+
+    Parameters
+    ----------
+    chunks:
+        The UTF-8 encoded JSON document, as an asynchronous stream of chunks of
+        arbitrary size.
+    key_filter:
+        A predicate that decides, based on the key alone, whether an entry
+        should be yielded. Entries for which this returns ``False`` are
+        skipped without their values being decoded.
+
+    Yields
+    ------
+    tuple[:class:`str`, Any]
+        The key and the decoded value of each entry in the object.
+
+    Raises
+    ------
+    :class:`json.JSONDecodeError`
+        The document is not a valid JSON object.
+
+    """
+    buffer = _Buffer(chunks)
+    await buffer.expect("{")
+
+    if await buffer.peek() == "}":
+        return
+
+    while True:
+        key = await buffer.decode()
+        if not isinstance(key, str):
+            msg = "Expected a string key"
+            raise json.JSONDecodeError(msg, buffer.text, buffer.pos)
+
+        await buffer.expect(":")
+        if key_filter is None or key_filter(key):
+            yield key, await buffer.decode()
+        else:
+            await buffer.skip()
+
+        if await buffer.expect(",", "}") == "}":
+            return
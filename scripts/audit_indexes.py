@@ -0,0 +1,412 @@
+"""Script to find sequential scans in the queries of all auth and user data lookups.
+
+Every query made by the functions in duffelbag.auth and duffelbag.user_data is
+run against synthetic users, and explained with EXPLAIN (ANALYZE, BUFFERS).
+Sequential scans that discard many rows through a filter, which an index could
+likely avoid, are flagged. All seeded data is rolled back afterwards, so this is safe to run
+against a local database with the static tables populated.
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import json
+import sys
+import typing
+
+import argon2
+import arkprts
+import asyncpg
+from piccolo.engine import postgres
+
+import database
+from duffelbag import auth, user_data
+
+_AUDIT_PASSWORD: typing.Final[str] = "audit-password"  # noqa: S105
+# Below the negated ids of all seeded users.
+_NEW_PLATFORM_ID: typing.Final[int] = -(10**12)
+_SEEDED_TABLES: typing.Final[typing.Sequence[str]] = (
+    "duffelbag_user",
+    "platform_user",
+    "arknights_user",
+    "user_character",
+    "scheduled_user_deletion",
+    "scheduled_arknights_user_deletion",
+)
+
+# NOTE: Seeded rows are marked with an "audit-" prefix where possible, and use
+#       negative platform ids to avoid clashing with real accounts.
+_SEED_QUERIES: typing.Final[typing.Sequence[str]] = (
+    """
+    INSERT INTO duffelbag_user (username, password)
+    SELECT 'audit-' || i, $2 FROM generate_series(1, $1::int) AS i
+    """,
+    """
+    INSERT INTO platform_user (duffelbag_id, platform_id, platform_name)
+    SELECT id, -id, 'Discord' FROM duffelbag_user WHERE username LIKE 'audit-%'
+    """,
+    """
+    INSERT INTO arknights_user
+        (duffelbag_id, channel_uid, yostar_token, server, active, game_uid)
+    SELECT
+        user_.id,
+        'audit-' || user_.id || '-' || n,
+        md5(random()::text),
+        'en',
+        n = 1,
+        lpad(((user_.id * 2 + n) % 100000000)::text, 8, '0')
+    FROM duffelbag_user AS user_, generate_series(1, 2) AS n
+    WHERE user_.username LIKE 'audit-%'
+    """,
+    """
+    INSERT INTO user_character
+        (character_id, user_id, main_skill_lvl, level, exp, evolve_phase)
+    SELECT character.id, arknights_user.id, 7, 1, 0, 0
+    FROM arknights_user, static_character AS character
+    WHERE arknights_user.channel_uid LIKE 'audit-%' AND random() < 0.3
+    """,
+    """
+    INSERT INTO scheduled_user_deletion (duffelbag_id, deletion_ts)
+    SELECT id, now() FROM duffelbag_user WHERE username LIKE 'audit-%' AND id % 100 = 0
+    """,
+    """
+    INSERT INTO scheduled_arknights_user_deletion (duffelbag_id, arknights_id, deletion_ts)
+    SELECT duffelbag_id, id, now() FROM arknights_user
+    WHERE channel_uid LIKE 'audit-%' AND NOT active AND id % 100 = 0
+    """,
+)
+
+
+@dataclasses.dataclass
+class _Sample:
+    duffelbag_user: database.DuffelbagUser
+    arknights_user: database.ArknightsUser
+    other_arknights_user: database.ArknightsUser
+    character: user_data.HybridCharacter
+    skill_id: str
+    user_deletion: database.ScheduledUserDeletion
+    arknights_user_deletion: database.ScheduledArknightsUserDeletion
+
+
+@dataclasses.dataclass
+class _Scan:
+    relation: str
+    rows: int
+    filtered: bool
+    removed: int | None  # Unknown if the query was not analyzed.
+
+    def is_flagged(self, min_removed: int) -> bool:
+        # Sequential scans without a filter read the entire table on purpose,
+        # and the planner rightly prefers them over an index on small tables.
+        return self.filtered and (self.removed is None or self.removed >= min_removed)
+
+
+@dataclasses.dataclass
+class _Explained:
+    sql: str
+    analyzed: bool
+    time: float
+    scans: list[_Scan]
+
+    def is_flagged(self, min_removed: int) -> bool:
+        return any(scan.is_flagged(min_removed) for scan in self.scans)
+
+
+async def _seed(connection: asyncpg.Connection, users: int) -> None:
+    password = argon2.PasswordHasher().hash(_AUDIT_PASSWORD)
+    await connection.execute(_SEED_QUERIES[0], users, password)
+    for query in _SEED_QUERIES[1:]:
+        await connection.execute(query)
+
+    # Make the planner aware of the seeded rows. This is rolled back as well.
+    await connection.execute(f"ANALYZE {', '.join(_SEEDED_TABLES)}")
+
+
+async def _select_sample(connection: asyncpg.Connection, users: int) -> _Sample:
+    # Pick a user in the middle rather than the first or last rows, which is
+    # not yet scheduled for deletion.
+    duffelbag_user = await (
+        database.DuffelbagUser.objects()
+        .where(
+            database.DuffelbagUser.id
+            == await connection.fetchval(
+                "SELECT id FROM duffelbag_user"
+                " WHERE username LIKE 'audit-%' AND id % 100 <> 0"
+                " ORDER BY id OFFSET $1 LIMIT 1",
+                users // 2,
+            ),
+        )
+        .first()
+    )
+    if not duffelbag_user:
+        msg = "No users were seeded."
+        raise RuntimeError(msg)
+
+    # The sample user must own a character with skills. The most recently
+    # added skill is used, as its rows are at the end of the static tables,
+    # such that sequential scans that stop at the first match are not hidden.
+    character_id, skill_id = await connection.fetchrow(
+        """
+        SELECT user_character.character_id, character_skill.skill_id
+        FROM user_character
+        JOIN arknights_user ON arknights_user.id = user_character.user_id
+        JOIN static_character_skill AS character_skill
+            ON character_skill.character_id = user_character.character_id
+        WHERE arknights_user.duffelbag_id = $1 AND arknights_user.active
+        ORDER BY character_skill.id DESC
+        LIMIT 1
+        """,
+        duffelbag_user.id,
+    ) or (None, None)
+    if not character_id:
+        msg = "No characters with skills were seeded. Are the static tables populated?"
+        raise RuntimeError(msg)
+
+    arknights_users = await auth.list_arknights_accounts(duffelbag_user)
+    user_deletion = await database.ScheduledUserDeletion.objects().first()
+    arknights_user_deletion = await database.ScheduledArknightsUserDeletion.objects().first()
+    assert user_deletion
+    assert arknights_user_deletion
+
+    [active] = [user for user in arknights_users if user.active]
+    [other] = [user for user in arknights_users if not user.active]
+    return _Sample(
+        duffelbag_user=duffelbag_user,
+        arknights_user=active,
+        other_arknights_user=other,
+        character=await user_data.get_character(character_id, active),
+        skill_id=skill_id,
+        user_deletion=user_deletion,
+        arknights_user_deletion=arknights_user_deletion,
+    )
+
+
+def _calls(
+    sample: _Sample,
+) -> dict[str, typing.Callable[[], typing.Awaitable[object]]]:
+    user = sample.duffelbag_user
+    platform = auth.Platform.DISCORD
+    platform_id = -user.id
+
+    # NOTE: Calls that would fail on a unique violation are avoided, as those
+    #       roll back the transaction all of this runs in.
+    return {
+        "auth.create_user": lambda: auth.create_user(
+            username="audit-created",
+            password=_AUDIT_PASSWORD,
+            platform=auth.Platform.ELUDRIS,
+            platform_id=_NEW_PLATFORM_ID,
+        ),
+        "auth.login_user": lambda: auth.login_user(
+            username=user.username,
+            password=_AUDIT_PASSWORD,
+        ),
+        "auth.recover_user": lambda: auth.recover_user(
+            platform=platform,
+            platform_id=platform_id,
+            password=_AUDIT_PASSWORD,
+        ),
+        "auth.get_user_by_platform": lambda: auth.get_user_by_platform(
+            platform=platform,
+            platform_id=platform_id,
+        ),
+        "auth.add_platform_account": lambda: auth.add_platform_account(
+            user,
+            platform=auth.Platform.ELUDRIS,
+            platform_id=_NEW_PLATFORM_ID,
+        ),
+        "auth.remove_platform_account": lambda: auth.remove_platform_account(
+            user,
+            platform=platform,
+            platform_id=platform_id,
+        ),
+        "auth.list_connected_accounts": lambda: auth.list_connected_accounts(
+            user,
+            platform=platform,
+        ),
+        "auth.list_arknights_accounts": lambda: auth.list_arknights_accounts(user),
+        "auth.get_active_arknights_account": lambda: auth.get_active_arknights_account(user),
+        "auth.set_active_arknights_account": lambda: auth.set_active_arknights_account(
+            sample.other_arknights_user,
+        ),
+        "auth.get_arknights_account_by_server_uid": lambda: (
+            auth.get_arknights_account_by_server_uid(
+                typing.cast(arkprts.ArknightsServer, sample.arknights_user.server),
+                sample.arknights_user.game_uid,
+            )
+        ),
+        "auth.remove_arknights_account": lambda: auth.remove_arknights_account(
+            sample.other_arknights_user,
+        ),
+        "auth.schedule_user_deletion": lambda: auth.schedule_user_deletion(user),
+        "auth.schedule_arknights_user_deletion": lambda: auth.schedule_arknights_user_deletion(
+            user,
+            sample.arknights_user,
+        ),
+        "auth.get_scheduled_user_deletions": auth.get_scheduled_user_deletions,
+        "auth.get_scheduled_arknights_user_deletions": auth.get_scheduled_arknights_user_deletions,
+        "auth.get_scheduled_user_deletion_user": lambda: auth.get_scheduled_user_deletion_user(
+            sample.user_deletion,
+        ),
+        "auth.get_scheduled_arknights_user_deletion_users": lambda: (
+            auth.get_scheduled_arknights_user_deletion_users(sample.arknights_user_deletion)
+        ),
+        "user_data.get_character": lambda: user_data.get_character(
+            sample.character.character_id,
+            sample.arknights_user,
+        ),
+        "user_data.get_skill_localisations": lambda: user_data.get_skill_localisations(
+            sample.character,
+        ),
+        "user_data.get_skill_at_level": lambda: user_data.get_skill_at_level(
+            sample.character,
+            sample.skill_id,
+            1,
+        ),
+        "user_data.get_skill_blackboard": lambda: user_data.get_skill_blackboard(
+            sample.skill_id,
+            1,
+        ),
+        "user_data.get_character_stats": lambda: user_data.get_character_stats(
+            [sample.character],
+        ),
+    }
+
+
+def _find_scans(plan: dict[str, typing.Any]) -> typing.Iterator[_Scan]:
+    if plan["Node Type"] == "Seq Scan":
+        loops = plan.get("Actual Loops", 1)
+        removed = plan.get("Rows Removed by Filter")
+        yield _Scan(
+            relation=plan["Relation Name"],
+            rows=plan.get("Actual Rows", plan["Plan Rows"]) * loops,
+            filtered="Filter" in plan,
+            removed=removed * loops if removed is not None else None,
+        )
+
+    for child in plan.get("Plans", ()):
+        yield from _find_scans(child)
+
+
+async def _explain(
+    transaction: postgres.PostgresTransaction,
+    sql: str,
+    args: typing.Sequence[typing.Any],
+) -> _Explained:
+    # Writes may fail when run again, e.g. on unique constraints. These are
+    # only planned instead.
+    for options, analyzed in (("ANALYZE, BUFFERS, FORMAT JSON", True), ("FORMAT JSON", False)):
+        savepoint = await transaction.savepoint()
+        try:
+            raw = await transaction.connection.fetchval(f"EXPLAIN ({options}) {sql}", *args)
+        except asyncpg.PostgresError:
+            if not analyzed:
+                raise
+            continue
+        finally:
+            await savepoint.rollback_to()
+
+        [result] = json.loads(raw)
+        return _Explained(
+            sql=sql,
+            analyzed=analyzed,
+            time=result.get("Execution Time", 0.0),
+            scans=list(_find_scans(result["Plan"])),
+        )
+
+    raise AssertionError  # Unreachable, the last attempt either returns or raises.
+
+
+async def _audit(
+    transaction: postgres.PostgresTransaction,
+    name: str,
+    call: typing.Callable[[], typing.Awaitable[object]],
+) -> list[_Explained]:
+    # Run the call in a savepoint of its own, such that every call sees the
+    # same seeded data.
+    savepoint = await transaction.savepoint()
+    with database.capture_queries() as queries:
+        try:
+            await call()
+        except Exception as exc:  # noqa: BLE001
+            print(f"{name}: raised {exc!r}, only explaining the queries made before")
+
+    await savepoint.rollback_to()
+    return [await _explain(transaction, sql, args) for sql, args in queries]
+
+
+def _report(
+    name: str,
+    results: typing.Sequence[_Explained],
+    *,
+    min_removed: int,
+    verbose: bool,
+) -> None:
+    flagged = any(result.is_flagged(min_removed) for result in results)
+    if not flagged and not verbose:
+        return
+
+    print(f"{name}: {'SEQUENTIAL SCAN' if flagged else 'ok'}")
+    for result in results:
+        sql = " ".join(result.sql.split())
+        timing = f"{result.time:.2f}ms" if result.analyzed else "not analyzed"
+        print(f"    {sql[:117] + '...' if len(sql) > 120 else sql} ({timing})")  # noqa: PLR2004
+
+        for scan in result.scans:
+            marker = "!!" if scan.is_flagged(min_removed) else "  "
+            kind = "filtered seq scan" if scan.filtered else "full seq scan"
+            removed = f", {scan.removed} removed by filter" if scan.removed else ""
+            print(f"    {marker} {kind} on {scan.relation} ({scan.rows} rows{removed})")
+
+
+async def _main(*, users: int, min_removed: int, verbose: bool) -> int:
+    flagged = 0
+    async with database.get_db().transaction() as transaction:
+        try:
+            print(f"Seeding {users} users...")
+            await _seed(transaction.connection, users)
+            sample = await _select_sample(transaction.connection, users)
+
+            for name, call in _calls(sample).items():
+                results = await _audit(transaction, name, call)
+                _report(name, results, min_removed=min_removed, verbose=verbose)
+                flagged += any(result.is_flagged(min_removed) for result in results)
+        finally:
+            await transaction.rollback()
+
+    print(f"{flagged} function(s) with filtered sequential scans")
+    return 1 if flagged else 0
+
+
+def _sync_main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--users",
+        type=int,
+        default=2000,
+        help="the number of synthetic users to seed (default: 2000)",
+    )
+    parser.add_argument(
+        "--min-removed",
+        type=int,
+        default=1000,
+        metavar="N",
+        help="only flag sequential scans that discard at least N rows (default: 1000)",
+    )
+    parser.add_argument(
+        "--verbose",
+        "-v",
+        action="store_true",
+        help="also show the plans of functions without flagged scans",
+    )
+    args = parser.parse_args()
+
+    sys.exit(
+        asyncio.run(
+            _main(users=args.users, min_removed=args.min_removed, verbose=args.verbose),
+        ),
+    )
+
+
+if __name__ == "__main__":
+    _sync_main()
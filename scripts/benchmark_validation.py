@@ -0,0 +1,64 @@
+"""Script to compare per-entry validation of gamedata tables against batch validation."""
+
+import asyncio
+import json
+import time
+import typing
+
+import aiohttp
+
+from raw_data import download, models, parse
+
+_REPEAT: typing.Final[int] = 5
+
+
+def _per_entry_characters(raw: bytes) -> list[models.RawCharacter]:
+    return [
+        models.RawCharacter(**character)
+        for id_, character in json.loads(raw).items()
+        if parse._is_character(id_) and parse._is_obtainable(character)  # noqa: SLF001
+    ]
+
+
+def _per_entry_skills(raw: bytes) -> list[models.RawSkill]:
+    return [
+        models.RawSkill(**skill)
+        for id_, skill in json.loads(raw).items()
+        if parse._is_skill(id_)  # noqa: SLF001
+    ]
+
+
+def _best_of(parser: typing.Callable[[bytes], typing.Sized], raw: bytes) -> tuple[float, int]:
+    best = float("inf")
+    for _ in range(_REPEAT):
+        start = time.perf_counter()
+        result = parser(raw)
+        best = min(best, time.perf_counter() - start)
+
+    return best, len(result)  # pyright: ignore[reportPossiblyUnbound]
+
+
+async def _main() -> None:
+    async with aiohttp.ClientSession() as session:
+        character_table = await download.read_table(session, "character_table")
+        skill_table = await download.read_table(session, "skill_table")
+
+    benchmarks = (
+        ("characters", "per-entry", _per_entry_characters, character_table),
+        ("characters", "batch", parse._parse_characters, character_table),  # noqa: SLF001
+        ("skills", "per-entry", _per_entry_skills, skill_table),
+        ("skills", "batch", parse._parse_skills, skill_table),  # noqa: SLF001
+    )
+
+    print(f"Best of {_REPEAT} runs:")
+    for table, method, parser, raw in benchmarks:
+        elapsed, count = _best_of(parser, raw)
+        print(f"    {table} ({method}): {elapsed * 1000:.1f}ms for {count} entries")
+
+
+def _sync_main() -> None:
+    asyncio.run(_main())
+
+
+if __name__ == "__main__":
+    _sync_main()
@@ -1,27 +1,345 @@
-"""Script to repopulate all static databases."""
+"""Script to repopulate the static databases."""
 
+import argparse
 import asyncio
+import dataclasses
+import time
+import typing
+
+import aiohttp
 
 import database
+import raw_data
+
+_T = typing.TypeVar("_T")
+
+_BASE_LOCALE: typing.Final[str] = "en_US"
+
+
+@dataclasses.dataclass
+class _LoadTiming:
+    download: float = 0.0
+    parse: float = 0.0
+
+
+async def _download(
+    session: aiohttp.ClientSession,
+    table: str,
+    timing: _LoadTiming,
+    *,
+    locales: typing.Sequence[str] = (_BASE_LOCALE,),
+) -> list[bytes]:
+    start = time.perf_counter()
+    raws = await asyncio.gather(
+        *(raw_data.download.read_table(session, table, locale=locale) for locale in locales),
+    )
+    timing.download += time.perf_counter() - start
+    return raws
+
+
+def _parse(parser: typing.Callable[[bytes], _T], raw: bytes, timing: _LoadTiming) -> _T:
+    start = time.perf_counter()
+    result = parser(raw)
+    timing.parse += time.perf_counter() - start
+    return result
+
+
+async def _load(
+    sources: typing.Collection[str],
+    timings: dict[str, _LoadTiming],
+) -> raw_data.Snapshot:
+    # Data of sources that were not selected is left empty, and is never read.
+    loaded: dict[str, typing.Any] = {
+        "characters": (),
+        "skills": (),
+        "items": (),
+        "tags": (),
+        "skill_localisations": {},
+    }
+
+    async def _load_items(session: aiohttp.ClientSession, timing: _LoadTiming) -> None:
+        [raw] = await _download(session, "item_table", timing)
+        loaded["items"] = _parse(raw_data.parse_items, raw, timing)
+
+    async def _load_tags(session: aiohttp.ClientSession, timing: _LoadTiming) -> None:
+        [raw] = await _download(session, "gacha_table", timing)
+        loaded["tags"] = _parse(raw_data.parse_tags, raw, timing)
+
+    async def _load_skills(session: aiohttp.ClientSession, timing: _LoadTiming) -> None:
+        others = [locale for locale in raw_data.download.LOCALES if locale != _BASE_LOCALE]
+        raw, *raw_others = await _download(
+            session,
+            "skill_table",
+            timing,
+            locales=(_BASE_LOCALE, *others),
+        )
+
+        loaded["skills"] = _parse(raw_data.parse_skills, raw, timing)
+        loaded["skill_localisations"] = {
+            locale: _parse(raw_data.parse_skill_localisations, raw_other, timing)
+            for locale, raw_other in zip(others, raw_others, strict=True)
+        }
+
+    async def _load_characters(session: aiohttp.ClientSession, timing: _LoadTiming) -> None:
+        [raw] = await _download(session, "character_table", timing)
+        loaded["characters"] = _parse(raw_data.parse_characters, raw, timing)
+
+    loaders = {
+        "items": _load_items,
+        "tags": _load_tags,
+        "skills": _load_skills,
+        "characters": _load_characters,
+    }
+
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(
+            *(
+                loaders[source](session, timings.setdefault(source, _LoadTiming()))
+                for source in sources
+            ),
+        )
+
+    return raw_data.Snapshot(**loaded, upstream="")
+
+
+async def _populate(
+    snapshot: raw_data.Snapshot,
+    sources: typing.Collection[str],
+    *,
+    dry_run: bool,
+) -> list[database.TableDelta]:
+    deltas: list[database.TableDelta] = []
+
+    # Sources are populated in order, such that referenced tables are always
+    # populated before the tables that reference them.
+    if "items" in sources:
+        deltas.extend(await database.populate_items(snapshot.items, dry_run=dry_run))
+
+    if "tags" in sources:
+        deltas.extend(await database.populate_tags(snapshot.tags, dry_run=dry_run))
+
+    if "skills" in sources:
+        deltas.extend(
+            await database.populate_skills(
+                snapshot.skills,
+                locale=_BASE_LOCALE,
+                localisations=snapshot.skill_localisations,
+                dry_run=dry_run,
+            ),
+        )
+
+    if "characters" in sources:
+        deltas.extend(await database.populate_characters(snapshot.characters, dry_run=dry_run))
+
+    return deltas
 
 
-async def _main() -> None:
-    print("Repopulating items...")
-    await database.populate_items(clean=True)
+async def _populate_parallel(
+    snapshot: raw_data.Snapshot,
+    sources: typing.Collection[str],
+    *,
+    concurrency: int,
+    dry_run: bool,
+) -> list[database.TableDelta]:
+    report = await database.populate_parallel(
+        snapshot,
+        concurrency=concurrency,
+        sources=sources,
+        dry_run=dry_run,
+    )
 
-    print("Repopulating tags...")
-    await database.populate_tags(clean=True)
+    print(f"Critical path ({report.elapsed:.2f}s):")
+    for timing in report.critical_path():
+        print(
+            f"    {timing.name}: {timing.duration:.2f}s"
+            f" ({timing.start:.2f}s - {timing.end:.2f}s, queued {timing.queued:.2f}s)",
+        )
 
-    print("Repopulating skills...")
-    await database.populate_skills(clean=True)
+    return [
+        report.results[spec.name] for spec in database.STATIC_TABLES if spec.name in report.results
+    ]
 
-    print("Repopulating characters...")
-    await database.populate_characters(clean=True)
+
+def _report(
+    timings: typing.Mapping[str, _LoadTiming],
+    deltas: typing.Sequence[database.TableDelta],
+    *,
+    dry_run: bool,
+) -> None:
+    print("Load times:")
+    for source, timing in timings.items():
+        print(f"    {source}: download {timing.download:.2f}s, parse {timing.parse:.2f}s")
+
+    print("Database times (dry run):" if dry_run else "Database times:")
+    for delta in deltas:
+        # Nothing is written in a dry run, so all changes would be.
+        changed = len(delta) if dry_run else delta.written + len(delta.deletes)
+        rate = delta.rows / delta.elapsed if delta.elapsed else 0.0
+        print(
+            f"    {delta.spec.name}: {len(delta.inserts)} inserted,"
+            f" {len(delta.updates)} updated, {len(delta.deletes)} deleted"
+            f" ({changed} rows {'to change' if dry_run else 'changed'}),"
+            f" {delta.rows} rows in {delta.elapsed:.2f}s ({rate:.0f} rows/s)",
+        )
+
+
+async def _select_outdated(
+    sources: typing.Collection[str],
+    versions: typing.Mapping[str, raw_data.download.TableVersion],
+) -> list[str]:
+    outdated = await database.select_outdated_sources(versions)
+    if up_to_date := [source for source in sources if source not in outdated]:
+        print(f"Skipping up to date {', '.join(up_to_date)}")
+
+    return [source for source in sources if source in outdated]
+
+
+async def _main(
+    sources: typing.Collection[str],
+    *,
+    concurrency: int | None,
+    dry_run: bool,
+    force: bool,
+) -> None:
+    start = time.perf_counter()
+    timings: dict[str, _LoadTiming] = {}
+
+    # Get the versions before reading any data, such that tables that change
+    # in the meantime are loaded again on the next run.
+    print("Checking upstream versions...")
+    versions = await database.fetch_upstream_versions(sources)
+    if not force and not (sources := await _select_outdated(sources, versions)):
+        print("All gamedata is up to date, nothing to do")
+        return
+
+    if raw_data.get_snapshot_path() and not raw_data.download.get_gamedata_dir():
+        # The snapshot holds parsed data, so there is no separate parse step.
+        print("Loading snapshot...")
+        timing = timings["snapshot"] = _LoadTiming()
+        snapshot_start = time.perf_counter()
+        snapshot = await raw_data.load_snapshot()
+        timing.download = time.perf_counter() - snapshot_start
+    else:
+        print(f"Loading {', '.join(sources)}...")
+        snapshot = await _load(sources, timings)
+
+    if concurrency:
+        print(f"Repopulating with up to {concurrency} concurrent stages...")
+        deltas = await _populate_parallel(
+            snapshot,
+            sources,
+            concurrency=concurrency,
+            dry_run=dry_run,
+        )
+    else:
+        print("Repopulating...")
+        deltas = await _populate(snapshot, sources, dry_run=dry_run)
+
+    _report(timings, deltas, dry_run=dry_run)
+
+    if not dry_run:
+        await database.store_versions(versions, sources)
+
+        refresh_start = time.perf_counter()
+        await database.refresh_views()
+        print(f"Refreshed views in {time.perf_counter() - refresh_start:.2f}s")
+
+    print(f"Done in {time.perf_counter() - start:.2f}s")
+
+
+async def _main_shadowed(*, force: bool) -> None:
+    print("Checking upstream versions...")
+    versions = await database.fetch_upstream_versions()
+    if not force and not await database.select_outdated_sources(versions):
+        print("All gamedata is up to date, nothing to do")
+        return
+
+    # Views are recreated as part of the swap, so they need no refresh.
+    print("Repopulating all static tables through shadow tables...")
+    counts = await database.populate_shadowed()
+    await database.store_versions(versions)
+    for table, count in counts.items():
+        print(f"    {table}: {count} rows")
+
+
+async def _run_pooled(main: typing.Awaitable[None], *, concurrency: int | None = None) -> None:
+    config = database.get_pool_config()
+    if concurrency and concurrency > config.max_size:
+        # Every concurrent stage holds a connection of its own.
+        config = dataclasses.replace(config, max_size=concurrency)
+
+    async with database.connection_pool(config):
+        await main
+        stats = database.get_pool_stats()
+
+    print(
+        f"Connection pool: peak {stats.peak_in_use}/{stats.max_size} connections in use,"
+        f" {stats.acquisitions} acquisitions",
+    )
 
 
 def _sync_main() -> None:
     # NOTE: This is the actual Poetry entrypoint.
-    asyncio.run(_main())
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--only",
+        nargs="+",
+        choices=database.STATIC_SOURCES,
+        metavar="SOURCE",
+        help=(
+            "only repopulate the tables of these gamedata sources, out of"
+            f" {', '.join(database.STATIC_SOURCES)} (default: all)"
+        ),
+    )
+    parser.add_argument(
+        "--from-dir",
+        metavar="DIR",
+        help="read the gamedata JSON files from a local checkout of the gamedata repository",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="only compute and report the changes, without writing anything",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="repopulate even if the loaded gamedata matches the current upstream version",
+    )
+    parser.add_argument(
+        "--shadow",
+        action="store_true",
+        help="load into shadow tables and swap them in at once, rather than applying deltas",
+    )
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        nargs="?",
+        const=4,
+        metavar="N",
+        help="populate independent tables concurrently on up to N connections (default: 4)",
+    )
+    args = parser.parse_args()
+
+    if args.from_dir:
+        raw_data.download.set_gamedata_dir(args.from_dir)
+
+    if args.shadow:
+        if args.only or args.dry_run or args.parallel:
+            parser.error("--shadow always replaces all tables at once")
+
+        asyncio.run(_run_pooled(_main_shadowed(force=args.force)))
+        return
+
+    # Keep the dependency order regardless of the order in which they were passed.
+    sources = [source for source in database.STATIC_SOURCES if source in (args.only or ())]
+    main = _main(
+        sources or database.STATIC_SOURCES,
+        concurrency=args.parallel,
+        dry_run=args.dry_run,
+        force=args.force,
+    )
+    asyncio.run(_run_pooled(main, concurrency=args.parallel))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,57 @@
+"""Tests for the lazily validated character models."""
+
+import typing
+
+from raw_data.models import character
+
+_FRAME = {
+    "level": 1,
+    "data": {
+        "maxHp": 720,
+        "atk": 276,
+        "def": 48,
+        "magicResistance": 10.0,
+        "cost": 18,
+        "blockCnt": 1,
+        "baseAttackTime": 1.6,
+        "respawnTime": 70,
+        "tauntLevel": 0,
+    },
+}
+_PHASE = {
+    "characterPrefabKey": "char_002_amiya",
+    "maxLevel": 50,
+    "attributesKeyFrames": [_FRAME],
+    "evolveCost": None,
+}
+
+
+def _phase(context: dict[str, typing.Any] | None = None) -> character.RawPhase:
+    return character.RawPhase.model_validate(_PHASE, context=context)
+
+
+def test_touched_equals_untouched() -> None:
+    """Reading a lazy property must not affect equality."""
+    touched, untouched = _phase(), _phase()
+    assert touched.frames[0].data.HP == 720
+
+    assert touched == untouched
+    assert untouched == touched
+
+
+def test_strict_equals_lazy() -> None:
+    """Eagerly and lazily validated models must be equal."""
+    assert _phase({"strict": True}) == _phase()
+
+
+def test_touched_hashes_equal_to_untouched() -> None:
+    """Equal models must be hashable and hash equally, whether or not they were touched."""
+    touched, untouched = _phase(), _phase()
+    _ = touched.frames
+
+    assert hash(touched) == hash(untouched)
+
+
+def test_different_fields_are_unequal() -> None:
+    """Models with different field values must still differ."""
+    assert _phase() != character.RawPhase.model_validate({**_PHASE, "maxLevel": 80})
@@ -0,0 +1,60 @@
+"""Tests for downloading and caching raw gamedata tables."""
+
+import asyncio
+import pathlib
+
+import aiohttp
+import pytest
+from aiohttp import test_utils, web
+
+from raw_data import download
+
+_TABLE = b'{"char_002_amiya": {"name": "Amiya"}}'
+
+
+async def _download_with_early_failure(cache_dir: pathlib.Path) -> bytes:
+    attempts = 0
+
+    async def handler(request: web.Request) -> web.StreamResponse:
+        nonlocal attempts
+        attempts += 1
+
+        response = web.StreamResponse(headers={"ETag": '"v1"'})
+        response.content_length = len(_TABLE)
+        await response.prepare(request)
+
+        if attempts == 1:
+            # Fail after the headers were sent, but before any of the body was.
+            assert request.transport
+            request.transport.close()
+            return response
+
+        await response.write(_TABLE)
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_get("/{path:.*}", handler)
+
+    async with test_utils.TestServer(app) as server, aiohttp.ClientSession() as session:
+        url = str(server.make_url("/table.json"))
+        state = download._Download(url, download.GamedataCache(cache_dir))
+        body = b"".join([chunk async for chunk in download._iter_download(session, state)])
+        state.commit()
+
+    assert attempts == 2
+    return body
+
+
+def test_retry_before_body_does_not_leak_writer(
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """A retry before any of the body arrived must not leave a partial file behind."""
+    monkeypatch.setattr(download, "_backoff", lambda _: 0)
+
+    body = asyncio.run(_download_with_early_failure(tmp_path))
+
+    assert body == _TABLE
+    assert not list((tmp_path / "objects").glob("*.part"))
+    assert len(list((tmp_path / "objects").glob("*.json"))) == 1
@@ -0,0 +1,35 @@
+"""Tests for deduplicating repeating gamedata values."""
+
+import gc
+import pickle
+
+from raw_data.models import character, interning
+
+_COST = [{"id": "mod_unlock_token", "count": 1}, {"id": "4001", "count": 30000}]
+
+
+def _costs() -> character.RawSharedSkillCost:
+    return character.RawSharedSkillCost.model_validate({"lvlUpCost": _COST})
+
+
+def test_equal_costs_share_one_sequence() -> None:
+    """Equal cost lists and their items must be the same objects while in use."""
+    first, second = _costs(), _costs()
+
+    assert first.cost is second.cost
+    assert first.cost == tuple(character.RawItem.model_validate(item) for item in _COST)
+    assert pickle.loads(pickle.dumps(first)).cost is first.cost  # noqa: S301
+
+
+def test_unused_values_are_released() -> None:
+    """Values must not be kept around once nothing uses them anymore."""
+    costs = _costs()
+    assert costs.cost is not None
+    items = tuple(costs.cost)
+    key = (interning.InternedTuple, items)
+    assert key in interning._canonical
+
+    del costs
+    gc.collect()
+
+    assert key not in interning._canonical
@@ -0,0 +1,37 @@
+"""Tests for running interdependent stages concurrently."""
+
+import asyncio
+
+import pytest
+
+import database
+
+
+class _StageError(Exception):
+    pass
+
+
+def test_failing_stage_raises_its_own_exception() -> None:
+    """The exception of a failing stage must not be wrapped in an exception group."""
+    cancelled: list[str] = []
+
+    async def _fail() -> None:
+        raise _StageError
+
+    async def _wait() -> None:
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.append("wait")
+            raise
+
+    stages = [
+        database.Stage("fail", _fail),
+        database.Stage("wait", _wait),
+        database.Stage("dependent", _wait, depends_on=("fail",)),
+    ]
+
+    with pytest.raises(_StageError):
+        asyncio.run(database.run_pipeline(stages))
+
+    assert cancelled == ["wait"]
@@ -0,0 +1,92 @@
+"""Tests for turning gamedata into static table rows."""
+
+import pytest
+
+import database
+import raw_data
+from database import populate, specs
+
+_SKILL = {
+    "skillId": "skchr_amiya_1",
+    "levels": [
+        {
+            "name": "Tactical Chant",
+            "description": "ATTACK SPEED +{attack_speed}",
+            "duration": 30.0,
+            "spData": {
+                "spType": "INCREASE_WITH_TIME",
+                "spCost": 40,
+                "initSp": 10,
+                "maxChargeTime": 1,
+            },
+            "blackboard": [{"key": "attack_speed", "value": 30.0}],
+            "skillType": "AUTO",
+            "durationType": "NONE",
+        },
+    ],
+}
+
+_PHASE = {
+    "characterPrefabKey": "char_002_amiya",
+    "maxLevel": 50,
+    "attributesKeyFrames": [
+        {
+            "level": level,
+            "data": {
+                "maxHp": hp,
+                "atk": 276,
+                "def": 48,
+                "magicResistance": 10.0,
+                "cost": 18,
+                "blockCnt": 1,
+                "baseAttackTime": 1.6,
+                "respawnTime": 70,
+                "tauntLevel": 0,
+            },
+        }
+        for level, hp in ((1, 720), (50, 1100))
+    ],
+    "evolveCost": None,
+}
+
+
+def _blackboard_rows() -> list[specs.Row]:
+    skill = raw_data.RawSkill.model_validate(_SKILL)
+    return populate._skill_rows([skill], "en_US")[specs.SKILL_BLACKBOARD]
+
+
+def test_blackboard_rows_are_kept_by_default(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Repopulating in the default mode must not remove the existing blackboard rows."""
+    monkeypatch.delenv("STATIC_BLACKBOARD_ROWS", raising=False)
+    monkeypatch.setattr(populate, "_blackboard_rows", populate._blackboard_rows_from_env())
+
+    assert populate.get_blackboard_rows()
+    assert _blackboard_rows() == [
+        {
+            "skill_level_id.skill_id": "skchr_amiya_1",
+            "skill_level_id.level": 1,
+            "key": "attack_speed",
+            "value": 30.0,
+        },
+    ]
+
+
+def test_blackboard_rows_can_be_disabled(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Disabling blackboard rows must leave only the JSONB blackboard."""
+    monkeypatch.setattr(populate, "_blackboard_rows", populate._blackboard_rows)
+    populate.set_blackboard_rows(False)
+
+    assert _blackboard_rows() == []
+
+
+def test_frame_columns_match_validated_frames() -> None:
+    """Stats read from the raw keyframes must match those of the validated keyframes."""
+    phase = raw_data.models.character.RawPhase.model_validate(_PHASE)
+    levels, stats = populate._frame_columns(phase.raw_frames)
+    assert "frames" not in phase.__dict__
+
+    assert levels == [frame.level for frame in phase.frames]
+    assert stats == [
+        [float(getattr(frame.data, stat)) for stat in database.ELITE_PHASE_STATS]
+        for frame in phase.frames
+    ]
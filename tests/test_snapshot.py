@@ -0,0 +1,32 @@
+"""Tests for identifying the upstream data a snapshot was built from."""
+
+import raw_data
+from raw_data import download, snapshot
+
+_VERSIONS = {
+    f"{locale}/{table}": download.TableVersion(digest=None, etag=f'"{locale}-{table}"')
+    for table, locale in snapshot._TABLES
+}
+
+
+def test_hash_versions_ignores_other_tables() -> None:
+    """Tables that are not part of a snapshot must not affect its hash."""
+    other = {**_VERSIONS, "en_US/stage_table": download.TableVersion(digest="0", etag=None)}
+
+    assert raw_data.hash_versions(other) == raw_data.hash_versions(_VERSIONS)
+
+
+def test_hash_versions_requires_all_tables() -> None:
+    """Without the version of every table, there is nothing to compare a snapshot with."""
+    assert raw_data.hash_versions(dict(list(_VERSIONS.items())[1:])) is None
+
+
+def test_hash_versions_prefers_digests() -> None:
+    """Digests must be hashed over ETags, as they only depend on the contents of a table."""
+    name = next(iter(_VERSIONS))
+    digested = {**_VERSIONS, name: download.TableVersion(digest="abc", etag='"other"')}
+
+    assert raw_data.hash_versions(digested) != raw_data.hash_versions(_VERSIONS)
+    assert raw_data.hash_versions(digested) == raw_data.hash_versions(
+        {**digested, name: download.TableVersion(digest="abc", etag=None)},
+    )
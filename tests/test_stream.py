@@ -0,0 +1,105 @@
+"""Tests for incrementally parsing large JSON objects."""
+
+import asyncio
+import json
+import typing
+
+import pytest
+
+from raw_data import stream
+
+_DOCUMENT = {
+    "char_002_amiya": {
+        "name": 'Amiya "the Rabbit"',
+        "description": "Braces {, } and brackets [, ] in a string \\ with escapes.",
+        "tags": ["Caster", "DPS", "阿米娅"],
+        "phases": [{"maxLevel": 50, "cost": None}, {"maxLevel": 70, "cost": 1.5e3}],
+    },
+    "token_10000_silent_healrb": None,
+    "char_003_kalts": {"rarity": 5, "isSpChar": False, "skills": []},
+    "char_010_chen": 12345,
+    "char_017_huang": 'Blaze \\"]}',
+}
+
+
+async def _chunks(document: bytes, size: int) -> typing.AsyncIterator[bytes]:
+    for start in range(0, len(document), size):
+        yield document[start : start + size]
+
+
+def _items(
+    document: bytes,
+    size: int,
+    key_filter: typing.Callable[[str], bool] | None = None,
+) -> list[tuple[str, typing.Any]]:
+    async def _collect() -> list[tuple[str, typing.Any]]:
+        entries = stream.iter_object_items(_chunks(document, size), key_filter=key_filter)
+        return [entry async for entry in entries]
+
+    return asyncio.run(_collect())
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 1 << 16])
+def test_items_match_json_loads(size: int) -> None:
+    """Entries must decode to the same values, regardless of how the document is chunked."""
+    document = json.dumps(_DOCUMENT, ensure_ascii=False).encode()
+
+    assert dict(_items(document, size)) == _DOCUMENT
+
+
+@pytest.mark.parametrize("size", [1, 5, 1 << 16])
+def test_filtered_values_are_not_decoded(size: int, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Values of entries that are filtered out must be skipped without being decoded."""
+    decoded: list[object] = []
+    decoder = stream._DECODER
+
+    class _Decoder:
+        def raw_decode(self, text: str, pos: int) -> tuple[object, int]:
+            value, end = decoder.raw_decode(text, pos)
+            decoded.append(value)
+            return value, end
+
+    monkeypatch.setattr(stream, "_DECODER", _Decoder())
+
+    # The skipped value is not valid JSON, so decoding it would fail.
+    document = b'{"skip": {"a": [tru, "}\\"]"]}, "keep": [1, 2]}'
+
+    assert _items(document, size, key_filter=lambda key: key == "keep") == [("keep", [1, 2])]
+    # Values that end with the buffer may be decoded again, but only the keys
+    # and the value that is kept are ever decoded.
+    assert all(value in ("skip", "keep", [1, 2]) for value in decoded)
+
+
+@pytest.mark.parametrize("size", [1, 3, 1 << 16])
+@pytest.mark.parametrize("key", list(_DOCUMENT))
+def test_filter_skips_all_other_entries(size: int, key: str) -> None:
+    """Skipping any kind of value must leave the buffer at the start of the next entry."""
+    document = json.dumps(_DOCUMENT, ensure_ascii=False).encode()
+
+    assert _items(document, size, key_filter=lambda other: other == key) == [(key, _DOCUMENT[key])]
+
+
+def test_decoding_is_linear_in_value_size() -> None:
+    """A value spanning many chunks must not be decoded again after every chunk."""
+    document = json.dumps({"entry": list(range(1000))}).encode()
+    examined = 0
+    decoder = stream._DECODER
+
+    class _Decoder:
+        def raw_decode(self, text: str, pos: int) -> tuple[object, int]:
+            nonlocal examined
+            examined += len(text) - pos
+            return decoder.raw_decode(text, pos)
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(stream, "_DECODER", _Decoder())
+        assert _items(document, 16) == [("entry", list(range(1000)))]
+
+    # Decoding again after every chunk would examine ~300 times the document.
+    assert examined < 4 * len(document)
+
+
+def test_unterminated_value_raises() -> None:
+    """A document that ends within a value must raise."""
+    with pytest.raises(json.JSONDecodeError):
+        _items(b'{"a": {"b": "c', 4)